@@ -0,0 +1 @@
+"""Benchmarks, see benchmarks/run.py."""
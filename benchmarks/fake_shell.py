@@ -0,0 +1,72 @@
+"""A deterministic stand in for a shell, for benchmarks.
+
+Speaks just enough of the robot's side of a shell: the prompt sentinel
+set up (see PromptSentinel.shell_setup), and a few commands with fixed
+output and exit status. It starts in milliseconds and never varies, so
+benchmarks measure typetastic, not bash.
+
+Commands:
+echo ARGS       prints ARGS, exit status 0
+true / false    exit status 0 / 1
+yes N           prints N lines of "y"
+exit            exits
+name=value, cd  accepted silently, exit status 0
+anything else   "fake_shell: NAME: command not found", exit status 127
+"""
+
+import re
+import sys
+
+SETUP_PATTERN = re.compile(r"tt-([0-9a-f]+):")
+ASSIGNMENT_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*=")
+
+
+def run_line(line, state):
+    """Returns (output, exit status) for a command line."""
+    match = SETUP_PATTERN.search(line)
+    if "PS1=" in line and match:
+        state["token"] = match.group(1)
+        return ("", 0)
+
+    words = line.split()
+    if not words or ASSIGNMENT_PATTERN.match(line) or words[0] in ("cd", "unset", "export"):
+        return ("", 0)
+
+    name = words[0]
+    if name == "echo":
+        return (" ".join(words[1:]) + "\n", 0)
+    if name in ("true", "false"):
+        return ("", 0 if name == "true" else 1)
+    if name == "yes" and len(words) > 1 and words[1].isdigit():
+        return ("y\n" * int(words[1]), 0)
+
+    return ("fake_shell: {0}: command not found\n".format(name), 127)
+
+
+def prompt(state, status):
+    """Returns the prompt, the sentinel once it is set up."""
+    if state["token"]:
+        return "\x1ett-{0}:{1}\x1e".format(state["token"], status)
+    return "$ "
+
+
+def main():
+    """Reads command lines from stdin until exit or end of input."""
+    state = {"token": None}
+    out = sys.stdout
+
+    out.write(prompt(state, 0))
+    out.flush()
+
+    for line in iter(sys.stdin.readline, ""):
+        line = line.strip()
+        if line == "exit":
+            break
+        (output, status) = run_line(line, state)
+        out.write(output)
+        out.write(prompt(state, status))
+        out.flush()
+
+
+if __name__ == "__main__":
+    main()
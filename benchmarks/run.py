@@ -0,0 +1,307 @@
+"""Benchmarks for typetastic, run against a fake shell.
+
+Usage:
+    python -m benchmarks.run [--save] [--quick] [--shell CMD] [NAME ...]
+
+Results are stored per version in benchmarks/results/VERSION.json with
+--save, and each run is compared with the latest other version stored.
+All measures are lower is better.
+"""
+
+import argparse
+import collections
+import datetime
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pexpect
+
+from typetastic import bot_handlers
+from typetastic.clock import SystemClock
+from typetastic.executors import FakeExecutor
+from typetastic.robot import Robot
+from typetastic.script_stream import ScriptStream
+from typetastic.shell_pool import ShellPool, spawn_shell
+from typetastic.ssh_pool import SSHPool, SSHTarget
+from typetastic.terminal import Terminal
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+FAKE_SHELL = "{0} {1}".format(sys.executable, os.path.join(BENCHMARK_DIR, "fake_shell.py"))
+
+# a change bigger than this, against the previous version, is a regression
+REGRESSION_THRESHOLD = 0.10
+
+# name -> (function, unit)
+BENCHMARKS = collections.OrderedDict()
+
+
+def benchmark(unit):
+    """Registers a benchmark function, which returns a measure in unit."""
+    def register(function):
+        BENCHMARKS[function.__name__] = (function, unit)
+        return function
+    return register
+
+
+class FakeSSH(pexpect.spawn):
+    """Stand in for pxssh and sshd, logging in to the fake shell."""
+
+    def __init__(self, shell=FAKE_SHELL):
+        super().__init__(None, timeout=10, encoding="utf-8")
+        self.shell = shell
+
+    def login(self, server, username=None, port=None, ssh_key=None):
+        # pylint: disable=unused-argument
+        """Starts the fake shell in place of a remote one."""
+        self._spawn(self.shell)
+        return True
+
+    def logout(self):
+        """Exits the fake shell."""
+        self.sendline("exit")
+        self.expect(pexpect.EOF)
+        self.close()
+
+
+def timed(function, repeat):
+    """Returns the seconds function took, for each of repeat calls."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+@benchmark("seconds")
+def shell_startup(options):
+    """Median time for setup_shell to spawn a shell at the sentinel prompt."""
+    def startup():
+        spawn_shell(options.shell).close(force=True)
+
+    return statistics.median(timed(startup, options.repeat // 10 or 1))
+
+
+@benchmark("seconds")
+def command_overhead(options):
+    """Median time per command of execute_command and get_last_exit_status."""
+    session = spawn_shell(options.shell)
+    handler_data = {
+        "local": session,
+        "command": "true",
+        "terminal": Terminal(headless=True)
+    }
+
+    def command():
+        bot_handlers.execute_command(handler_data)
+        bot_handlers.get_last_exit_status(handler_data)
+
+    try:
+        return statistics.median(timed(command, options.repeat))
+    finally:
+        session.close(force=True)
+
+
+@benchmark("seconds")
+def run_overhead(options):
+    """Time per command of a headless supersonic Robot.run, warm shell pool."""
+    commands = ["echo step {0}".format(number) for number in range(options.repeat)]
+    robot = Robot(pool=ShellPool(shell=options.shell))
+    robot.load({"commands": commands, "config": {
+        "headless": True, "typing-speed": "supersonic", "pexpect-delay": 0}})
+    robot.run()  # warms the pool
+
+    try:
+        started = time.perf_counter()
+        robot.run()
+        return (time.perf_counter() - started) / len(commands)
+    finally:
+        robot.close()
+
+
+@benchmark("seconds")
+def fake_run_overhead(options):
+    """Time per command of a headless supersonic Robot.run, on the fake executor."""
+    commands = ["echo step {0}".format(number) for number in range(options.repeat)]
+    robot = Robot(executor=FakeExecutor(default=("step\n", 0)))
+    robot.load({"commands": commands, "config": {
+        "headless": True, "typing-speed": "supersonic", "pexpect-delay": 0}})
+    robot.run()  # compiles the plan
+
+    started = time.perf_counter()
+    robot.run()
+    return (time.perf_counter() - started) / len(commands)
+
+
+@benchmark("seconds")
+def typing_error(options):
+    """Mean absolute pacing error per keystroke of simulate_typing, 5ms keys."""
+    terminal = Terminal(SystemClock(), headless=True)
+    text = "echo the quick brown fox jumps over the lazy dog" * 2
+
+    errors = []
+    for _ in range(max(1, options.repeat // 50)):
+        stats = bot_handlers.simulate_typing(text, 0.005, 0.005, 0, terminal=terminal)
+        errors.append(abs(stats.achieved - stats.requested) / stats.keystrokes)
+    return statistics.mean(errors)
+
+
+@benchmark("seconds")
+def ssh_round_trip(options):
+    """Median time per command of run_ssh_command, against a fake sshd."""
+    pool = SSHPool(factory=lambda: FakeSSH(options.shell))
+    target = SSHTarget("user", "localhost", None, None)
+    ssh_conn = pool.checkout(target)
+    pool.login(ssh_conn, target)
+
+    handler_data = {
+        "remote": ssh_conn,
+        "command": "true",
+        "terminal": Terminal(headless=True)
+    }
+
+    try:
+        return statistics.median(timed(lambda: bot_handlers.run_ssh_command(handler_data),
+                                       options.repeat))
+    finally:
+        pool.release(ssh_conn)
+        pool.close()
+
+
+@benchmark("bytes")
+def long_script_memory(options):
+    """Peak memory compiling a long script, streamed, per command."""
+    count = options.repeat * 100
+    with tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False) as stream:
+        stream.write("config:\n  typing-speed: supersonic\ncommands:\n")
+        for number in range(count):
+            stream.write("  - echo step {0}\n".format(number))
+
+    try:
+        script = ScriptStream(stream.name)
+        tracemalloc.start()
+        for _ in Robot.iter_plan(script, {"typing-speed": "supersonic"}):
+            pass
+        (_, peak) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        os.unlink(stream.name)
+
+    return peak / count
+
+
+def package_version():
+    """Returns the version in setup.py."""
+    with open(os.path.join(os.path.dirname(BENCHMARK_DIR), "setup.py")) as stream:
+        return re.search(r'VERSION = "([^"]+)"', stream.read()).group(1)
+
+
+def version_key(version):
+    """Returns a sort key for a version string."""
+    return [int(part) if part.isdigit() else 0 for part in re.split(r"[.-]", version)]
+
+
+def previous_results(version):
+    """Returns the stored results of the latest version other than version."""
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+
+    versions = [name[:-len(".json")] for name in os.listdir(RESULTS_DIR)
+                if name.endswith(".json") and name[:-len(".json")] != version]
+    if not versions:
+        return None
+
+    with open(os.path.join(RESULTS_DIR, max(versions, key=version_key) + ".json")) as stream:
+        return json.load(stream)
+
+
+def save_results(version, results):
+    """Stores results for version, returns the file written."""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, version + ".json")
+    with open(path, "w") as stream:
+        json.dump({
+            "version": version,
+            "date": datetime.date.today().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results
+        }, stream, indent=2, sort_keys=True)
+        stream.write("\n")
+    return path
+
+
+def report(results, previous):
+    """Returns a table of results, compared with previous results.
+
+    Returns (text, regressions), regressions lists the names of measures
+    more than REGRESSION_THRESHOLD worse than before.
+    """
+    before = previous["results"] if previous else {}
+    lines = ["{0:22} {1:>14} {2:>14} {3:>8}".format(
+        "benchmark", "value", previous["version"] if previous else "previous", "change")]
+    regressions = []
+
+    for (name, result) in results.items():
+        old = before.get(name)
+        change = ""
+        if old and old["value"]:
+            ratio = result["value"] / old["value"] - 1
+            change = "{0:+.1%}".format(ratio)
+            if ratio > REGRESSION_THRESHOLD:
+                regressions.append(name)
+                change += " !"
+        lines.append("{0:22} {1:>14} {2:>14} {3:>8}".format(
+            name, _format(result), _format(old) if old else "-", change))
+
+    return ("\n".join(lines), regressions)
+
+
+def _format(result):
+    """Returns a measure with its unit, seconds shown as microseconds."""
+    if result["unit"] == "seconds":
+        return "{0:.1f}us".format(result["value"] * 1000000)
+    return "{0:.0f} {1}".format(result["value"], result["unit"])
+
+
+def main(argv=None):
+    """Run the benchmarks, exits non-zero on regressions with --check."""
+    arg_parser = argparse.ArgumentParser(description=main.__doc__)
+    arg_parser.add_argument("names", nargs="*", help="benchmarks to run, all by default")
+    arg_parser.add_argument("--shell", default=FAKE_SHELL,
+                            help="shell to benchmark against, the fake shell by default")
+    arg_parser.add_argument("--repeat", type=int, default=200)
+    arg_parser.add_argument("--quick", action="store_true", help="a few repeats, as a smoke test")
+    arg_parser.add_argument("--save", action="store_true",
+                            help="store results as this version's")
+    arg_parser.add_argument("--check", action="store_true",
+                            help="exit non-zero if any benchmark regressed")
+    options = arg_parser.parse_args(argv)
+    if options.quick:
+        options.repeat = 10
+
+    results = collections.OrderedDict()
+    for (name, (function, unit)) in BENCHMARKS.items():
+        if not options.names or name in options.names:
+            results[name] = {"value": function(options), "unit": unit}
+
+    version = package_version()
+    (text, regressions) = report(results, previous_results(version))
+    print(text)
+
+    if options.save:
+        print("saved {0}".format(save_results(version, results)))
+
+    return 1 if options.check and regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
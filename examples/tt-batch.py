@@ -0,0 +1,13 @@
+#!/usr/bin/env python
+
+# tt-batch.py [--workers N] [--json FILE] [--junit FILE] <file> [<file> ...]
+#
+# Run a library of typetastic command files in parallel, headless, and
+# report which commands failed.
+
+import sys
+import typetastic.batch
+
+
+if __name__ == "__main__":
+    sys.exit(typetastic.batch.main())
@@ -5,7 +5,9 @@
 # Run a typetastic command file.
 
 import argparse
+import sys
 import typetastic
+from typetastic.script_stream import ScriptStream
 
 
 def main():
@@ -13,11 +15,46 @@ def main():
 
     arg_parser = argparse.ArgumentParser()
     arg_parser.add_argument("inputfile")
+    arg_parser.add_argument("--stream", action="store_true",
+                            help="run commands as they are read, for very long files")
+    arg_parser.add_argument("--trace", metavar="FILE",
+                            help="write a Chrome trace of the run, and print a summary")
+    arg_parser.add_argument("--preflight", action="store_true",
+                            help="check commands, files and ssh hosts first, stop on problems")
+    arg_parser.add_argument("--rehearse", action="store_true",
+                            help="replay cached output, run only commands not cached yet")
+    arg_parser.add_argument("--start-at", metavar="STEP", type=int, default=1,
+                            help="resume at this step, from the checkpoint-file if there is one")
+    arg_parser.add_argument("--fast-forward", action="store_true",
+                            help="with --start-at, run the earlier steps unseen instead")
+    arg_parser.add_argument("--segments", action="store_true",
+                            help="render headless in parallel segments, cut after each PAUSE")
     args = arg_parser.parse_args()
 
-    robot = typetastic.Robot()
-    robot.load(args.inputfile)
-    robot.run()
+    with typetastic.Robot() as robot:
+        robot.load(ScriptStream(args.inputfile) if args.stream else args.inputfile)
+        if args.trace:
+            robot.load({"config": {"trace-file": args.trace}})
+        if args.rehearse:
+            robot.load({"config": {"rehearse": True}})
+
+        if args.preflight:
+            problems = robot.preflight()
+            for problem in problems:
+                where = " on {0}".format(problem.host) if problem.host else ""
+                print("step {0}{1}: {2}".format(problem.step, where, problem.message),
+                      file=sys.stderr)
+            if problems:
+                sys.exit(1)
+
+        if args.segments:
+            robot.render_segments()
+        else:
+            robot.run(start_at=args.start_at, fast_forward=args.fast_forward)
+
+        tracer = robot.get_tracer()
+        if args.trace and tracer:
+            print(tracer.summary(), file=sys.stderr)
 
 
 if __name__ == "__main__":
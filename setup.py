@@ -38,7 +38,7 @@ setup(
         "Bug Tracker": "https://github.com/thisdougb/typetastic/issues",
         "Source Code": "https://github.com/thisdougb/typetastic",
     },
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks"]),
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: GNU General Public License v3 (GPLv3)",
@@ -0,0 +1,87 @@
+"""Test Asciicast Export."""
+
+import json
+import os
+import tempfile
+import unittest
+
+import typetastic
+from typetastic.asciicast import cast_events, write_cast
+from typetastic.timeline import Event
+
+
+class TestAsciicast(unittest.TestCase):
+    """Test timeline events are exported as asciinema v2 casts."""
+
+    def setUp(self):
+
+        self.events = [
+            Event(0.0, "prompt", "$ "),
+            Event(0.1, "type", "l"),
+            Event(0.2, "type", "s\n"),
+            Event(0.3, "output", "file.txt\n"),
+            Event(0.3, "exit_status", 0),
+            Event(0.4, "prompt", "$ "),
+            Event(0.4, "pause", None),
+            Event(30.4, "type", "w"),
+        ]
+
+    def test_cast_events(self):
+        """Test screen events become output events with tty newlines."""
+
+        cast = cast_events(self.events[:6])
+
+        self.assertEqual(cast[0], [0.0, "o", "$ "])
+        self.assertEqual(cast[2], [0.2, "o", "s\r\n"])
+        self.assertEqual(cast[3], [0.3, "o", "file.txt\r\n"])
+        self.assertEqual(len(cast), 5)
+
+    def test_pause_gap(self):
+        """Test the wait at a PAUSE is replaced by the pause gap."""
+
+        cast = cast_events(self.events, pause_gap=1.5)
+
+        self.assertEqual(cast[-1], [1.9, "o", "w"])
+
+    def test_pause_marker(self):
+        """Test a PAUSE can be a chapter marker."""
+
+        cast = cast_events(self.events, pause_gap=0, pause_marker=True)
+
+        self.assertEqual(cast[-2], [0.4, "m", "PAUSE 1"])
+        self.assertEqual(cast[-1], [0.4, "o", "w"])
+
+    def test_write_cast(self):
+        """Test the cast file has a v2 header and one event per line."""
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cast_file = os.path.join(temp_dir, "demo.cast")
+            write_cast(self.events, cast_file, size=(100, 30), title="demo")
+
+            with open(cast_file) as stream:
+                lines = [json.loads(line) for line in stream]
+
+        self.assertEqual(lines[0]["version"], 2)
+        self.assertEqual((lines[0]["width"], lines[0]["height"]), (100, 30))
+        self.assertEqual(lines[0]["title"], "demo")
+        self.assertEqual(lines[1], [0.0, "o", "$ "])
+
+    def test_robot_cast_file(self):
+        """Test a run writes its own cast file."""
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cast_file = os.path.join(temp_dir, "demo.cast")
+
+            robot = typetastic.Robot()
+            robot.load({
+                "config": {"headless": True, "cast-file": cast_file},
+                "commands": ["echo hello"]
+            })
+            robot.run()
+
+            with open(cast_file) as stream:
+                lines = [json.loads(line) for line in stream]
+
+        output = "".join(line[2] for line in lines[1:])
+        self.assertIn("echo hello", output)
+        self.assertIn("hello\r\n", output)
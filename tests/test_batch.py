@@ -0,0 +1,52 @@
+"""Test Batch Runner."""
+
+import json
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+from typetastic import batch
+
+
+class TestBatchRunner(unittest.TestCase):
+    """Test running many files in parallel."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.paths = [
+            "tests/data/typetastic-simple-command-set.yaml",
+            "tests/data/typetastic-meta-command-set.yaml",
+            "tests/data/typetastic-invalid-command-set.yaml",
+        ]
+        cls.reports = batch.run_batch(cls.paths, workers=3)
+
+    def test_reports_in_order(self):
+        """Test there is a report per file, in the order given."""
+
+        self.assertEqual([report["path"] for report in self.reports], self.paths)
+
+    def test_command_results(self):
+        """Test each command has a result, and headless PAUSE does not block."""
+
+        (simple, meta, invalid) = self.reports
+
+        self.assertTrue(simple["success"])
+        self.assertEqual(len(simple["commands"]), 3)
+        self.assertEqual(simple["commands"][1]["exit_status"], 0)
+        self.assertIn("/etc/hosts", simple["output"])
+
+        self.assertTrue(meta["success"])
+
+        self.assertFalse(invalid["success"])
+        self.assertIsNotNone(invalid["error"])
+
+    def test_formats(self):
+        """Test the text, JSON and JUnit reports."""
+
+        text = batch.format_text(self.reports)
+        self.assertIn("2 of 3 files passed", text)
+
+        self.assertEqual(json.loads(batch.format_json(self.reports))[0]["path"], self.paths[0])
+
+        suites = ElementTree.fromstring(batch.format_junit(self.reports))
+        self.assertEqual(len(suites.findall("testsuite")), 3)
+        self.assertEqual(suites.find("testsuite").get("tests"), "3")
@@ -0,0 +1,76 @@
+"""Test Benchmarks."""
+
+from io import StringIO
+from unittest.mock import patch
+import unittest
+
+from benchmarks import run
+from typetastic import bot_handlers
+from typetastic.shell_pool import spawn_shell
+from typetastic.terminal import Terminal
+
+
+class TestFakeShell(unittest.TestCase):
+    """Test the fake shell speaks the prompt sentinel."""
+
+    def setUp(self):
+
+        self.session = spawn_shell(run.FAKE_SHELL)
+
+    def tearDown(self):
+
+        self.session.close(force=True)
+
+    def test_commands(self):
+        """Test fake commands give fixed output and exit status."""
+
+        for (command, output, exit_status) in [
+                ("echo hello world", "hello world", 0),
+                ("false", "", 1),
+                ("yes 2", "y\ny", 0),
+                ("nosuch", "fake_shell: nosuch: command not found", 127)]:
+            handler_data = {"local": self.session, "command": command,
+                            "terminal": Terminal(headless=True)}
+            result = bot_handlers.execute_command(handler_data)
+
+            self.assertEqual(result.output.replace("\r\n", "\n").rstrip(), output)
+            self.assertEqual(result.exit_status, exit_status)
+
+
+class TestReport(unittest.TestCase):
+    """Test results are compared with the previous version."""
+
+    def test_regression(self):
+        """Test a measure more than the threshold worse is a regression."""
+
+        previous = {"version": "1.0.0", "results": {
+            "fast": {"value": 1.0, "unit": "seconds"},
+            "slow": {"value": 1.0, "unit": "seconds"}}}
+        results = {
+            "fast": {"value": 0.5, "unit": "seconds"},
+            "slow": {"value": 1.5, "unit": "seconds"},
+            "new": {"value": 3.0, "unit": "bytes"}}
+
+        (text, regressions) = run.report(results, previous)
+
+        self.assertEqual(regressions, ["slow"])
+        self.assertIn("-50.0%", text)
+        self.assertIn("+50.0% !", text)
+
+    def test_version_order(self):
+        """Test versions sort numerically."""
+
+        self.assertGreater(run.version_key("1.1.10"), run.version_key("1.1.9"))
+
+    def test_quick_run(self):
+        """Test benchmarks run against the fake shell."""
+
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertEqual(run.main(["--repeat", "3", "command_overhead", "typing_error"]), 0)
+
+        self.assertIn("command_overhead", output.getvalue())
+        self.assertIn("typing_error", output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
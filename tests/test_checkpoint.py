@@ -0,0 +1,160 @@
+"""Test Checkpoints and resuming runs."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import typetastic
+from typetastic import checkpoint
+from typetastic.executors import PtyExecutor
+from typetastic.shell_pool import spawn_shell
+from typetastic.ssh_pool import SSHPool
+
+from test_preflight import LocalSSH
+
+
+def screen_text(robot):
+    """Returns the text of the last run's screen."""
+    return "".join(event.data for event in robot.get_timeline().events()
+                   if event.kind in ("type", "output", "prompt"))
+
+
+class TestCapture(unittest.TestCase):
+    """Test shell state is captured and restored."""
+
+    def test_round_trip(self):
+        """Test a fresh shell is put back in a captured state in one command."""
+
+        session = spawn_shell()
+        executor = PtyExecutor(session)
+        executor.send("cd /tmp; export STAGE='two words'; unset HOME")
+        executor.stream(lambda text: None)
+        (cwd, env) = checkpoint.capture(executor)
+        session.close(force=True)
+
+        self.assertEqual(cwd, "/tmp")
+        self.assertIn("STAGE", env)
+
+        session = spawn_shell()
+        executor = PtyExecutor(session)
+        checkpoint.restore(executor, cwd, env)
+        output = []
+        executor.send('pwd; echo "$STAGE" "${HOME-unset}"')
+        executor.stream(output.append)
+        session.close(force=True)
+
+        self.assertEqual("".join(output), "/tmp\r\ntwo words unset\r\n")
+
+    def test_restore_nothing(self):
+        """Test nothing captured is nothing to restore."""
+
+        self.assertEqual(checkpoint.restore_command(None, ""), "")
+
+    def test_file(self):
+        """Test checkpoints are read back by step, later lines winning."""
+
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "checkpoints.jsonl")
+        latest = checkpoint.Checkpoint(1, "local", "/tmp", "", None, None)
+        with open(path, "w") as stream:
+            checkpoint.write_checkpoint(stream, latest._replace(cwd="/"))
+            checkpoint.write_checkpoint(stream, latest)
+            stream.write("not json\n")
+
+        self.assertEqual(checkpoint.read_checkpoints(path), {1: latest})
+        shutil.rmtree(directory)
+
+
+class TestResume(unittest.TestCase):
+    """Test runs resumed part way through."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config = {"headless": True, "typing-speed": "supersonic",
+                       "checkpoint-file": os.path.join(self.directory, "checkpoints.jsonl")}
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_robot(self, commands, config=None, ssh_pool=None, **options):
+        """Returns a robot after running commands."""
+        robot = typetastic.Robot(ssh_pool=ssh_pool)
+        robot.load({"config": dict(self.config, **(config or {})), "commands": commands})
+        robot.run(**options)
+        robot.close()
+        return robot
+
+    def test_resume_from_checkpoint(self):
+        """Test earlier steps are skipped, with their state rebuilt."""
+
+        commands = ["cd /tmp", "export STAGE=two", "echo $STAGE $PWD > /dev/null", "false"]
+        first = self.run_robot(commands)
+        self.assertEqual(sorted(first.get_checkpoints()), [1, 2, 3, 4])
+        self.assertEqual(first.get_checkpoints()[3].cwd, "/tmp")
+
+        commands[2] = "echo $STAGE $PWD"
+        robot = self.run_robot(commands, start_at=3)
+
+        self.assertEqual([result["step"] for result in robot.get_results()], [3, 4])
+        screen = screen_text(robot)
+        self.assertIn("two /tmp\n", screen)
+        self.assertNotIn("cd /tmp", screen)
+        self.assertEqual(sorted(robot.get_checkpoints()), [1, 2, 3, 4])
+
+    def test_fast_forward(self):
+        """Test earlier steps are run unseen, without checkpoints."""
+
+        commands = ["cd /tmp", "export STAGE=two", "echo $STAGE $PWD"]
+        robot = self.run_robot(commands, config={"checkpoint-file": None},
+                               start_at=3, fast_forward=True)
+
+        self.assertEqual(len(robot.get_results()), 1)
+        screen = screen_text(robot)
+        self.assertIn("two /tmp\n", screen)
+        self.assertNotIn("cd /tmp", screen)
+
+    def test_python_block(self):
+        """Test a python3 block is started, and earlier statements run, unseen."""
+
+        commands = ["cd /tmp", {"python3": ["python3 -q", "x = 6", "import os",
+                                            "print(x * 7, os.getcwd())", "CTRL_D"]}]
+        self.run_robot(commands)
+        robot = self.run_robot(commands, start_at=5)
+
+        screen = screen_text(robot)
+        self.assertIn("42 /tmp", screen)
+        self.assertNotIn("x = 6", screen)
+        self.assertTrue(all(result["success"] for result in robot.get_results()))
+
+    def test_ssh_block(self):
+        """Test an ssh block is logged in to unseen, and its directory restored."""
+
+        commands = [{"ssh": ["ssh demo@localhost", "cd /tmp", "echo one", "pwd", "exit"]}]
+        first = self.run_robot(commands, ssh_pool=SSHPool(factory=LocalSSH))
+        self.assertEqual(first.get_checkpoints()[4].remote_cwd, "/tmp")
+
+        robot = self.run_robot(commands, ssh_pool=SSHPool(factory=LocalSSH), start_at=4)
+
+        screen = screen_text(robot)
+        self.assertIn("/tmp\n", screen)
+        self.assertNotIn("one", screen)
+        self.assertEqual([result["step"] for result in robot.get_results()], [4, 5])
+
+    def test_last_status(self):
+        """Test $? and $_ of a step survive the checkpoint taken before the next."""
+
+        robot = self.run_robot(["false last", 'echo "status=$? last=$_"'])
+
+        self.assertEqual(sorted(robot.get_checkpoints()), [1, 2])
+        self.assertIn("status=1 last=last\n", screen_text(robot))
+
+    def test_bad_step(self):
+        """Test steps are numbered from 1."""
+
+        with self.assertRaises(ValueError):
+            self.run_robot(["ls"], start_at=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+"""Test Clocks."""
+
+import unittest
+
+from typetastic.clock import SystemClock, VirtualClock
+
+
+class FakeSource:
+    """Real time source that only moves when told to."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestClocks(unittest.TestCase):
+    """Test the system and virtual clocks."""
+
+    def test_system_clock_sleeps(self):
+        """Test the system clock really waits."""
+
+        clock = SystemClock()
+        start = clock.now()
+        clock.sleep(0.05)
+
+        self.assertGreaterEqual(clock.now() - start, 0.05)
+
+    def test_virtual_clock_skips_sleep(self):
+        """Test sleeping moves the virtual clock, without waiting."""
+
+        source = FakeSource()
+        clock = VirtualClock(source)
+
+        self.assertEqual(clock.now(), 0)
+        clock.sleep(600)
+        self.assertEqual(clock.now(), 600)
+
+    def test_virtual_clock_follows_real_time(self):
+        """Test time spent running commands still counts."""
+
+        source = FakeSource()
+        clock = VirtualClock(source)
+
+        clock.sleep(2)
+        source.now += 0.5
+        clock.sleep(-1)  # overdue deadlines do not move the clock back
+
+        self.assertEqual(clock.now(), 2.5)
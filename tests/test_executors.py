@@ -0,0 +1,191 @@
+"""Test Executors."""
+
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+import typetastic
+from typetastic import bot_handlers
+from typetastic.clock import VirtualClock
+from typetastic.executors import (FakeExecutor, PtyExecutor, SubprocessExecutor,
+                                  create_executor)
+from typetastic.shell_pool import ShellPool, spawn_shell
+from typetastic.terminal import Terminal
+from typetastic.timeline import Timeline
+
+
+def screen_text(timeline):
+    """Returns the text of a timeline's screen."""
+    return "".join(event.data for event in timeline.events()
+                   if event.kind in ("type", "output", "prompt"))
+
+
+def run(executor, command):
+    """Returns the (output, exit status) of command run on executor."""
+    output = []
+    executor.send(command)
+    exit_status = executor.stream(output.append)
+    return ("".join(output), exit_status)
+
+
+class TestPtyExecutor(unittest.TestCase):
+    """Test commands run in a shell session."""
+
+    def test_run(self):
+        """Test output and exit status come through the prompt sentinel."""
+
+        session = spawn_shell()
+        executor = PtyExecutor(session)
+
+        self.assertEqual(run(executor, "echo hi"), ("hi\r\n", 0))
+        self.assertEqual(run(executor, "false")[1], 1)
+        session.close(force=True)
+
+
+class TestSubprocessExecutor(unittest.TestCase):
+    """Test commands run in a shell process each."""
+
+    def setUp(self):
+        self.directory = os.path.realpath(tempfile.mkdtemp())
+        self.executor = SubprocessExecutor(cwd=self.directory, env={"PATH": os.environ["PATH"]})
+
+    def tearDown(self):
+        self.executor.close()
+        shutil.rmtree(self.directory)
+
+    def test_run(self):
+        """Test output on a pipe, and exit statuses."""
+
+        self.assertEqual(run(self.executor, "echo hi; echo oops >&2"), ("hi\noops\n", 0))
+        self.assertEqual(run(self.executor, "exit 3"), ("", 3))
+        self.assertEqual(run(self.executor, "kill -9 $$")[1], 137)
+        self.assertEqual(run(self.executor, "printf '\\xe2\\x9c\\x93'"), ("✓", 0))
+
+    def test_state_tracked(self):
+        """Test the directory and exported variables carry to the next command."""
+
+        run(self.executor, "mkdir sub && cd sub && export GREETING='hi there'; LOCAL=1")
+
+        self.assertEqual(run(self.executor, 'pwd; echo "$GREETING" "$LOCAL"'),
+                         ("{0}/sub\nhi there \n".format(self.directory), 0))
+        self.assertEqual(self.executor.cwd, os.path.join(self.directory, "sub"))
+
+        run(self.executor, "unset GREETING; cd ..; exit 1")
+        self.assertNotIn("GREETING", self.executor.env)
+        self.assertEqual(self.executor.cwd, self.directory)
+
+    def test_state_file_quoted(self):
+        """Test state is tracked with a temp directory the shell would split or expand."""
+
+        odd = os.path.join(self.directory, "tmp dir $(x) 'q'")
+        os.mkdir(odd)
+        tempdir = tempfile.tempdir
+        tempfile.tempdir = odd
+        try:
+            executor = SubprocessExecutor(cwd=self.directory, env={"PATH": os.environ["PATH"]})
+        finally:
+            tempfile.tempdir = tempdir
+
+        run(executor, "cd / && export GREETING=hi")
+        executor.close()
+        self.assertEqual((executor.cwd, executor.env.get("GREETING")), ("/", "hi"))
+
+    def test_no_tty(self):
+        """Test commands get no tty and no input."""
+
+        self.assertEqual(run(self.executor, "test -t 0 || test -t 1; echo $?; cat"), ("1\n", 0))
+
+
+class TestFakeExecutor(unittest.TestCase):
+    """Test scripted output."""
+
+    def test_outputs(self):
+        """Test output and exit statuses are served, and commands kept."""
+
+        executor = FakeExecutor({
+            "uptime": "up 3 days\n",
+            "false": ("", 1),
+            "whoami": lambda command: ("{0}: demo\n".format(command), 0)
+        })
+
+        self.assertEqual(run(executor, "uptime"), ("up 3 days\n", 0))
+        self.assertEqual(run(executor, "false"), ("", 1))
+        self.assertEqual(run(executor, "whoami"), ("whoami: demo\n", 0))
+        self.assertEqual(run(executor, "ls"), ("", 0))
+        self.assertEqual(executor.commands, ["uptime", "false", "whoami", "ls"])
+
+    def test_unknown_name(self):
+        """Test an unknown executor name is an error."""
+
+        with self.assertRaises(ValueError):
+            create_executor("telnet")
+
+    def test_execute_command(self):
+        """Test the default handler's output goes through the output limits."""
+
+        timeline = Timeline(VirtualClock())
+        handler_data = {"executor": FakeExecutor({"seq 5": "1\n2\n3\n4\n5\n"}),
+                        "command": "seq 5", "config": {"output-max-lines": 2},
+                        "terminal": Terminal(VirtualClock(), timeline, headless=True)}
+        result = bot_handlers.execute_command(handler_data)
+
+        self.assertEqual(result.exit_status, 0)
+        self.assertTrue(screen_text(timeline).startswith("1\n"))
+        self.assertNotIn("\n3\n", screen_text(timeline))
+
+
+class TestRobotExecutor(unittest.TestCase):
+    """Test runs on each executor."""
+
+    def test_fake_run(self):
+        """Test a fake executor runs without starting a shell."""
+
+        pool = ShellPool()
+        executor = FakeExecutor({"make": ("error\n", 2)})
+        robot = typetastic.Robot(pool=pool, executor=executor)
+        robot.load({"config": {"headless": True, "typing-speed": "supersonic"},
+                    "commands": ["make", "make install", "CTRL_D"]})
+        robot.run()
+        robot.close()
+
+        self.assertEqual(pool.spawned, 0)
+        self.assertEqual(executor.commands, ["make", "make install"])
+        self.assertEqual([result["exit_status"] for result in robot.get_results()], [2, 0, None])
+
+    def test_subprocess_config(self):
+        """Test the executor config, and python3 blocks still have a pty."""
+
+        robot = typetastic.Robot()
+        robot.load({"config": {"headless": True, "typing-speed": "supersonic",
+                               "executor": "subprocess"},
+                    "commands": ["cd /", "export STEP=2", "echo $STEP $PWD",
+                                 {"python3": ["python3 -q", "print(6 * 7)", "CTRL_D"]}]})
+        robot.run()
+        robot.close()
+
+        self.assertTrue(all(result["success"] for result in robot.get_results()))
+        screen = screen_text(robot.get_timeline())
+        self.assertIn("2 /\n", screen)
+        self.assertIn("42", screen)
+
+    def test_unknown_config(self):
+        """Test an unknown executor config runs on pty, with a warning."""
+
+        pool = ShellPool()
+        with typetastic.Robot(pool=pool) as robot:
+            robot.load({"config": {"headless": True, "typing-speed": "supersonic",
+                                   "executor": "telnet"},
+                        "commands": ["true"]})
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always")
+                robot.run()
+
+        self.assertEqual(robot.get_results()[0]["exit_status"], 0)
+        self.assertEqual(pool.spawned, 1)
+        self.assertIn("telnet", str(caught[0].message))
+
+
+if __name__ == '__main__':
+    unittest.main()
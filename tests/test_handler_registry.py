@@ -0,0 +1,136 @@
+"""Test Handler Registry."""
+
+from unittest.mock import patch
+import sys
+import unittest
+import warnings
+
+import typetastic
+from typetastic import bot_handlers
+from typetastic import handler_registry
+from typetastic.handler_registry import HandlerRegistry
+
+
+def kubectl_handler(handler_data):
+    """Stand in for a plugin handler."""
+    return handler_data["command"].startswith("kubectl")
+
+
+class EntryPoint:
+    """Stand in for an installed entry point, importing the module given."""
+
+    def __init__(self, name, module):
+        self.name = name
+        self.module = module
+
+    def load(self):
+        """Returns the handler, raising as a broken plugin would."""
+        __import__(self.module)
+        return kubectl_handler
+
+
+class EntryPoints(list):
+    """Stand in for importlib.metadata.entry_points()."""
+
+    def select(self, group):
+        """Returns the entry points of group."""
+        return self if group == handler_registry.ENTRY_POINT_GROUP else []
+
+
+class TestHandlerRegistry(unittest.TestCase):
+    """Test commands resolve to handlers."""
+
+    def setUp(self):
+
+        self.registry = HandlerRegistry(entry_points=False)
+
+    def test_builtins(self):
+        """Test built-in handlers resolve by command name."""
+
+        self.assertIs(self.registry.resolve("NEWLINE"), bot_handlers.bot_handler_newline)
+        self.assertIs(self.registry.resolve("ssh root@host"), bot_handlers.bot_handler_ssh)
+        self.assertIs(self.registry.resolve("/usr/bin/vi notes"), bot_handlers.bot_handler_vi)
+        self.assertIs(self.registry.resolve("CTRL_D"), bot_handlers.bot_handler_CTRL_D)
+        self.assertIs(self.registry.resolve("uptime"), bot_handlers.bot_handler_default)
+
+    def test_patched_builtin(self):
+        """Test a patched built-in handler is the one resolved."""
+
+        with patch('typetastic.bot_handlers.bot_handler_default') as mock_bot_handler_default:
+            self.assertIs(self.registry.resolve("uptime"), mock_bot_handler_default)
+
+    def test_register_name(self):
+        """Test a registered name resolves to its handler, ignoring case."""
+
+        self.registry.register("Kubectl", kubectl_handler)
+
+        self.assertIs(self.registry.resolve("kubectl get pods"), kubectl_handler)
+        self.assertIs(self.registry.resolve("KUBECTL"), kubectl_handler)
+
+    def test_register_pattern(self):
+        """Test patterns match command names, after exact names."""
+
+        self.registry.register("docker*", kubectl_handler)
+        self.registry.register("docker-compose", bot_handlers.bot_handler_pause)
+
+        self.assertIs(self.registry.resolve("docker ps"), kubectl_handler)
+        self.assertIs(self.registry.resolve("docker-machine ls"), kubectl_handler)
+        self.assertIs(self.registry.resolve("docker-compose up"), bot_handlers.bot_handler_pause)
+        self.assertIs(self.registry.resolve("podman ps"), bot_handlers.bot_handler_default)
+
+    def test_entry_points(self):
+        """Test handlers are found through package entry points."""
+
+        with patch('typetastic.handler_registry._entry_point_handlers',
+                   return_value=[("kubectl", kubectl_handler)]):
+            registry = HandlerRegistry()
+
+        self.assertIs(registry.resolve("kubectl apply -f app.yaml"), kubectl_handler)
+        self.assertIn("kubectl=", registry.signature())
+
+    @unittest.skipIf(sys.version_info < (3, 8), "entry points read with pkg_resources")
+    def test_broken_entry_point(self):
+        """Test a plugin that fails to load is skipped with a warning."""
+
+        entry_points = EntryPoints([EntryPoint("broken", "no_such_typetastic_plugin"),
+                                    EntryPoint("kubectl", "colorsys")])
+        with patch('importlib.metadata.entry_points', return_value=entry_points):
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always")
+                registry = HandlerRegistry()
+
+        self.assertIs(registry.resolve("kubectl get pods"), kubectl_handler)
+        self.assertIs(registry.resolve("broken"), bot_handlers.bot_handler_default)
+        self.assertEqual(len(caught), 1)
+        self.assertIn("broken", str(caught[0].message))
+
+    def test_default_registry_built_once(self):
+        """Test the default registry is built on first use only."""
+
+        self.assertIs(handler_registry.default_registry(), handler_registry.default_registry())
+
+
+class TestRobotHandlers(unittest.TestCase):
+    """Test robots use registered handlers."""
+
+    def test_registered_handler_runs(self):
+        """Test a registered handler is compiled into the plan and run."""
+        # pylint: disable=protected-access
+
+        registry = HandlerRegistry(entry_points=False)
+        with patch.object(handler_registry, "_DEFAULT_REGISTRY", registry):
+            handler_registry.register_handler("kubectl", kubectl_handler)
+
+            robot = typetastic.Robot()
+            robot.load({"commands": ["kubectl get pods"],
+                        "config": {"headless": True, "typing-speed": "supersonic"}})
+
+            self.assertIs(robot._get_plan()[0].handler, kubectl_handler)
+            robot.run()
+            robot.close()
+
+        self.assertEqual(robot._get_successful_commands(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
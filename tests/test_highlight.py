@@ -0,0 +1,111 @@
+"""Test Syntax Highlighting."""
+
+import unittest
+import warnings
+
+import typetastic
+from typetastic import highlight
+from typetastic.text_colors import TextColors
+
+
+class TestTokenize(unittest.TestCase):
+    """Test commands are split into tokens."""
+
+    def test_kinds(self):
+        """Test each kind of token is found."""
+
+        tokens = highlight.tokenize('FOO=1 ls -l "$HOME" | grep ${NAME} 2>&1')
+
+        self.assertEqual(tokens, (
+            ("variable", "FOO=1"), ("argument", " "), ("command", "ls"), ("argument", " "),
+            ("flag", "-l"), ("argument", " "), ("string", '"$HOME"'), ("argument", " "),
+            ("operator", "|"), ("argument", " "), ("command", "grep"), ("argument", " "),
+            ("variable", "${NAME}"), ("argument", " "), ("operator", "2>&1")))
+
+    def test_commands_after_operators(self):
+        """Test the first word after a list or pipe operator is a command."""
+
+        commands = [text for (kind, text) in highlight.tokenize(
+            "cd /tmp && make; echo $(date) > log") if kind == "command"]
+
+        self.assertEqual(commands, ["cd", "make", "echo", "date"])
+
+    def test_round_trip(self):
+        """Test tokens join back to the command, even when it is unfinished."""
+
+        commands = ["ls", "echo 'unclosed", 'echo "a \\" b"', "a\\ b --x=y", "", "  ", "(cd x)"]
+        for command in commands:
+            self.assertEqual("".join(text for (_, text) in highlight.tokenize(command)), command)
+
+    def test_memoized(self):
+        """Test a command is tokenized once."""
+
+        highlight.tokenize.cache_clear()
+        highlight.tokenize("uptime")
+        highlight.tokenize("uptime")
+
+        self.assertEqual(highlight.tokenize.cache_info().hits, 1)
+
+
+class TestHighlight(unittest.TestCase):
+    """Test commands are colored by theme."""
+
+    def test_highlight(self):
+        """Test each token gets its theme color, others the base color."""
+
+        self.assertEqual(highlight.highlight("ls -l | wc", "default", "red"),
+                         "\x1b[1;32mls\x1b[0;31m \x1b[0;36m-l\x1b[0;31m \x1b[0;35m|"
+                         "\x1b[0;31m \x1b[1;32mwc\x1b[0;0m")
+
+    def test_no_base_color(self):
+        """Test kinds the theme does not name are reset without a base color."""
+
+        self.assertEqual(highlight.highlight("ls -l", {"command": "blue"}),
+                         "\x1b[0;34mls\x1b[0;0m -l\x1b[0;0m")
+
+    def test_color_table(self):
+        """Test a theme's escapes are looked up once."""
+
+        table = highlight.color_table("mono", "cyan")
+
+        self.assertIs(highlight.color_table("mono", "cyan"), table)
+        self.assertEqual(table["command"], "\x1b[1;37m")
+        self.assertEqual(table["flag"], "\x1b[0;36m")
+
+    def test_unknown_theme(self):
+        """Test an unknown theme name falls back to the default, with a warning."""
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            typed = highlight.highlight("ls", "no-such-theme")
+
+        self.assertEqual(typed, highlight.highlight("ls", "default"))
+        self.assertIn("no-such-theme", str(caught[0].message))
+
+    def test_color_code_cached(self):
+        """Test color codes are worked out once per name."""
+
+        TextColors.get_color_code("bold-bright-purple")
+        hits = TextColors.get_color_code.cache_info().hits
+        self.assertEqual(TextColors.get_color_code("bold-bright-purple"), "\x1b[1;95m")
+        self.assertEqual(TextColors.get_color_code.cache_info().hits, hits + 1)
+
+
+class TestRobotTheme(unittest.TestCase):
+    """Test the typing-theme config."""
+
+    def test_plan_highlighted(self):
+        """Test shell commands are highlighted, python lines are not."""
+
+        steps = typetastic.Robot.compile_plan(
+            ["ls -l", {"python3": ["python3 -q", "print(1)"]}],
+            {"typing-color": "red", "typing-theme": "default"})
+
+        self.assertEqual(steps[0].typed, "\x1b[1;32mls\x1b[0;31m \x1b[0;36m-l\x1b[0;0m")
+        self.assertEqual(steps[1].typed, "\x1b[1;32mpython3\x1b[0;31m \x1b[0;36m-q\x1b[0;0m")
+        self.assertEqual(steps[2].typed, "\x1b[0;31mprint(1)\x1b[0;0m")
+        self.assertEqual(len(steps[0].delays), len("ls -l"))
+
+
+if __name__ == '__main__':
+    unittest.main()
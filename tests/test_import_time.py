@@ -0,0 +1,110 @@
+"""Test Import Time."""
+
+from unittest.mock import patch
+import os
+import subprocess
+import sys
+import unittest
+
+import typetastic
+from typetastic import bot_handlers
+from typetastic.lazy_module import LazyModule
+
+# imported on first use only, see LazyModule
+HEAVY_MODULES = ["yaml", "pexpect", "pexpect.pxssh", "getch", "xml.sax.saxutils", "pickle"]
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(*args):
+    """Returns the completed process of a fresh python, run from the package root."""
+    return subprocess.run([sys.executable] + list(args), cwd=PACKAGE_ROOT,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True, check=True)
+
+
+class TestImportTime(unittest.TestCase):
+    """Test importing typetastic is quick."""
+
+    def test_heavy_modules_not_imported(self):
+        """Test heavy dependencies wait until they are used.
+
+        Checked by module rather than by time, which varies too much on
+        shared CI runners to catch one eager import.
+        """
+
+        process = run_python("-c", "import sys, typetastic; print(' '.join(sys.modules))")
+        imported = process.stdout.split()
+
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, imported)
+
+
+class TestLazyModule(unittest.TestCase):
+    """Test lazily imported modules."""
+
+    def test_attribute_imports_module(self):
+        """Test the module is imported on first attribute use."""
+
+        module = LazyModule("colorsys")
+        self.assertIn("not loaded", repr(module))
+        self.assertEqual(module.rgb_to_hsv(0, 0, 0), (0, 0, 0))
+        self.assertIn("(loaded)", repr(module))
+
+    def test_submodule_attribute(self):
+        """Test a submodule is imported as an attribute."""
+
+        module = LazyModule("email")
+        self.assertEqual(module.charset.__name__, "email.charset")
+
+    def test_missing_attribute(self):
+        """Test missing attributes raise AttributeError."""
+
+        with self.assertRaises(AttributeError):
+            LazyModule("colorsys").no_such_attribute  # pylint: disable=expression-not-assigned
+
+    @patch('typetastic.bot_handlers.getch.getch')
+    def test_patch_through_lazy_module(self, mock_getch):
+        """Test mock.patch works through a lazy module."""
+
+        bot_handlers.pause_flow()
+        self.assertEqual(mock_getch.call_count, 1)
+
+    def test_patch_restores_attribute(self):
+        """Test patched attributes are put back afterwards."""
+
+        original = bot_handlers.getch.getch
+        with patch('typetastic.bot_handlers.getch.getch'):
+            self.assertIsNot(bot_handlers.getch.getch, original)
+
+        self.assertIs(bot_handlers.getch.getch, original)
+
+
+class TestYamlLoader(unittest.TestCase):
+    """Test the YAML loader used."""
+
+    def test_c_loader_when_available(self):
+        """Test the libyaml loader is used if yaml has it."""
+        # pylint: disable=protected-access
+        import yaml
+
+        expected = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        self.assertIs(typetastic.Robot._yaml_loader(), expected)
+
+    def test_safe_loader_fallback(self):
+        """Test the pure python loader is used without libyaml."""
+        # pylint: disable=protected-access
+        import yaml
+
+        c_loader = getattr(yaml, "CSafeLoader", None)
+        if c_loader:
+            del yaml.CSafeLoader
+        try:
+            self.assertIs(typetastic.Robot._yaml_loader(), yaml.SafeLoader)
+        finally:
+            if c_loader:
+                yaml.CSafeLoader = c_loader
+
+
+if __name__ == '__main__':
+    unittest.main()
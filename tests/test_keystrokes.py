@@ -0,0 +1,44 @@
+"""Test Keystroke Splitting."""
+
+import unittest
+
+from typetastic.keystrokes import split_keystrokes
+
+
+class TestSplitKeystrokes(unittest.TestCase):
+    """Test splitting text into keystrokes."""
+
+    def test_plain_text(self):
+        """Test plain text is one keystroke per character."""
+
+        self.assertEqual(split_keystrokes("ls -l"), ["l", "s", " ", "-", "l"])
+
+    def test_color_codes_are_not_keystrokes(self):
+        """Test color codes are sent with a visible keystroke."""
+
+        result = split_keystrokes("\033[0;36mls\033[0;0m")
+
+        self.assertEqual(result, ["\033[0;36ml", "s\033[0;0m"])
+
+    def test_only_escapes(self):
+        """Test text with no visible characters is one keystroke."""
+
+        self.assertEqual(split_keystrokes("\033[0;36m\033[0;0m"), ["\033[0;36m\033[0;0m"])
+        self.assertEqual(split_keystrokes(""), [])
+
+    def test_combining_marks(self):
+        """Test combining marks stay with their base character."""
+
+        self.assertEqual(split_keystrokes("cafe\u0301"), ["c", "a", "f", "e\u0301"])
+
+    def test_emoji_sequences(self):
+        """Test emoji modifier, joiner and flag sequences are one keystroke."""
+
+        thumbs_up = "\U0001F44D\U0001F3FD"
+        family = "\U0001F468\u200d\U0001F469\u200d\U0001F467"
+        flag = "\U0001F1EC\U0001F1E7"
+        heart = "\u2764\ufe0f"
+
+        result = split_keystrokes(thumbs_up + family + flag + flag + heart + "!")
+
+        self.assertEqual(result, [thumbs_up, family, flag, flag, heart, "!"])
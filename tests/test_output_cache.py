@@ -0,0 +1,192 @@
+"""Test the Output Cache and rehearsals."""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import typetastic
+from typetastic.executors import FakeExecutor
+from typetastic.output_cache import CachingExecutor, OutputCache, changes_state
+
+
+def run(executor, command):
+    """Returns the (output, exit status) of command run on executor."""
+    output = []
+    executor.send(command)
+    exit_status = executor.stream(output.append)
+    return ("".join(output), exit_status)
+
+
+class TestOutputCache(unittest.TestCase):
+    """Test outputs are stored by key."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = OutputCache(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_put_get(self):
+        """Test an entry is read back, and a missing one is a miss."""
+
+        key = OutputCache.key("uptime", "local", "/tmp", {"LANG": "C"})
+        self.assertTrue(self.cache.put(key, "up 3 days\n", 0))
+
+        self.assertEqual(self.cache.get(key), ("up 3 days\n", 0))
+        self.assertIsNone(self.cache.get(OutputCache.key("uptime", "local", "/tmp", {})))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_key(self):
+        """Test the key depends on the command, context, directory and environment."""
+
+        keys = {OutputCache.key("ls"), OutputCache.key("ls -l"), OutputCache.key("ls", "ssh"),
+                OutputCache.key("ls", cwd="/"), OutputCache.key("ls", env={"A": "1"})}
+        self.assertEqual(len(keys), 5)
+        self.assertEqual(OutputCache.key("ls", env={"A": "1", "B": "2"}),
+                         OutputCache.key("ls", env={"B": "2", "A": "1"}))
+
+    def test_ttl(self):
+        """Test an entry older than the ttl is a miss, and removed."""
+
+        self.cache.put("old", "stale\n", 0)
+        time.sleep(0.05)
+
+        self.assertEqual(self.cache.get("old", ttl=60), ("stale\n", 0))
+        self.assertIsNone(self.cache.get("old", ttl=0.01))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_lru_eviction(self):
+        """Test the least recently used entries go once over max_bytes."""
+
+        self.cache.put("size", "x" * 50, 0)
+        entry_size = os.path.getsize(self.cache._path("size"))  # pylint: disable=protected-access
+        os.unlink(self.cache._path("size"))  # pylint: disable=protected-access
+
+        cache = OutputCache(self.directory, max_bytes=int(entry_size * 3.5))
+        for (number, key) in enumerate(["a", "b", "c"]):
+            cache.put(key, "x" * 50, 0)
+            os.utime(cache._path(key), (number, number))  # pylint: disable=protected-access
+        cache.get("a")  # used, so b is the oldest
+        cache.put("d", "x" * 50, 0)
+
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("d"))
+
+
+class TestCachingExecutor(unittest.TestCase):
+    """Test commands are served from the cache when rehearsing."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = OutputCache(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_rehearse(self):
+        """Test cached commands are replayed, not run."""
+
+        recorder = FakeExecutor({"pip3 install x": ("installed\n", 0)})
+        run(CachingExecutor(recorder, self.cache, cwd="/work"), "pip3 install x")
+
+        rehearsal = FakeExecutor()
+        executor = CachingExecutor(rehearsal, self.cache, rehearse=True, cwd="/work")
+        self.assertEqual(run(executor, "pip3 install x"), ("installed\n", 0))
+        self.assertEqual(run(executor, "date"), ("", 0))
+        self.assertEqual(rehearsal.commands, ["date"])
+
+    def test_opt_out(self):
+        """Test a command not enabled always runs, and is not kept."""
+
+        fake = FakeExecutor({"date": "Mon\n"})
+        executor = CachingExecutor(fake, self.cache, rehearse=True)
+        executor.enabled = False
+        run(executor, "date")
+        run(executor, "date")
+
+        self.assertEqual(fake.commands, ["date", "date"])
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_changes_state(self):
+        """Test commands that change the shell are spotted."""
+
+        for command in ["cd sub", "X=1", "export A=1; ls", ". ./env", "f() { ls; }",
+                        "make && source venv/bin/activate", "echo 'unclosed"]:
+            self.assertTrue(changes_state(command), command)
+        for command in ["pwd", "X=1 make", "ls | grep export", "make > out.txt"]:
+            self.assertFalse(changes_state(command), command)
+
+    def test_cd_followed(self):
+        """Test the same command in another directory is another entry."""
+
+        executor = CachingExecutor(FakeExecutor(), self.cache, cwd="/work")
+        run(executor, "cd src && make")
+        self.assertEqual(executor.cwd, "/work/src")
+        run(executor, "cd /tmp")
+        self.assertEqual(executor.cwd, "/tmp")
+        run(executor, "cd $HOME")
+        run(executor, "cd build")
+        self.assertEqual(executor.cwd, "?/tmp\n$HOME\nbuild")
+
+
+class TestRobotRehearsal(unittest.TestCase):
+    """Test rehearsals of a script."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_rehearsal(self):
+        """Test a rehearsal replays a run, and runs commands opted out."""
+
+        marker = os.path.join(self.directory, "ran")
+        commands = ["echo side effect >> {0}".format(marker),
+                    {"command": "date +%N", "cache": False},
+                    "echo done"]
+        config = {"headless": True, "typing-speed": "supersonic", "output-cache": True}
+        cache = OutputCache(os.path.join(self.directory, "cache"))
+
+        robot = typetastic.Robot(output_cache=cache)
+        robot.load({"config": config, "commands": commands})
+        robot.run()
+        robot.load({"config": {"rehearse": True}})
+        robot.run()
+        robot.close()
+
+        with open(marker) as stream:
+            self.assertEqual(stream.read(), "side effect\n")
+        self.assertEqual((cache.hits, cache.misses), (2, 0))
+        self.assertEqual(len(os.listdir(cache.directory)), 2)
+        self.assertTrue(all(result["success"] for result in robot.get_results()))
+
+    def test_rehearsal_keeps_shell_state(self):
+        """Test cd and export run in a rehearsal, for the commands after them."""
+
+        sub = os.path.realpath(os.path.join(self.directory, "sub"))
+        os.mkdir(sub)
+        commands = ["cd {0}".format(sub), "export STAGE=two", "pwd",
+                    {"command": "pwd; echo $STAGE", "cache": False}]
+        config = {"headless": True, "typing-speed": "supersonic", "output-cache": True}
+        cache = OutputCache(os.path.join(self.directory, "cache"))
+
+        with typetastic.Robot(output_cache=cache) as robot:
+            robot.load({"config": config, "commands": commands})
+            robot.run()
+            robot.load({"config": {"rehearse": True}})
+            robot.run()
+
+            output = "".join(event.data for event in robot.get_timeline().events()
+                             if event.kind == "output")
+        self.assertEqual(output.count(sub), 2)
+        self.assertIn("two", output)
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+"""Test Streamed Output."""
+
+import tracemalloc
+import unittest
+
+import typetastic
+from typetastic.output_stream import OUTPUT_TAIL_SIZE, OutputFilter, OutputLimiter
+from typetastic.prompt_sentinel import SHELL_SENTINEL, clean_output
+from typetastic.shell_pool import spawn_shell
+
+
+def filtered(chunks, echo=None):
+    """Returns (written text, tail) of chunks passed through an OutputFilter."""
+    written = []
+    output_filter = OutputFilter(written.append, echo=echo)
+    for chunk in chunks:
+        output_filter.feed(chunk)
+    tail = output_filter.close()
+    return ("".join(written), tail)
+
+
+class TestOutputFilter(unittest.TestCase):
+    """Test output is cleaned chunk by chunk as it is cleaned whole."""
+
+    RAW = "line one\r\nline two  \r\n\r\n  indented\r\n\r\n  \r\n"
+
+    def test_any_split(self):
+        """Test every split of the output cleans the same."""
+
+        expected = clean_output(self.RAW) + "\n"
+        for split in range(len(self.RAW) + 1):
+            (written, _) = filtered([self.RAW[:split], self.RAW[split:]])
+            self.assertEqual(written, expected, split)
+
+    def test_one_char_chunks(self):
+        """Test output arriving a character at a time."""
+
+        (written, tail) = filtered(list(self.RAW))
+
+        self.assertEqual(written, clean_output(self.RAW) + "\n")
+        self.assertEqual(tail, clean_output(self.RAW))
+
+    def test_no_output(self):
+        """Test whitespace only output writes nothing."""
+
+        self.assertEqual(filtered(["\r\n", "  "]), ("", ""))
+
+    def test_echo_dropped(self):
+        """Test a remote echo of the command, and newlines after it, are dropped."""
+
+        (written, _) = filtered(["ec", "ho hi\r", "\nhi\r\n"], echo="echo hi")
+
+        self.assertEqual(written, "hi\n")
+
+    def test_tail_is_bounded(self):
+        """Test only the tail of the output is kept."""
+
+        (_, tail) = filtered(["x" * 1000] * 10 + ["end"])
+
+        self.assertEqual(len(tail), OUTPUT_TAIL_SIZE)
+        self.assertTrue(tail.endswith("end"))
+
+
+def limited(chunks, **limits):
+    """Returns (written text, sleeps) of chunks passed through an OutputLimiter."""
+    written = []
+    sleeps = []
+    limiter = OutputLimiter(written.append, sleep=sleeps.append, **limits)
+    for chunk in chunks:
+        limiter.feed(chunk)
+    limiter.close()
+    return ("".join(written), sleeps)
+
+
+class TestOutputLimiter(unittest.TestCase):
+    """Test output is cut to a head and tail, and paced."""
+
+    LINES = "".join("{0}\n".format(number) for number in range(1, 1001))
+
+    def test_unlimited(self):
+        """Test output passes through without limits."""
+
+        self.assertEqual(limited([self.LINES[:7], self.LINES[7:]]), (self.LINES, []))
+
+    def test_max_lines(self):
+        """Test the first and last lines are shown around a marker."""
+
+        for size in (1, 5, 4096):
+            chunks = [self.LINES[start:start + size] for start in range(0, len(self.LINES), size)]
+            (written, _) = limited(chunks, max_lines=5)
+            self.assertEqual(written, "1\n2\n3\n... 995 lines not shown ...\n999\n1000\n")
+
+    def test_within_limits(self):
+        """Test output within the limits is shown whole, without a marker."""
+
+        (written, _) = limited([self.LINES], max_lines=1000, max_bytes=10000)
+
+        self.assertEqual(written, self.LINES)
+
+    def test_max_bytes(self):
+        """Test a byte budget keeps the start and end of one long line."""
+
+        (written, _) = limited(["a" * 5000, "b" * 5000], max_bytes=10)
+
+        self.assertEqual(written, "aaaaa\n... 9,990 bytes not shown ...\nbbbbb")
+
+    def test_bounded_memory(self):
+        """Test the ring buffer holds no more than the tail."""
+
+        limiter = OutputLimiter(lambda text: None, max_lines=10, max_bytes=100)
+        tracemalloc.start()
+        for _ in range(2000):
+            limiter.feed("x" * 99 + "\n")
+        (_, peak) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.assertLess(peak, 20000)
+        self.assertEqual(limiter.dropped_lines, 2000 - 1)
+
+    def test_rate(self):
+        """Test each line shown is followed by a pause."""
+
+        (written, sleeps) = limited(["a\nb\nc\nd\n"], max_lines=2, rate=10)
+
+        self.assertEqual(written, "a\n... 2 lines not shown ...\nd\n")
+        self.assertEqual(sleeps, [0.1] * 3)
+
+
+class TestRobotOutputOptions(unittest.TestCase):
+    """Test output options from the config and per command."""
+
+    def test_per_command_options(self):
+        """Test a command's own options override the config."""
+
+        robot = typetastic.Robot()
+        robot.load({"config": {"headless": True, "output-max-lines": 2}})
+        robot.load(["seq 1 100", {"command": "seq 1 1000", "output-max-lines": 4}])
+        robot.run()
+        robot.close()
+
+        output = "".join(event.data for event in robot.get_timeline().events()
+                         if event.kind == "output")
+
+        self.assertIn("1\n... 98 lines not shown ...\n100\n", output)
+        self.assertIn("1\n2\n... 996 lines not shown ...\n999\n1000\n", output)
+        self.assertEqual([result["command"] for result in robot.get_results()],
+                         ["seq 1 100", "seq 1 1000"])
+
+
+class TestStream(unittest.TestCase):
+    """Test output is streamed from a shell up to the sentinel."""
+
+    def setUp(self):
+
+        self.session = spawn_shell()
+
+    def tearDown(self):
+
+        self.session.close(force=True)
+
+    def test_exit_status(self):
+        """Test output and exit status are read back."""
+
+        written = []
+        self.session.sendline("echo hello; false")
+        exit_status = SHELL_SENTINEL.stream(self.session, written.append)
+
+        self.assertEqual(exit_status, 1)
+        self.assertEqual("".join(written), "hello\r\n")
+
+    def test_large_output_constant_memory(self):
+        """Test megabytes of output stream in chunks, without being held."""
+
+        chunks = []
+        total = [0]
+
+        def write(text):
+            chunks.append(len(text))
+            total[0] += len(text)
+
+        tracemalloc.start()
+        self.session.sendline("head -c 8000000 /dev/zero | tr '\\0' 'y'")
+        exit_status = SHELL_SENTINEL.stream(self.session, write)
+        (_, peak) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.assertEqual(exit_status, 0)
+        self.assertEqual(total[0], 8000000)
+        self.assertGreater(len(chunks), 1)
+        self.assertLess(peak, 2000000)
+
+
+if __name__ == '__main__':
+    unittest.main()
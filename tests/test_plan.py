@@ -0,0 +1,143 @@
+"""Test Compiled Plans."""
+
+from unittest.mock import patch
+import os
+import shutil
+import tempfile
+import unittest
+
+import typetastic
+from typetastic import bot_handlers
+from typetastic.plan import PlanCache
+
+
+class TestCompilePlan(unittest.TestCase):
+    """Test commands compile to steps."""
+
+    def setUp(self):
+
+        self.robot = typetastic.Robot()
+        self.robot.load("tests/data/typetastic-ssh-command-set.yaml")
+
+    def test_steps(self):
+        """Test each command becomes a step with its block context."""
+        # pylint: disable=protected-access
+
+        steps = self.robot._get_plan()
+
+        self.assertIsInstance(steps, tuple)
+        self.assertEqual([step.number for step in steps], list(range(1, 7)))
+        self.assertEqual([step.block for step in steps],
+                         ["local", "ssh", "ssh", "ssh", "ssh", "local"])
+        self.assertTrue(steps[1].block_start)
+        self.assertTrue(steps[4].block_end)
+        self.assertFalse(steps[2].block_start or steps[2].block_end)
+        self.assertEqual(steps[1].target.host, "cardkist.com")
+        self.assertEqual(steps[1].handler, bot_handlers.bot_handler_ssh)
+        self.assertEqual(steps[4].handler, bot_handlers.bot_handler_exit)
+
+    def test_typed_string_and_schedule(self):
+        """Test the typed string and a delay per keystroke are precomputed."""
+        # pylint: disable=protected-access
+
+        step = self.robot._get_plan()[0]
+
+        self.assertEqual(step.typed, "\x1b[0;31mls /etc/hosts\x1b[0;0m")
+        self.assertEqual(len(step.delays), len("ls /etc/hosts"))
+
+    def test_ctrl_d_typed(self):
+        """Test CTRL_D in a python3 block types ^D."""
+
+        steps = typetastic.Robot.compile_plan(
+            [{"python3": ["python3", "CTRL_D"]}], {"typing-color": "red"})
+
+        self.assertEqual(steps[1].typed, "\x1b[0;31m^D\x1b[0;0m")
+
+    def test_config_change_recompiles(self):
+        """Test a plan is compiled again when typing config changes."""
+        # pylint: disable=protected-access
+
+        first = self.robot._get_plan()
+        self.assertIs(self.robot._get_plan(), first)
+
+        self.robot.load({"config": {"typing-color": "green"}})
+        self.assertEqual(self.robot._get_plan()[0].typed, "\x1b[0;32mls /etc/hosts\x1b[0;0m")
+
+
+class TestPlanCache(unittest.TestCase):
+    """Test plans are cached on disk."""
+
+    def setUp(self):
+
+        self.cache_dir = tempfile.mkdtemp()
+        self.path = "tests/data/typetastic-simple-command-set.yaml"
+
+    def tearDown(self):
+
+        shutil.rmtree(self.cache_dir)
+
+    def test_cache_hit_skips_parsing(self):
+        """Test a second load comes from the cache, without parsing YAML."""
+        # pylint: disable=protected-access
+
+        first = typetastic.Robot(plan_cache=PlanCache(self.cache_dir))
+        first.load(self.path)
+
+        cache = PlanCache(self.cache_dir)
+        robot = typetastic.Robot(plan_cache=cache)
+        with patch.object(typetastic.Robot, "_load_file") as mock_load_file:
+            robot.load(self.path)
+
+        self.assertEqual(mock_load_file.call_count, 0)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(robot._get_data()["commands"], ["ls", "ls /etc/hosts", "uptime"])
+        self.assertEqual(robot._get_config()["typing-color"], "red")
+        self.assertEqual(robot._get_plan(), first._get_plan())
+
+    def test_key_depends_on_config(self):
+        """Test typing config is part of the key."""
+
+        source = b"commands: [ls]"
+        self.assertEqual(PlanCache.key(source, {"typing-color": "red"}),
+                         PlanCache.key(source, {"typing-color": "red", "headless": True}))
+        self.assertNotEqual(PlanCache.key(source, {"typing-color": "red"}),
+                            PlanCache.key(source, {"typing-color": "blue"}))
+        self.assertNotEqual(PlanCache.key(source, {}), PlanCache.key(b"commands: [ps]", {}))
+
+    def test_unreadable_entry_is_a_miss(self):
+        """Test a corrupt cache file is ignored."""
+
+        cache = PlanCache(self.cache_dir)
+        (key, _) = cache.lookup(self.path, {})
+        with open(os.path.join(self.cache_dir, key + ".pickle"), "w") as stream:
+            stream.write("not a pickle")
+
+        robot = typetastic.Robot(plan_cache=cache)
+        robot.load(self.path)
+
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(cache.misses, 2)
+
+    def test_cached_plan_runs(self):
+        """Test a cached plan runs its commands."""
+        # pylint: disable=protected-access
+
+        typetastic.Robot(plan_cache=PlanCache(self.cache_dir)).load(self.path)
+
+        cache = PlanCache(self.cache_dir)
+        with patch('typetastic.bot_handlers.bot_handler_default') as mock_bot_handler_default:
+            mock_bot_handler_default.return_value = True
+
+            robot = typetastic.Robot(plan_cache=cache)
+            robot.load(self.path)
+            robot.load({"config": {"pexpect-delay": 0, "headless": True}})
+            robot.run()
+            robot.close()
+
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(mock_bot_handler_default.call_count, 3)
+        self.assertEqual(robot._get_successful_commands(), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
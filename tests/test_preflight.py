@@ -0,0 +1,198 @@
+"""Test Preflight Checks."""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import pexpect
+from pexpect import pxssh
+
+import typetastic
+from typetastic.preflight import CommandScan, Problem, Shell, scan_command
+from typetastic.shell_pool import ShellPool
+from typetastic.ssh_pool import SSHPool
+
+
+class LocalSSH(pexpect.spawn):
+    """Stand in for pxssh and sshd, logging in to a local shell."""
+
+    login_delay = 0
+
+    def __init__(self):
+        super().__init__(None, timeout=10, encoding="utf-8")
+
+    def login(self, server, username=None, port=None, ssh_key=None):
+        # pylint: disable=unused-argument
+        """Starts a local shell in place of a remote one, or refuses."""
+        time.sleep(self.login_delay)
+        if server == "refused":
+            raise pxssh.ExceptionPxssh("permission denied")
+        self._spawn("/bin/sh")
+        return True
+
+    def logout(self):
+        """Exits the local shell."""
+        self.sendline("exit")
+        self.expect(pexpect.EOF)
+        self.close()
+
+
+class SlowSSH(LocalSSH):
+    """A LocalSSH that takes a while to log in."""
+
+    login_delay = 0.5
+
+
+class TestScanCommand(unittest.TestCase):
+    """Test finding what a command line needs."""
+
+    def test_names(self):
+        """Test commands of pipelines and lists are found."""
+
+        scan = scan_command("FOO=1 ls -l | grep x && if true; then sort; fi")
+        self.assertEqual(scan.names, ["ls", "grep", "true", "sort"])
+
+    def test_files(self):
+        """Test files read and written are found."""
+
+        scan = scan_command("head -n 5 notes.md 2>/dev/null; wc < in.txt > out.txt; ./run.sh")
+        self.assertEqual(scan.reads, ["notes.md", "in.txt", "./run.sh"])
+        self.assertEqual(scan.writes, ["/dev/null", "out.txt"])
+
+    def test_dynamic_words(self):
+        """Test variables and globs are not checked."""
+
+        scan = scan_command("for name in *.txt; do cat $name; done")
+        self.assertEqual(scan, CommandScan(["cat"], [], [], None))
+
+    def test_cd(self):
+        """Test a change of directory is found."""
+
+        self.assertEqual(scan_command("cd /tmp").cd, "/tmp")
+        self.assertEqual(scan_command("cd").cd, "~")
+
+    def test_unclosed_quote(self):
+        """Test an unclosed quote is an error."""
+
+        with self.assertRaises(ValueError):
+            scan_command("echo 'oops")
+
+
+class TestShell(unittest.TestCase):
+    """Test paths are followed through a shell's commands."""
+
+    def test_paths(self):
+        """Test paths are resolved, and files written earlier are not checked."""
+
+        shell = Shell("/home/demo")
+        shell.add(1, scan_command("echo hi > made.txt"))
+        shell.add(2, scan_command("cat made.txt notes.txt"))
+        shell.add(3, scan_command("cd ../other"))
+        shell.add(4, scan_command("cat ~/a /etc/b c"))
+        shell.add(5, scan_command("cd -"))
+        shell.add(6, scan_command("cat d"))
+
+        self.assertEqual(list(shell.files.items()), [
+            ("/home/demo/notes.txt", 2), ("~/a", 4), ("/etc/b", 4), ("/home/other/c", 4)])
+
+
+class TestRobotPreflight(unittest.TestCase):
+    """Test checking a script before running it."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.present = os.path.join(self.directory, "present.txt")
+        with open(self.present, "w") as stream:
+            stream.write("here\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_local_problems(self):
+        """Test all problems of the local shell are found at once."""
+
+        robot = typetastic.Robot()
+        robot.load(["ls", "tt-no-such-command --help", "NEWLINE", "cat {0} {1}".format(
+            self.present, os.path.join(self.directory, "absent.txt")), "echo 'oops"])
+
+        problems = robot.preflight()
+        robot.close()
+
+        self.assertEqual(problems, [
+            Problem(2, "tt-no-such-command --help", None,
+                    "command not found: tt-no-such-command"),
+            Problem(4, "cat {0} {1}".format(self.present,
+                                            os.path.join(self.directory, "absent.txt")),
+                    None, "no such file: {0}".format(os.path.join(self.directory, "absent.txt"))),
+            Problem(5, "echo 'oops", None, "can not parse: No closing quotation")
+        ])
+
+    def test_no_problems(self):
+        """Test a good script has no problems, and still runs."""
+
+        robot = typetastic.Robot(ssh_pool=SSHPool(factory=LocalSSH))
+        robot.load({"commands": ["cat {0}".format(self.present), {"ssh": [
+            "ssh demo@localhost", "cat {0}".format(self.present), "exit"]}],
+                    "config": {"headless": True, "typing-speed": "supersonic"}})
+
+        self.assertEqual(robot.preflight(), [])
+        robot.run()
+        robot.close()
+        self.assertEqual(robot._get_successful_commands(), 4)  # pylint: disable=protected-access
+
+    def test_python_missing(self):
+        """Test the interpreter starting a python3 block is looked up."""
+
+        empty = os.path.join(self.directory, "bin")
+        os.mkdir(empty)
+        path = os.environ["PATH"]
+        os.environ["PATH"] = empty
+        try:
+            robot = typetastic.Robot(pool=ShellPool(shell="/bin/bash --norc"))
+            robot.load([{"python3": ["python3 -q", "import tt_no_such_module", "CTRL_D"]}])
+            problems = robot.preflight()
+            robot.close()
+        finally:
+            os.environ["PATH"] = path
+
+        self.assertEqual(problems, [
+            Problem(1, "python3 -q", None, "command not found: python3")])
+
+    def test_ssh_problems(self):
+        """Test ssh targets are logged in to, and checked remotely."""
+
+        robot = typetastic.Robot(ssh_pool=SSHPool(factory=LocalSSH))
+        robot.load([
+            {"ssh": ["ssh demo@localhost", "tt-no-such-command", "cd /", "cat etc/tt-absent"]},
+            {"ssh": ["ssh demo@refused", "ls"]}
+        ])
+
+        problems = robot.preflight()
+        robot.close()
+
+        self.assertEqual(problems, [
+            Problem(2, "tt-no-such-command", "localhost", "command not found: tt-no-such-command"),
+            Problem(4, "cat etc/tt-absent", "localhost", "no such file: /etc/tt-absent"),
+            Problem(5, "ssh demo@refused", "refused", "ssh login failed: permission denied")
+        ])
+
+    def test_hosts_checked_in_parallel(self):
+        """Test slow logins to several hosts overlap."""
+
+        pool = ShellPool()
+        pool.prewarm()
+
+        robot = typetastic.Robot(pool=pool, ssh_pool=SSHPool(factory=SlowSSH))
+        robot.load([{"ssh": ["ssh demo@host{0}".format(number), "ls"]} for number in range(4)])
+        started = time.monotonic()
+        self.assertEqual(robot.preflight(), [])
+        elapsed = time.monotonic() - started
+        robot.close()
+
+        self.assertLess(elapsed, 2 * SlowSSH.login_delay)
+
+
+if __name__ == '__main__':
+    unittest.main()
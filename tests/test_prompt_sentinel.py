@@ -0,0 +1,81 @@
+"""Test Prompt Sentinel."""
+
+import time
+import unittest
+
+import typetastic
+from typetastic.prompt_sentinel import PromptSentinel, SHELL_SENTINEL, clean_output
+
+
+class TestPromptSentinel(unittest.TestCase):
+    """Test waiting for the prompt sentinel."""
+
+    def setUp(self):
+        self.session = typetastic.Robot.setup_shell("$ ")
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_marker_is_unique(self):
+        """Test each sentinel gets its own marker."""
+
+        self.assertNotEqual(PromptSentinel().prefix, PromptSentinel().prefix)
+        self.assertEqual(PromptSentinel("abc").prefix, "\x1ett-abc:")
+
+    def test_wait_returns_output(self):
+        """Test output before the sentinel is returned."""
+
+        self.session.sendline("echo hello")
+        result = SHELL_SENTINEL.wait(self.session)
+
+        self.assertEqual(clean_output(result.output), "hello")
+        self.assertEqual(result.exit_status, 0)
+
+    def test_wait_slow_command(self):
+        """Test commands slower than the old fixed delay are not cut short."""
+
+        self.session.sendline("sleep 0.5; echo done")
+        result = SHELL_SENTINEL.wait(self.session)
+
+        self.assertEqual(clean_output(result.output), "done")
+
+    def test_wait_has_no_fixed_delay(self):
+        """Test a fast command returns well under the old 0.2s delay."""
+
+        start = time.monotonic()
+        self.session.sendline("true")
+        SHELL_SENTINEL.wait(self.session)
+
+        self.assertLess(time.monotonic() - start, 0.2)
+
+    def test_echo_ps1_does_not_match(self):
+        """Test printing PS1 itself is not mistaken for the prompt."""
+
+        self.session.sendline("echo $PS1")
+        result = SHELL_SENTINEL.wait(self.session)
+
+        self.assertIn("$?", result.output)
+
+    def test_wait_returns_exit_status(self):
+        """Test the full 0-255 exit status range is returned."""
+
+        for status in [0, 1, 2, 127, 255]:
+            self.session.sendline("(exit {0})".format(status))
+            result = SHELL_SENTINEL.wait(self.session)
+            self.assertEqual(result.exit_status, status)
+
+    def test_shell_ends(self):
+        """Test a shell ending before the sentinel gives no exit status."""
+
+        self.session.sendline("echo bye; exec true")
+        output = []
+        self.assertIsNone(SHELL_SENTINEL.stream(self.session, output.append))
+        self.assertIn("bye", "".join(output))
+        self.assertIsNone(SHELL_SENTINEL.wait(self.session).exit_status)
+
+    def test_wait_timeout(self):
+        """Test a command still running at the timeout gives no exit status."""
+
+        self.session.sendline("sleep 5")
+        self.assertIsNone(SHELL_SENTINEL.wait(self.session, timeout=0.1).exit_status)
+        self.assertIsNone(SHELL_SENTINEL.stream(self.session, print, timeout=0.1))
@@ -0,0 +1,123 @@
+"""Test the Python REPL engine."""
+
+import unittest
+
+import typetastic
+from typetastic import python_repl
+from typetastic.python_repl import PythonREPL
+from typetastic.shell_pool import spawn_shell
+
+
+class TestPythonREPL(unittest.TestCase):
+    """Test statements run in python3 through sentinel prompts."""
+
+    def setUp(self):
+        self.session = spawn_shell()
+        self.repl = PythonREPL(self.session)
+        self.output = []
+
+    def tearDown(self):
+        self.session.close(force=True)
+
+    def test_statements(self):
+        """Test a statement's output and status are read back."""
+
+        self.assertEqual(self.repl.start("python3 -q", self.output.append), python_repl.READY)
+        self.assertEqual(self.repl.prompt(), ">>> ")
+
+        self.assertEqual(self.repl.send("print('>>> ' * 2)", self.output.append),
+                         python_repl.READY)
+        self.assertEqual("".join(self.output).strip(), ">>> >>>")
+
+    def test_exception(self):
+        """Test a statement raising an exception is found."""
+
+        self.repl.start("python3 -q", self.output.append)
+
+        self.assertEqual(self.repl.send("1 / 0", self.output.append), python_repl.FAILED)
+        self.assertIn("ZeroDivisionError", "".join(self.output))
+        self.assertEqual(self.repl.send("pass", self.output.append), python_repl.READY)
+
+    def test_continuation(self):
+        """Test statements of several lines are followed."""
+
+        self.repl.start("python3 -q", self.output.append)
+
+        self.assertEqual(self.repl.send("def f():", self.output.append),
+                         python_repl.CONTINUATION)
+        self.assertEqual(self.repl.prompt(), "... ")
+        self.assertEqual(self.repl.send("    raise ValueError", self.output.append),
+                         python_repl.CONTINUATION)
+        self.assertEqual(self.repl.send("", self.output.append), python_repl.READY)
+        self.assertEqual(self.repl.send("f()", self.output.append), python_repl.FAILED)
+
+    def test_exit(self):
+        """Test the shell's exit status is read once python3 exits."""
+
+        self.repl.start("python3 -q", self.output.append)
+
+        self.assertEqual(self.repl.send("import sys; sys.exit(3)", self.output.append), 3)
+        self.assertFalse(self.repl.running)
+        self.assertIsNone(self.repl.prompt())
+
+    def test_failed_start(self):
+        """Test a python3 that does not start gives the shell exit status."""
+
+        self.assertEqual(self.repl.start("python3 --no-such-option", self.output.append), 2)
+        self.assertFalse(self.repl.running)
+
+
+class TestRobotPythonBlock(unittest.TestCase):
+    """Test python3 blocks run through the REPL engine."""
+
+    def test_block(self):
+        """Test multi-line statements and exceptions, per statement."""
+        # pylint: disable=protected-access
+
+        robot = typetastic.Robot()
+        robot.load({
+            "config": {"headless": True, "typing-speed": "supersonic"},
+            "commands": [{"python3": [
+                "python3 -q",
+                "def square(n):\n    return n * n\n",
+                "square(4)",
+                "square(None)",
+                "CTRL_D"
+            ]}, "echo done"]
+        })
+        robot.run()
+        robot.close()
+
+        self.assertEqual([(result["success"], result["exit_status"])
+                          for result in robot.get_results()],
+                         [(True, 0), (True, 0), (True, 0), (False, 1), (True, 0), (True, 0)])
+
+        screen = "".join(event.data for event in robot.get_timeline().events()
+                         if event.kind in ("type", "output", "prompt"))
+        self.assertIn("... ", screen)
+        self.assertIn("16\n>>> ", screen)
+        self.assertIn("TypeError", screen)
+        self.assertTrue(screen.rstrip().endswith("done\n$"))
+
+    def test_lost_session(self):
+        """Test statements after the shell is lost fail, with no exit status."""
+
+        with typetastic.Robot() as robot:
+            robot.load({
+                "config": {"headless": True, "typing-speed": "supersonic"},
+                "commands": [{"python3": [
+                    "python3 -q",
+                    "import os; os.kill(os.getppid(), 9); os._exit(0)",
+                    "print(1)",
+                    "CTRL_D"
+                ]}]
+            })
+            robot.run()
+
+        self.assertEqual([(result["success"], result["exit_status"])
+                          for result in robot.get_results()],
+                         [(True, 0), (False, None), (False, None), (False, None)])
+
+
+if __name__ == '__main__':
+    unittest.main()
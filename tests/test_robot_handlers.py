@@ -76,6 +76,15 @@ class TestHandlers(unittest.TestCase):
         result = bothan.run_command(self.handler_data)
         self.assertFalse(result)
 
+    def test_run_command_exit_status(self):
+        """Test the exit status is kept in handler data."""
+
+        self.handler_data["command"] = "(exit 200)"
+        result = bothan.run_command(self.handler_data)
+
+        self.assertFalse(result)
+        self.assertEqual(self.handler_data["exit_status"], 200)
+
     @patch('typetastic.bot_handlers.pause_flow')
     def test_editor_command(self, mock_pause_flow):
         """Test editor command calls pause_flow()."""
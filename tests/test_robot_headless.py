@@ -0,0 +1,83 @@
+"""Test Headless Runs."""
+
+from io import StringIO
+from unittest.mock import patch
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+import typetastic
+from typetastic.timeline import Timeline
+
+
+class TestHeadlessRun(unittest.TestCase):
+    """Test headless runs record a timeline without waiting."""
+
+    def setUp(self):
+
+        self.robot = typetastic.Robot()
+        self.robot.load({"config": {
+            "headless": True,
+            "prompt-string": "$ ",
+            "typing-speed": "slow"
+        }})
+
+    @patch('typetastic.bot_handlers.getch.getch')
+    def test_headless_run(self, mock_getch):
+        """Test a slow script runs in less than its virtual time."""
+        # pylint: disable=protected-access
+
+        self.robot.load(["echo hello", "PAUSE", "echo world"])
+
+        temp_output = StringIO()
+        start = time.monotonic()
+
+        sys.stdout = temp_output
+        self.robot.run()
+        sys.stdout = sys.__stdout__
+
+        events = self.robot.get_timeline().events()
+
+        self.assertEqual(self.robot._get_successful_commands(), 3)
+        self.assertEqual(mock_getch.call_count, 0)
+        self.assertEqual(temp_output.getvalue(), "")
+        # slow typing is at least 0.1s per keystroke
+        self.assertGreater(events[-1].time, 2.0)
+        self.assertLess(time.monotonic() - start, events[-1].time)
+
+    def test_headless_events(self):
+        """Test the timeline has the typed text, output and prompts."""
+
+        self.robot.load(["echo hello"])
+        self.robot.run()
+
+        events = self.robot.get_timeline().events()
+        kinds = [event.kind for event in events]
+        typed = "".join(event.data for event in events if event.kind == "type")
+        # output is recorded as it streams in, in one or more events
+        output = "".join(event.data for event in events if event.kind == "output")
+
+        self.assertEqual(kinds[0], "prompt")
+        self.assertIn("echo hello", typed)
+        self.assertTrue(output.startswith("hello\n"))
+        self.assertIn("exit_status", kinds)
+        self.assertEqual(sorted(events, key=lambda event: event.time), events)
+
+    def test_event_file(self):
+        """Test the event stream is written to the event-file."""
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            event_file = os.path.join(temp_dir, "events.jsonl")
+
+            self.robot.load({"config": {"event-file": event_file}, "commands": ["true"]})
+            self.robot.run()
+
+            events = Timeline.read(event_file)
+
+        recorded = self.robot.get_timeline().events()
+        self.assertEqual(len(events), len(recorded))
+        for (event, original) in zip(events, recorded):
+            self.assertEqual(event[1:], original[1:])
+            self.assertAlmostEqual(event.time, original.time, places=5)
@@ -32,12 +32,29 @@ class TestLoadData(unittest.TestCase):
 
         data = {
             "config": {
+                "cast-file": None,
+                "cast-pause-gap": 2.0,
+                "cast-pause-marker": False,
+                "checkpoint-file": None,
+                "event-file": None,
+                "executor": "pty",
+                "headless": False,
                 "local-prompt": "$ ",
+                "output-max-bytes": None,
+                "output-max-lines": None,
+                "output-cache": False,
+                "output-cache-env": None,
+                "output-cache-ttl": None,
+                "output-rate": None,
                 "pexpect-delay": 0.2,  # delay required for response to be read
                 "prompt-string": "$ ",
+                "rehearse": False,
                 "remote-prompt": "[ssh] $ ",
+                "svg-file": None,
+                "trace-file": None,
                 "typing-color": "cyan",
-                "typing-speed": "moderate"
+                "typing-speed": "moderate",
+                "typing-theme": None
             },
             "commands": ["echo 'Hello, World!'", "ls"]
         }
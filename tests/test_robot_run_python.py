@@ -46,4 +46,4 @@ class TestPythonCommandRunner(unittest.TestCase):
         robot.load(data_file)
         robot.run()
 
-        self.assertEqual(robot._get_successful_commands(), 5)
+        self.assertEqual(robot._get_successful_commands(), 6)
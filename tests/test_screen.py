@@ -0,0 +1,53 @@
+"""Test Screen State."""
+
+import unittest
+
+from typetastic.screen import Screen, DEFAULT_STYLE
+
+
+class TestScreen(unittest.TestCase):
+    """Test the terminal screen model."""
+
+    def text(self, screen):
+        """Returns the screen rows as plain strings."""
+        return ["".join(text for (_, text) in row) for row in screen.snapshot()]
+
+    def test_plain_text(self):
+        """Test lines of text land on rows."""
+
+        screen = Screen(20, 3)
+        screen.feed("$ ls\r\nfile.txt\r\n$ ")
+
+        self.assertEqual(self.text(screen), ["$ ls", "file.txt", "$"])
+
+    def test_colors(self):
+        """Test SGR colors are kept as runs."""
+
+        screen = Screen(20, 2)
+        screen.feed("$ \033[1;36mls\033[0;0m")
+
+        self.assertEqual(screen.snapshot()[0], ((DEFAULT_STYLE, "$ "), ((36, True), "ls")))
+
+    def test_scroll_and_wrap(self):
+        """Test long lines wrap and the screen scrolls."""
+
+        screen = Screen(4, 2)
+        screen.feed("abcdef\r\ng")
+
+        self.assertEqual(self.text(screen), ["ef", "g"])
+
+    def test_clear(self):
+        """Test clear empties the screen."""
+
+        screen = Screen(10, 2)
+        screen.feed("hello\r\n\033[H\033[2J\033[3Jx")
+
+        self.assertEqual(self.text(screen), ["x", ""])
+
+    def test_erase_line(self):
+        """Test erasing to the end of the line."""
+
+        screen = Screen(10, 1)
+        screen.feed("hello\r\033[1C\033[K")
+
+        self.assertEqual(self.text(screen), ["h"])
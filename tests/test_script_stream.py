@@ -0,0 +1,117 @@
+"""Test Streamed Scripts."""
+
+from unittest.mock import patch
+import glob
+import os
+import shutil
+import tempfile
+import unittest
+
+import yaml
+
+import typetastic
+from typetastic.script_stream import ScriptError, ScriptStream
+
+
+class TestScriptStream(unittest.TestCase):
+    """Test commands are read from a script as they are parsed."""
+
+    def setUp(self):
+
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+
+        shutil.rmtree(self.temp_dir)
+
+    def write_script(self, text):
+        """Returns the path of a script file holding text."""
+        path = os.path.join(self.temp_dir, "script.yaml")
+        with open(path, "w") as stream:
+            stream.write(text)
+        return path
+
+    def test_matches_full_load(self):
+        """Test streamed scripts read the same as loading them whole."""
+
+        for path in glob.glob("tests/data/typetastic-*.yaml"):
+            with open(path) as stream:
+                data = yaml.safe_load(stream)
+
+            if not isinstance(data["commands"], list):
+                self.assertRaises(ScriptError, ScriptStream, path)
+                continue
+
+            script = ScriptStream(path)
+            self.assertEqual(script.config, data["config"], path)
+            self.assertEqual(list(script), data["commands"], path)
+
+    def test_pure_python_loader(self):
+        """Test the pure python loader reads the same commands."""
+
+        path = "tests/data/typetastic-python-command-set.yaml"
+        self.assertEqual(list(ScriptStream(path, yaml.SafeLoader)), list(ScriptStream(path)))
+
+    def test_config_after_commands(self):
+        """Test config is read up front, even after the commands."""
+
+        path = self.write_script("commands:\n  - ls\n  - uptime\nconfig:\n  headless: true\n")
+        script = ScriptStream(path)
+
+        self.assertEqual(script.config, {"headless": True})
+        self.assertEqual(list(script), ["ls", "uptime"])
+
+    def test_commands_before_parse_error(self):
+        """Test commands are yielded before later parts of the file are parsed."""
+
+        path = self.write_script("config:\n  headless: true\ncommands:\n  - ls\n  - [unclosed\n")
+        commands = iter(ScriptStream(path))
+
+        self.assertEqual(next(commands), "ls")
+        with self.assertRaises(ScriptError):
+            next(commands)
+
+    def test_invalid_scripts(self):
+        """Test scripts that are not mappings of config and commands are refused."""
+
+        for text in ["- ls\n", "config: [ls]\n", "commands: ls\n", "", "other: 1\n"]:
+            with self.assertRaises(ScriptError, msg=text):
+                ScriptStream(self.write_script(text))
+
+    @patch('typetastic.bot_handlers.bot_handler_default')
+    def test_robot_runs_stream(self, mock_bot_handler_default):
+        """Test the robot runs streamed commands with the script config."""
+        # pylint: disable=protected-access
+
+        mock_bot_handler_default.return_value = True
+
+        robot = typetastic.Robot()
+        robot.load(ScriptStream("tests/data/typetastic-simple-command-set.yaml"))
+        robot.load({"config": {"pexpect-delay": 0, "headless": True}})
+
+        self.assertEqual(robot._get_config()["typing-color"], "red")
+
+        robot.run()
+        robot.close()
+
+        self.assertEqual(mock_bot_handler_default.call_count, 3)
+        self.assertEqual(robot.get_summary(), {"commands": 3, "successful": 3, "failed": 0})
+
+    @patch('typetastic.bot_handlers.bot_handler_default')
+    def test_robot_keeps_failures(self, mock_bot_handler_default):
+        """Test a streamed run keeps counts and failed results only, no timeline."""
+
+        mock_bot_handler_default.side_effect = [True, False, True]
+
+        with typetastic.Robot() as robot:
+            robot.load(ScriptStream("tests/data/typetastic-simple-command-set.yaml"))
+            robot.load({"config": {"pexpect-delay": 0, "headless": True}})
+            robot.run()
+
+        self.assertEqual([result["step"] for result in robot.get_results()], [2])
+        self.assertEqual(robot.get_summary(), {"commands": 3, "successful": 2, "failed": 1})
+        self.assertIsNone(robot.get_timeline())
+
+
+if __name__ == '__main__':
+    unittest.main()
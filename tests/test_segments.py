@@ -0,0 +1,147 @@
+"""Test scripts rendered in segments."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import typetastic
+from typetastic import segments
+from typetastic.timeline import Event
+
+
+def event_text(path):
+    """Returns the text on screen of an event file."""
+    with open(path) as stream:
+        events = [json.loads(line) for line in stream]
+    return "".join(event["data"] for event in events
+                   if event["kind"] in ("type", "output", "prompt"))
+
+
+class TestSplit(unittest.TestCase):
+    """Test plans and runs are cut into segments."""
+
+    def test_split(self):
+        """Test segments end on PAUSE and editor steps."""
+
+        steps = typetastic.Robot.compile_plan(
+            ["echo a", "PAUSE", "echo b", "vi notes", "echo c"], {})
+
+        self.assertEqual(segments.split(steps), [
+            segments.Segment(1, 1, 2), segments.Segment(2, 3, 4), segments.Segment(3, 5, 5)])
+        self.assertEqual(segments.split(steps[:2]), [segments.Segment(1, 1, 2)])
+
+    def test_segment_path(self):
+        """Test segment files are numbered before the extension."""
+
+        self.assertEqual(segments.segment_path("out/demo.cast", 2), "out/demo.2.cast")
+        self.assertEqual(segments.segment_path("demo", 3), "demo.3")
+
+    def test_split_stitch(self):
+        """Test a run cut into segments is stitched back together."""
+
+        events = [Event(0.0, "prompt", "$ "), Event(0.5, "type", "a"), Event(1.0, "pause", ""),
+                  Event(1.5, "prompt", "$ "), Event(1.5, "type", "b"), Event(2.5, "output", "b\n"),
+                  Event(3.0, "prompt", "$ "), Event(3.5, "output", "\n")]
+        pieces = segments.split_events(events)
+
+        self.assertEqual([len(piece) for piece in pieces], [4, 5])
+        self.assertEqual(pieces[1][0], Event(0.0, "prompt", "$ "))
+
+        pieces[0].append(Event(1.6, "output", "\n"))  # ends a segment's own run
+        self.assertEqual(segments.stitch(pieces), events)
+
+
+class TestRenderSegments(unittest.TestCase):
+    """Test a robot renders segments."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config = {"typing-speed": "supersonic",
+                       "event-file": os.path.join(self.directory, "demo.jsonl"),
+                       "cast-file": os.path.join(self.directory, "demo.cast"),
+                       "checkpoint-file": os.path.join(self.directory, "checkpoints.jsonl")}
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_render(self):
+        """Test the first render records checkpoints, and the next runs from them."""
+
+        commands = ["cd /tmp", "export STAGE=two", "PAUSE",
+                    "echo $STAGE $PWD", "PAUSE", "echo end"]
+        robot = typetastic.Robot()
+        robot.load({"config": self.config, "commands": commands})
+
+        parts = robot.render_segments()
+        self.assertEqual(len(parts), 3)
+        self.assertIsNotNone(robot.get_timeline())
+        self.assertEqual(sorted(robot.get_checkpoints()), [1, 2, 3, 4, 5, 6])
+        in_order = event_text(self.config["event-file"])
+
+        robot.render_segments(workers=3)
+        robot.close()
+
+        self.assertIsNone(robot.get_timeline())
+        self.assertEqual([result["step"] for result in robot.get_results()], [1, 2, 3, 4, 5, 6])
+        self.assertTrue(all(result["success"] for result in robot.get_results()))
+        self.assertEqual(event_text(self.config["event-file"]), in_order)
+        self.assertIn("two /tmp\n", in_order)
+        self.assertIn("two /tmp\n", event_text(os.path.join(self.directory, "demo.2.jsonl")))
+        self.assertEqual(sorted(os.listdir(self.directory)), [
+            "checkpoints.jsonl", "demo.1.cast", "demo.1.jsonl", "demo.2.cast", "demo.2.jsonl",
+            "demo.3.cast", "demo.3.jsonl", "demo.cast", "demo.jsonl"])
+
+    def test_editor_seam(self):
+        """Test typing resumes at an editor seam, not after the next segment's shell start."""
+
+        def after_pause(events):
+            """Returns the times of the events after the pause, from the pause."""
+            pause = [event["time"] for event in events if event["kind"] == "pause"][0]
+            return [event["time"] - pause for event in events if event["time"] > pause]
+
+        def read_events():
+            with open(self.config["event-file"]) as stream:
+                return [json.loads(line) for line in stream]
+
+        with typetastic.Robot() as robot:
+            robot.load({"config": self.config, "commands": ["echo a", "vi notes", "echo b"]})
+            robot.render_segments()
+            in_order = after_pause(read_events())
+            robot.render_segments(workers=2)
+            stitched = after_pause(read_events())
+
+        self.assertEqual(len(stitched), len(in_order))
+        for (parallel, sequential) in zip(stitched, in_order):
+            self.assertAlmostEqual(parallel, sequential, delta=0.1)
+
+    def test_trace(self):
+        """Test the spans of segments rendered at once are merged into one trace."""
+
+        trace = os.path.join(self.directory, "trace.json")
+        with typetastic.Robot() as robot:
+            robot.load({"config": dict(self.config, **{"trace-file": trace}),
+                        "commands": ["echo one", "PAUSE", "echo two"]})
+            robot.render_segments()
+            robot.render_segments()
+
+            self.assertIsNone(robot.get_timeline())
+            spans = [span.name for span in robot.get_tracer().spans]
+        self.assertEqual(spans.count("run"), 2)
+        with open(trace) as stream:
+            self.assertEqual(len(json.load(stream)["traceEvents"]), len(spans))
+
+    def test_single_segment(self):
+        """Test a script without a cut renders in order."""
+
+        robot = typetastic.Robot()
+        robot.load({"config": self.config, "commands": ["echo one"]})
+
+        self.assertEqual(robot.render_segments(), [segments.Segment(1, 1, 1)])
+        robot.close()
+        self.assertIn("one\n", event_text(self.config["event-file"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,12 +11,29 @@ class TestSessionConfig(unittest.TestCase):
     def setUp(self):
 
         self.reference_config = {
+            "cast-file": None,
+            "cast-pause-gap": 2.0,
+            "cast-pause-marker": False,
+            "checkpoint-file": None,
+            "event-file": None,
+            "executor": "pty",
+            "headless": False,
             "local-prompt": "$ ",
+            "output-max-bytes": None,
+            "output-max-lines": None,
+            "output-cache": False,
+            "output-cache-env": None,
+            "output-cache-ttl": None,
+            "output-rate": None,
             "pexpect-delay": 0.2,
             "prompt-string": "$ ",
+            "rehearse": False,
             "remote-prompt": "[ssh] $ ",
+            "svg-file": None,
+            "trace-file": None,
             "typing-color": "cyan",
-            "typing-speed": "moderate"
+            "typing-speed": "moderate",
+            "typing-theme": None
         }
 
     def test_default_config(self):
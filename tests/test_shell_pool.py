@@ -0,0 +1,112 @@
+"""Test Shell Pool."""
+
+from io import StringIO
+import os
+import sys
+import unittest
+
+import typetastic
+from typetastic.prompt_sentinel import SHELL_SENTINEL, clean_output
+from typetastic.shell_pool import ShellPool
+
+
+class TestShellPool(unittest.TestCase):
+    """Test shells are reused, and reset between uses."""
+
+    def setUp(self):
+        self.pool = ShellPool(reset_timeout=1)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def run_command(self, session, command):
+        """Returns the cleaned output of command."""
+        session.sendline(command)
+        return clean_output(SHELL_SENTINEL.wait(session).output)
+
+    def test_shell_is_reused(self):
+        """Test a released shell is handed out again."""
+
+        session = self.pool.acquire()
+        self.pool.release(session)
+
+        self.assertIs(self.pool.acquire(), session)
+        self.assertEqual(self.pool.spawned, 1)
+
+    def test_shell_is_reset(self):
+        """Test the working directory and environment are reset."""
+
+        session = self.pool.acquire()
+        self.run_command(session, "cd /; export TT_TEST=dirty")
+        self.pool.release(session)
+
+        session = self.pool.acquire(env={"TT_OTHER": "it's set"})
+        self.assertEqual(self.run_command(session, "pwd"), os.getcwd())
+        self.assertEqual(self.run_command(session, "echo x$TT_TEST"), "x")
+        self.assertEqual(self.run_command(session, "echo $TT_OTHER"), "it's set")
+
+    def test_stuck_shell_is_replaced(self):
+        """Test a shell left inside python3 is not handed out again."""
+
+        session = self.pool.acquire()
+        session.sendline("python3")
+        session.expect_exact(">>> ")
+        self.pool.release(session)
+
+        self.assertIsNot(self.pool.acquire(), session)
+        self.assertFalse(session.isalive())
+
+
+class TestRobotReuse(unittest.TestCase):
+    """Test a long lived robot reuses its shell across runs."""
+
+    def test_runs_share_a_shell(self):
+        """Test back to back runs only start one shell."""
+        # pylint: disable=protected-access
+
+        pool = ShellPool()
+        robot = typetastic.Robot(pool=pool)
+        robot.load({"config": {"typing-speed": "supersonic", "pexpect-delay": 0}})
+
+        sys.stdout = StringIO()
+        for command in ["cd /", "pwd", "ls /etc/hosts"]:
+            robot.load([command])
+            robot.run()
+            self.assertEqual(robot._get_successful_commands(), 1)
+        sys.stdout = sys.__stdout__
+        robot.close()
+
+        self.assertEqual(pool.spawned, 1)
+
+    def test_ended_shell_is_dropped(self):
+        """Test a shell ended by a command fails its steps, and is not reused."""
+
+        pool = ShellPool()
+        with typetastic.Robot(pool=pool) as robot:
+            robot.load({"config": {"typing-speed": "supersonic", "headless": True},
+                        "commands": ["exec true", "echo after"]})
+            robot.run()
+            self.assertEqual([result["exit_status"] for result in robot.get_results()],
+                             [None, None])
+
+            robot.load(["echo again"])
+            robot.run()
+            self.assertEqual(robot.get_results()[0]["exit_status"], 0)
+
+        self.assertEqual(pool.spawned, 2)
+
+    def test_runs_without_a_pool(self):
+        """Test a robot not given a pool starts each run in a new shell."""
+
+        with typetastic.Robot() as robot:
+            robot.load({"config": {"typing-speed": "supersonic", "headless": True},
+                        "commands": ["TT_VARIABLE=set; alias tt_alias=true"]})
+            robot.run()
+            robot.load(["echo ${TT_VARIABLE-unset}", "tt_alias"])
+            robot.run()
+
+            output = "".join(event.data for event in robot.get_timeline().events()
+                             if event.kind == "output")
+            self.assertIn("unset\n", output)
+            self.assertEqual([result["success"] for result in robot.get_results()],
+                             [True, False])
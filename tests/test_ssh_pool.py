@@ -0,0 +1,168 @@
+"""Test SSH Pool."""
+
+from io import StringIO
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import pexpect
+
+import typetastic
+from typetastic.ssh_pool import SSHPool, SSHTarget, parse_ssh_target
+
+
+class LocalSSH(pexpect.spawn):
+    """Stand in for pxssh and sshd, logging in to a local shell."""
+
+    def __init__(self):
+        super().__init__(None, timeout=10)
+        self.logins = []
+
+    def login(self, server, username=None, port=None, ssh_key=None):
+        """Starts a local shell in place of a remote one."""
+        self.logins.append((server, username, port, ssh_key))
+        self._spawn("/bin/sh")
+        return True
+
+    def logout(self):
+        """Exits the local shell."""
+        self.sendline("exit")
+        self.expect(pexpect.EOF)
+        self.close()
+
+
+class TestParseSSHTarget(unittest.TestCase):
+    """Test parsing connection targets from ssh commands."""
+
+    def test_parse_ssh_target(self):
+        """Test user, host, port and identity are found."""
+
+        commands = {
+            "ssh user@host": SSHTarget("user", "host", None, None),
+            "ssh -l user host.com": SSHTarget("user", "host.com", None, None),
+            "ssh host.com": SSHTarget(None, "host.com", None, None),
+            "ssh -p 2222 -i ~/.ssh/demo user@host": SSHTarget("user", "host", 2222, "~/.ssh/demo"),
+            "ssh -p2222 host uptime": SSHTarget(None, "host", 2222, None),
+            "ssh -o Port=22 -o User=root -A host": SSHTarget("root", "host", 22, None),
+            "ssh ssh://user@host:2200": SSHTarget("user", "host", 2200, None),
+        }
+
+        for (command, target) in commands.items():
+            self.assertEqual(parse_ssh_target(command), target)
+
+    def test_parse_unbalanced_quote(self):
+        """Test a command with an unclosed quote is still parsed."""
+
+        self.assertEqual(parse_ssh_target("ssh -p 2222 user@host echo 'hi"),
+                         SSHTarget("user", "host", 2222, None))
+        steps = typetastic.Robot.compile_plan([{"ssh": ["ssh user@host", "echo 'hi", "exit"]},
+                                               {"ssh": ["ssh user@host 'uptime", "exit"]}], {})
+        self.assertEqual(len(steps), 5)
+
+
+class TestSSHPool(unittest.TestCase):
+    """Test ssh connections are pooled by target."""
+
+    def setUp(self):
+        self.pool = SSHPool(factory=LocalSSH)
+        self.target = SSHTarget("user", "localhost", 2222, None)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_released_connection_is_reused(self):
+        """Test a released connection is not logged in again."""
+
+        ssh_conn = self.pool.checkout(self.target)
+        self.assertTrue(self.pool.login(ssh_conn, self.target))
+        self.pool.release(ssh_conn)
+
+        reused = self.pool.checkout(self.target)
+        self.assertIs(reused, ssh_conn)
+        self.assertTrue(self.pool.login(reused, self.target))
+        self.assertEqual(ssh_conn.logins, [("localhost", "user", 2222, None)])
+
+    def test_targets_are_separate(self):
+        """Test a different port gets a different connection."""
+
+        ssh_conn = self.pool.checkout(self.target)
+        self.pool.login(ssh_conn, self.target)
+        self.pool.release(ssh_conn)
+
+        other = self.pool.checkout(self.target._replace(port=22))
+        self.assertIsNot(other, ssh_conn)
+
+    def test_close_stops_masters(self):
+        """Test closing the pool stops the master connection of each target."""
+
+        directory = tempfile.mkdtemp()
+        fake_ssh = os.path.join(directory, "ssh")
+        with open(fake_ssh, "w") as stream:
+            stream.write('#!/bin/sh\n'
+                         'echo "$@" > "{0}/args"\n'
+                         'for arg; do case $arg in ControlPath=*) path=${{arg#ControlPath=}};; '
+                         'esac; host=$arg; done\n'
+                         'kill "$(cat "${{path%/*}}/$host.pid")"\n'.format(directory))
+        os.chmod(fake_ssh, 0o755)
+
+        pool = SSHPool(ssh=fake_ssh)
+        masters = []
+
+        def factory():
+            """Returns a stand in connection, leaving a master as ssh would."""
+            control_path = pool.control_options()["ControlPath"]
+            masters.append(subprocess.Popen(["sleep", "60"]))
+            with open(os.path.join(os.path.dirname(control_path), "localhost.pid"), "w") as stream:
+                stream.write(str(masters[-1].pid))
+            return LocalSSH()
+
+        pool.factory = factory
+        ssh_conn = pool.checkout(self.target)
+        pool.login(ssh_conn, self.target)
+        pool.release(ssh_conn)
+        pool.close()
+
+        self.assertEqual(masters[0].wait(timeout=5), -15)
+        with open(os.path.join(directory, "args")) as stream:
+            self.assertEqual(stream.read().split()[:2], ["-O", "exit"])
+        shutil.rmtree(directory)
+
+    def test_close_logs_out(self):
+        """Test closing the pool logs out of idle connections."""
+
+        ssh_conn = self.pool.checkout(self.target)
+        self.pool.login(ssh_conn, self.target)
+        self.pool.release(ssh_conn)
+        self.pool.close()
+
+        self.assertFalse(ssh_conn.isalive())
+
+
+class TestRobotSSHPool(unittest.TestCase):
+    """Test ssh: blocks share pooled connections."""
+
+    def test_repeated_blocks_log_in_once(self):
+        """Test two blocks to the same host log in once."""
+        # pylint: disable=protected-access
+
+        pool = SSHPool(factory=LocalSSH)
+        robot = typetastic.Robot(ssh_pool=pool)
+        robot.load({
+            "config": {"typing-speed": "supersonic", "pexpect-delay": 0},
+            "commands": [
+                {"ssh": ["ssh -p 2222 user@localhost", "echo one", "exit"]},
+                "true",
+                {"ssh": ["ssh user@localhost -p 2222", "(exit 3)", "exit"]}
+            ]
+        })
+
+        sys.stdout = StringIO()
+        robot.run()
+        sys.stdout = sys.__stdout__
+        robot.close()
+
+        self.assertEqual(pool.logins, 1)
+        self.assertEqual(robot._get_successful_commands(), 6)
@@ -0,0 +1,63 @@
+"""Test SVG Rendering."""
+
+import json
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as ElementTree
+
+from typetastic.svg_render import frames, render_svg, write_frames
+from typetastic.timeline import Event
+
+
+class TestSvgRender(unittest.TestCase):
+    """Test rendering timelines as SVG."""
+
+    def setUp(self):
+
+        self.events = [
+            Event(0.0, "prompt", "$ "),
+            Event(0.1, "type", "l"),
+            Event(0.2, "type", "s\n"),
+            Event(0.2, "output", "file.txt\n"),
+            Event(0.2, "exit_status", 0),
+            Event(0.2, "prompt", "$ "),
+            Event(0.3, "output", ""),
+        ]
+
+    def test_frames_are_deduplicated(self):
+        """Test events at the same time, or with no change, share a frame."""
+
+        frame_list = frames(self.events, size=(20, 4))
+
+        self.assertEqual([frame.time for frame in frame_list], [0.0, 0.1, 0.2])
+        self.assertEqual(frame_list[-1].duration, 2.0)
+        self.assertEqual(frame_list[-1].rows[1], (((None, False), "file.txt"),))
+
+    def test_render_svg(self):
+        """Test the animated SVG has one element per row version."""
+
+        frame_list = frames(self.events, size=(20, 4))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            svg_file = os.path.join(temp_dir, "demo.svg")
+            render_svg(frame_list, svg_file, size=(20, 4))
+            root = ElementTree.parse(svg_file).getroot()
+
+        texts = root.findall("{http://www.w3.org/2000/svg}text")
+        # row 0: "$ ", "$ l", "$ ls", then "file.txt" and "$ "
+        self.assertEqual(len(texts), 5)
+
+    def test_write_frames(self):
+        """Test one static SVG is written per frame."""
+
+        frame_list = frames(self.events, size=(20, 4))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            write_frames(frame_list, temp_dir, size=(20, 4))
+            with open(os.path.join(temp_dir, "frames.json")) as stream:
+                index = json.load(stream)
+            files = sorted(os.listdir(temp_dir))
+
+        self.assertEqual(len(index), 3)
+        self.assertEqual(files[:3], ["frame-00001.svg", "frame-00002.svg", "frame-00003.svg"])
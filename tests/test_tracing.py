@@ -0,0 +1,114 @@
+"""Test Tracing."""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import typetastic
+from typetastic.tracing import NULL_TRACER, Tracer
+
+
+class FakeClock:
+    """A clock that moves forward a second each time it is read."""
+
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        self.time += 1.0
+        return self.time
+
+
+class TestTracer(unittest.TestCase):
+    """Test spans are recorded and exported."""
+
+    def setUp(self):
+
+        self.tracer = Tracer(clock=FakeClock())
+        with self.tracer.span("run_task", command="ls"):
+            with self.tracer.span("typing"):
+                pass
+            with self.tracer.span("typing"):
+                pass
+
+    def test_spans(self):
+        """Test spans are recorded as they finish."""
+
+        self.assertEqual([span.name for span in self.tracer.spans],
+                         ["typing", "typing", "run_task"])
+        self.assertEqual(self.tracer.spans[-1].args, {"command": "ls"})
+
+    def test_chrome_trace(self):
+        """Test spans export as complete trace events, in microseconds."""
+
+        events = self.tracer.chrome_trace()["traceEvents"]
+
+        self.assertEqual([event["name"] for event in events], ["run_task", "typing", "typing"])
+        self.assertEqual(events[0]["ph"], "X")
+        self.assertEqual(events[0]["ts"], 1000000)
+        self.assertEqual(events[0]["dur"], 5000000)
+        self.assertEqual(events[0]["args"], {"command": "ls"})
+
+    def test_summary(self):
+        """Test the summary totals time per span name."""
+
+        lines = self.tracer.summary().splitlines()
+
+        self.assertEqual(lines[1].split(), ["run_task", "1", "5000.00", "5000.00", "5000.00"])
+        self.assertEqual(lines[2].split(), ["typing", "2", "2000.00", "1000.00", "1000.00"])
+
+    def test_null_tracer(self):
+        """Test the null tracer records nothing."""
+
+        with NULL_TRACER.span("typing", keystrokes=3) as span:
+            self.assertIsNotNone(span)
+        self.assertFalse(NULL_TRACER.enabled)
+
+
+class TestRobotTracing(unittest.TestCase):
+    """Test a run is traced to a trace-file."""
+
+    def setUp(self):
+
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+
+        shutil.rmtree(self.temp_dir)
+
+    def test_trace_file(self):
+        """Test a run with a trace-file writes Chrome trace JSON."""
+
+        trace_file = os.path.join(self.temp_dir, "trace.json")
+
+        robot = typetastic.Robot()
+        robot.load({"config": {"headless": True, "trace-file": trace_file}})
+        robot.load(["echo hello", "false"])
+        robot.run()
+        robot.close()
+
+        with open(trace_file) as stream:
+            names = {event["name"] for event in json.load(stream)["traceEvents"]}
+
+        for name in ["run", "shell_acquire", "run_task", "bot_handler_default", "typing",
+                     "send", "wait_for_prompt", "output", "exit_status"]:
+            self.assertIn(name, names)
+
+        self.assertIn("wait_for_prompt", robot.get_tracer().summary())
+
+    def test_untraced_run(self):
+        """Test runs are not traced by default."""
+
+        robot = typetastic.Robot()
+        robot.load({"config": {"headless": True}})
+        robot.load(["true"])
+        robot.run()
+        robot.close()
+
+        self.assertIsNone(robot.get_tracer())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""Test Typing Renderer."""
+
+from io import StringIO
+import sys
+import unittest
+
+from typetastic.typing_renderer import TypingRenderer
+
+
+class FakeClock:
+    """Clock where every write costs time, like a busy terminal."""
+
+    def __init__(self, write_cost):
+        self.now = 0.0
+        self.write_cost = write_cost
+        self.sleeps = []
+
+    def clock(self):
+        """Returns the current time."""
+        return self.now
+
+    def sleep(self, seconds):
+        """Advances time by seconds."""
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class CostlyStringIO(StringIO):
+    """StringIO that advances a fake clock on every write."""
+
+    def __init__(self, fake_clock):
+        super().__init__()
+        self.fake_clock = fake_clock
+
+    def write(self, text):
+        self.fake_clock.now += self.fake_clock.write_cost
+        return super().write(text)
+
+
+class TestTypingRenderer(unittest.TestCase):
+    """Test deadline scheduled typing."""
+
+    def render(self, text, delays, return_key_delay, write_cost):
+        """Renders with a fake clock, returns (stats, output, fake clock)."""
+
+        fake_clock = FakeClock(write_cost)
+        temp_output = CostlyStringIO(fake_clock)
+        renderer = TypingRenderer(clock=fake_clock.clock, sleep=fake_clock.sleep)
+
+        sys.stdout = temp_output
+        stats = renderer.render(text, delays, return_key_delay)
+        sys.stdout = sys.__stdout__
+
+        return (stats, temp_output.getvalue(), fake_clock)
+
+    def test_render_output(self):
+        """Test the text is typed, followed by a newline."""
+
+        (stats, output, _) = self.render("ls -l", [0.1] * 5, 0.5, 0)
+
+        self.assertEqual(output, "ls -l\n")
+        self.assertEqual(stats.keystrokes, 5)
+
+    def test_write_cost_does_not_drift(self):
+        """Test write overhead is absorbed, not added to each delay."""
+
+        text = "x" * 200
+        (stats, _, fake_clock) = self.render(text, [0.1] * 200, 0.5, 0.01)
+
+        self.assertAlmostEqual(stats.requested, 20.5)
+        # only the final newline write lands after the last deadline
+        self.assertAlmostEqual(stats.achieved, 20.51)
+        self.assertAlmostEqual(fake_clock.sleeps[0], 0.09)
+
+    def test_slow_terminal_skips_sleep(self):
+        """Test overdue keystrokes are written without sleeping."""
+
+        (stats, _, fake_clock) = self.render("abc", [0.01] * 3, 0, 0.05)
+
+        self.assertEqual(fake_clock.sleeps, [])
+        self.assertGreater(stats.achieved, stats.requested)
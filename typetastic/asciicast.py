@@ -0,0 +1,66 @@
+"""Export a robot timeline as an asciinema v2 cast file."""
+
+import json
+import shutil
+import time
+
+# event kinds that put something on screen
+SCREEN_EVENTS = ("type", "output", "prompt")
+
+
+def cast_events(events, pause_gap=2.0, pause_marker=False):
+    """Returns asciinema [time, code, data] events for timeline events.
+
+    However long the robot waited at a PAUSE, the cast shows a pause_gap
+    seconds gap there instead. With pause_marker, each PAUSE also gets a
+    marker event, which players show as a chapter.
+    """
+    cast = []
+    shift = 0.0
+    pause_start = None
+    pauses = 0
+
+    for event in events:
+        if event.kind == "pause":
+            pauses += 1
+            if pause_marker:
+                cast.append([round(event.time + shift, 6), "m", "PAUSE {0}".format(pauses)])
+            if pause_start is None:
+                pause_start = event.time
+            continue
+
+        if event.kind not in SCREEN_EVENTS:
+            continue
+
+        if pause_start is not None:
+            shift += pause_gap - (event.time - pause_start)
+            pause_start = None
+
+        data = event.data.replace("\r\n", "\n").replace("\n", "\r\n")
+        cast.append([round(event.time + shift, 6), "o", data])
+
+    return cast
+
+
+def write_cast(events, path, pause_gap=2.0, pause_marker=False, size=None, title=None):
+    """Writes timeline events to path as an asciinema v2 cast.
+
+    Size is (width, height), the current terminal size by default.
+    """
+    (width, height) = size or shutil.get_terminal_size()
+
+    header = {
+        "version": 2,
+        "width": width,
+        "height": height,
+        "timestamp": int(time.time())
+    }
+    if title:
+        header["title"] = title
+
+    with open(path, "w") as stream:
+        stream.write(json.dumps(header))
+        stream.write("\n")
+        for cast_event in cast_events(events, pause_gap, pause_marker):
+            stream.write(json.dumps(cast_event))
+            stream.write("\n")
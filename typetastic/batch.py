@@ -0,0 +1,175 @@
+"""Run a library of typetastic files in parallel, and report on them."""
+
+import argparse
+import concurrent.futures
+import contextlib
+import functools
+import io
+import json
+import os
+import re
+import sys
+import time
+import traceback
+from xml.etree import ElementTree
+
+from .keystrokes import ESCAPE_PATTERN
+from .plan import PlanCache
+from .robot import Robot
+
+XML_INVALID_PATTERN = re.compile("[^\t\n\r\x20-\ud7ff\ue000-\ufffd\U00010000-\U0010ffff]")
+
+
+def run_script(path, plan_cache=None):
+    """Runs one typetastic file headless, returns its report dict.
+
+    plan_cache is a directory of compiled plans to load the file from.
+
+    Report keys: path, success, duration, commands (see Robot.get_results),
+    output (what would have been on screen) and error (a traceback, or None).
+    """
+    report = {
+        "path": path,
+        "success": False,
+        "duration": 0.0,
+        "commands": [],
+        "output": "",
+        "error": None
+    }
+
+    started = time.monotonic()
+    captured = io.StringIO()
+    robot = Robot(plan_cache=PlanCache(plan_cache) if plan_cache else None)
+    try:
+        with contextlib.redirect_stdout(captured):
+            robot.load(path)
+            robot.load({"config": {"headless": True}})
+            robot.run()
+
+        report["commands"] = robot.get_results()
+        report["success"] = all(result["success"] for result in report["commands"])
+        if not report["commands"]:
+            report["success"] = False
+            report["error"] = "no commands loaded from {0}".format(path)
+
+        timeline = robot.get_timeline()
+        if timeline:
+            report["output"] = "".join(
+                event.data for event in timeline.events()
+                if event.kind in ("type", "output", "prompt"))
+
+    except Exception:  # pylint: disable=broad-except
+        report["error"] = traceback.format_exc()
+
+    finally:
+        robot.close()
+
+    report["output"] = captured.getvalue() + report["output"]
+    report["duration"] = time.monotonic() - started
+    return report
+
+
+def run_batch(paths, workers=None, plan_cache=None):
+    """Runs typetastic files across a process pool.
+
+    Each file runs in its own process, with its own shell and pty.
+
+    Returns:
+    A report dict per file, in the order given.
+    """
+    run = functools.partial(run_script, plan_cache=plan_cache)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run, paths))
+
+
+def format_text(reports):
+    """Returns a human readable summary of batch reports."""
+    lines = []
+    for report in reports:
+        failed = [result for result in report["commands"] if not result["success"]]
+        status = "ok" if report["success"] else "FAIL"
+        lines.append("{0:4} {1} ({2} commands, {3:.2f}s)".format(
+            status, report["path"], len(report["commands"]), report["duration"]))
+        for result in failed:
+            lines.append("     step {0}: {1} (exit status {2})".format(
+                result["step"], result["command"], result["exit_status"]))
+        if report["error"]:
+            lines.append("     error: {0}".format(report["error"].strip().splitlines()[-1]))
+
+    passed = sum(1 for report in reports if report["success"])
+    lines.append("{0} of {1} files passed".format(passed, len(reports)))
+    return "\n".join(lines)
+
+
+def format_json(reports):
+    """Returns batch reports as JSON."""
+    return json.dumps(reports, indent=2)
+
+
+def format_junit(reports):
+    """Returns batch reports as JUnit XML, a testsuite per file."""
+    suites = ElementTree.Element("testsuites")
+
+    for report in reports:
+        failures = [result for result in report["commands"] if not result["success"]]
+        suite = ElementTree.SubElement(suites, "testsuite", {
+            "name": report["path"],
+            "tests": str(len(report["commands"])),
+            "failures": str(len(failures)),
+            "errors": "1" if report["error"] else "0",
+            "time": "{0:.3f}".format(report["duration"])
+        })
+
+        for result in report["commands"]:
+            case = ElementTree.SubElement(suite, "testcase", {
+                "classname": os.path.basename(report["path"]),
+                "name": "{0}: {1}".format(result["step"], result["command"]),
+                "time": "{0:.3f}".format(result["duration"])
+            })
+            if not result["success"]:
+                ElementTree.SubElement(case, "failure", {
+                    "message": "exit status {0}".format(result["exit_status"])
+                })
+
+        if report["error"]:
+            error = ElementTree.SubElement(suite, "error", {"message": "run failed"})
+            error.text = report["error"]
+
+        output = ElementTree.SubElement(suite, "system-out")
+        output.text = _xml_text(report["output"])
+
+    return ElementTree.tostring(suites, encoding="unicode")
+
+
+def _xml_text(text):
+    """Returns text without escape sequences and characters XML forbids."""
+    return XML_INVALID_PATTERN.sub("", ESCAPE_PATTERN.sub("", text))
+
+
+def main(argv=None):
+    """Run typetastic files in parallel, exits non-zero if any fail."""
+
+    arg_parser = argparse.ArgumentParser(description=main.__doc__)
+    arg_parser.add_argument("inputfiles", nargs="+")
+    arg_parser.add_argument("--workers", type=int, default=None,
+                            help="processes to use, the number of CPUs by default")
+    arg_parser.add_argument("--json", help="write a JSON report here")
+    arg_parser.add_argument("--junit", help="write a JUnit XML report here")
+    arg_parser.add_argument("--plan-cache", help="cache compiled files in this directory")
+    args = arg_parser.parse_args(argv)
+
+    reports = run_batch(args.inputfiles, args.workers, args.plan_cache)
+
+    print(format_text(reports))
+    if args.json:
+        with open(args.json, "w") as stream:
+            stream.write(format_json(reports))
+    if args.junit:
+        with open(args.junit, "w") as stream:
+            stream.write(format_junit(reports))
+
+    return 0 if all(report["success"] for report in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
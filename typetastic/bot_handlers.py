@@ -1,11 +1,18 @@
 """Handlers for commands."""
 
 import random
-import re
-import sys
-import time
-import getch
-import pexpect
+
+from . import executors
+from . import python_repl
+from .lazy_module import LazyModule
+from .prompt_sentinel import SHELL_SENTINEL, CommandResult
+from .keystrokes import split_keystrokes
+from .output_stream import OUTPUT_OPTIONS, OutputFilter, OutputLimiter
+from .ssh_pool import SSHPool, parse_ssh_target
+from .terminal import Terminal
+
+getch = LazyModule("getch")
+pexpect = LazyModule("pexpect")
 
 
 def bot_handler_default(handler_data):
@@ -13,7 +20,9 @@ def bot_handler_default(handler_data):
 
     (speed_min, speed_max, return_key_delay) = handler_data["typing_speed"]
     simulated_typing = handler_data["simulated_typing"]
-    simulate_typing(simulated_typing, speed_min, speed_max, return_key_delay)
+    simulate_typing(simulated_typing, speed_min, speed_max, return_key_delay,
+                    terminal=get_terminal(handler_data),
+                    delays=handler_data.get("typing_delays"))
 
     if handler_data["remote"]:
         return run_ssh_command(handler_data)
@@ -22,26 +31,25 @@ def bot_handler_default(handler_data):
 
 
 def bot_handler_newline(handler_data):
-    # pylint: disable=unused-argument
     """Handler for newline."""
-    simulate_typing("", 0, 0, 0)
+    simulate_typing("", 0, 0, 0, terminal=get_terminal(handler_data))
     return True
 
 
 def bot_handler_pause(handler_data):
-    # pylint: disable=unused-argument
     """Handler for pause."""
-    pause_flow()
+    pause_flow(get_terminal(handler_data))
     return True
 
 
 def bot_handler_editor(handler_data):
-    # pylint: disable=unused-argument
     """Handler for vi."""
     (speed_min, speed_max, return_key_delay) = handler_data["typing_speed"]
     simulated_typing = handler_data["simulated_typing"]
-    simulate_typing(simulated_typing, speed_min, speed_max, return_key_delay)
-    pause_flow()
+    simulate_typing(simulated_typing, speed_min, speed_max, return_key_delay,
+                    terminal=get_terminal(handler_data),
+                    delays=handler_data.get("typing_delays"))
+    pause_flow(get_terminal(handler_data))
     return True
 
 
@@ -52,33 +60,42 @@ def bot_handler_ssh(handler_data):
 
         (speed_min, speed_max, return_key_delay) = handler_data["typing_speed"]
         simulated_typing = handler_data["simulated_typing"]
-        simulate_typing(simulated_typing, speed_min, speed_max, return_key_delay)
+        simulate_typing(simulated_typing, speed_min, speed_max, return_key_delay,
+                        terminal=get_terminal(handler_data),
+                        delays=handler_data.get("typing_delays"))
 
         command = handler_data["command"]
         ssh_conn = handler_data["remote"]
-
-        (user, host) = parse_ssh_user_host(command)
+        pool = handler_data.get("ssh_pool") or SSHPool()
 
         try:
-            ssh_conn.login(host, user)
-            return not ssh_conn.closed
+            with get_tracer(handler_data).span("ssh_login", command=command):
+                return pool.login(ssh_conn, parse_ssh_target(command))
 
         except pexpect.pxssh.ExceptionPxssh as error:
-            print("ssh login failed: {0}".format(error))
+            get_terminal(handler_data).write("ssh login failed: {0}\n".format(error))
 
     return False
 
 
 def bot_handler_exit(handler_data):
-    """SSH exit."""
+    """SSH exit, pooled connections go back to the pool."""
     if "remote" in handler_data and handler_data["remote"]:
 
         (speed_min, speed_max, return_key_delay) = handler_data["typing_speed"]
         simulated_typing = handler_data["simulated_typing"]
-        simulate_typing(simulated_typing, speed_min, speed_max, return_key_delay)
+        simulate_typing(simulated_typing, speed_min, speed_max, return_key_delay,
+                        terminal=get_terminal(handler_data),
+                        delays=handler_data.get("typing_delays"))
 
         ssh_conn = handler_data["remote"]
-        ssh_conn.logout()
+        pool = handler_data.get("ssh_pool")
+        with get_tracer(handler_data).span("ssh_logout"):
+            if pool and pool.is_logged_in(ssh_conn):
+                pool.release(ssh_conn)
+                return True
+
+            ssh_conn.logout()
         return ssh_conn.closed
 
     return False
@@ -86,32 +103,8 @@ def bot_handler_exit(handler_data):
 
 def parse_ssh_user_host(command):
     """Find user and host."""
-
-    user_patterns = [
-        r" ([a-z0-9\.]+)@",
-        r"-l ([a-z0-9\.]+) "
-    ]
-
-    user = None
-    for pattern in user_patterns:
-        comp_pattern = re.compile(pattern)
-        result = comp_pattern.search(command)
-        if result:
-            user = result.group(1)
-
-    host = None
-    host_patterns = [
-        r"@([a-z0-9\.]+)",
-        r" ([a-z0-9\.]+)$"
-    ]
-
-    for pattern in host_patterns:
-        comp_pattern = re.compile(pattern)
-        result = comp_pattern.search(command)
-        if result:
-            host = result.group(1)
-
-    return (user, host)
+    target = parse_ssh_target(command)
+    return (target.user, target.host)
 
 
 # EDITORS
@@ -133,120 +126,280 @@ def bot_handler_crontab(handler_data):
         return bot_handler_default(handler_data)
 
 
-def emit_prompt(prompt):
+def get_terminal(handler_data):
+    """Returns the terminal for handler data, a plain one if none is set."""
+    return handler_data.get("terminal") or Terminal()
+
+
+def output_writer(terminal):
+    """Returns a function writing command output to terminal, traced."""
+    if not terminal.tracer.enabled:
+        return terminal.write
+
+    def write(text):
+        with terminal.tracer.span("output", chars=len(text)):
+            terminal.write(text)
+
+    return write
+
+
+def output_limiter(handler_data, terminal):
+    """Returns the OutputLimiter for a command's output.
+
+    Output options of the command override those in the config.
+    """
+    options = {key: (handler_data.get("config") or {}).get(key) for key in OUTPUT_OPTIONS}
+    options.update(handler_data.get("output_options") or {})
+
+    return OutputLimiter(
+        output_writer(terminal),
+        max_lines=options["output-max-lines"],
+        max_bytes=options["output-max-bytes"],
+        rate=options["output-rate"],
+        sleep=terminal.sleep
+    )
+
+
+def get_executor(handler_data):
+    """Returns the executor for local commands, a pty on the local session by default."""
+    return handler_data.get("executor") or executors.PtyExecutor(handler_data["local"])
+
+
+def get_tracer(handler_data):
+    """Returns the tracer of the handler data's terminal."""
+    return get_terminal(handler_data).tracer
+
+
+def emit_prompt(prompt, terminal=None):
     """Emit a prompt."""
-    print(prompt, end="")
-    sys.stdout.flush()
+    (terminal or Terminal()).write(prompt, kind="prompt")
+
 
+def pause_flow(terminal=None):
+    """Creates a pause by waiting for a keypress.
 
-def pause_flow():
-    """Creates a pause by waiting for a keypress."""
-    getch.getch()
+    A headless terminal does not wait, the pause is only recorded.
+    """
+    terminal = terminal or Terminal()
+    terminal.record("pause")
+    if not terminal.headless:
+        getch.getch()
+
+
+def start_python_repl(handler_data):
+    """Handler for the first command of a python3 block, starting python3."""
+    (speed_min, speed_max, return_key_delay) = handler_data["typing_speed"]
+    simulate_typing(handler_data["simulated_typing"], speed_min, speed_max, return_key_delay,
+                    terminal=get_terminal(handler_data),
+                    delays=handler_data.get("typing_delays"))
+
+    repl = handler_data["python_repl"]
+    return python_result(handler_data, run_python_line(
+        handler_data, lambda write: repl.start(handler_data["command"], write)))
 
 
 def run_python_command(handler_data):
-    """Run a python interpreter command."""
-    execute_command(handler_data)
+    """Handler for a python3 statement, typed and run a line at a time.
+
+    Lines after the first are typed at the continuation prompt. A
+    statement of several lines left open, such as a def, is closed with
+    an empty line, as it would be typed in the interpreter.
+    """
+    (speed_min, speed_max, return_key_delay) = handler_data["typing_speed"]
+    terminal = get_terminal(handler_data)
+    repl = handler_data["python_repl"]
+
+    lines = handler_data["command"].split("\n")
+    typed_lines = handler_data["simulated_typing"].split("\n")
+    delays = handler_data.get("typing_delays")
+    if len(lines) != len(typed_lines):
+        typed_lines = lines
+
+    failed = False
+    position = 0  # of the line's first delay
+    for (index, line) in enumerate(lines):
+        if index:
+            emit_prompt(repl.prompt(), terminal)
+
+        keystrokes = len(split_keystrokes(typed_lines[index]))
+        line_delays = delays[position:position + keystrokes] if delays else None
+        position += keystrokes + 1  # and the newline
+        simulate_typing(typed_lines[index], speed_min, speed_max, return_key_delay,
+                        terminal=terminal, delays=line_delays)
+
+        status = run_python_line(handler_data, lambda write, line=line: repl.send(line, write))
+        failed = failed or status == python_repl.FAILED
+        if not repl.running:
+            break
+
+    if len(lines) > 1 and repl.continuation:
+        emit_prompt(repl.prompt(), terminal)
+        simulate_typing("", 0, 0, return_key_delay, terminal=terminal)
+        status = run_python_line(handler_data, lambda write: repl.send("", write))
+
+    if failed and status == python_repl.READY:
+        status = python_repl.FAILED
+    return python_result(handler_data, status)
+
+
+def run_python_line(handler_data, send):
+    """Calls send(write), which sends a line to python3, printing its output.
+
+    Returns:
+    The status send returns.
+    """
+    terminal = get_terminal(handler_data)
+    limiter = output_limiter(handler_data, terminal)
+    output_filter = OutputFilter(limiter.feed)
+    with terminal.tracer.span("wait_for_prompt"):
+        status = send(output_filter.feed)
+    output_filter.close()
+    limiter.close()
+    return status
+
+
+def python_result(handler_data, status):
+    """Returns True if a python3 line succeeded, storing its exit status.
+
+    A statement that raised an exception has exit status 1, and one that
+    is not complete yet has none, and is pending rather than failed. Once
+    python3 exits, the status is its exit status. A status of None, the
+    session lost, fails with no exit status.
+    """
+    pending = status == python_repl.CONTINUATION
+    exit_status = {
+        python_repl.READY: 0,
+        python_repl.FAILED: 1,
+        python_repl.CONTINUATION: None
+    }.get(status, status)
+
+    handler_data["exit_status"] = exit_status
+    if exit_status is not None:
+        get_terminal(handler_data).record("exit_status", exit_status)
+
+    return exit_status == 0 or pending
 
 
 def bot_handler_CTRL_D(handler_data):
     """Handler for exiting Python interactive env"""
-    delay = 0.2
-    session = handler_data["local"]
-
     (_, _, return_key_delay) = handler_data["typing_speed"]
     simulated_typing = handler_data["simulated_typing"]
-    simulate_typing(simulated_typing, 0, 0, return_key_delay)
+    simulate_typing(simulated_typing, 0, 0, return_key_delay,
+                    terminal=get_terminal(handler_data))
 
-    session.sendcontrol('d')
-    time.sleep(delay)
-    while True:
-        session.expect_exact(["$ ", '\r\n', pexpect.EOF, pexpect.TIMEOUT])
-        if not session.buffer:
-            break
+    repl = handler_data.get("python_repl")
+    if repl:
+        return python_result(handler_data, run_python_line(handler_data, repl.send_eof))
+
+    session = handler_data["local"]
+    if session is None:
+        return True  # no shell, the executor runs each command on its own
+
+    tracer = get_tracer(handler_data)
+    with tracer.span("send"):
+        session.sendcontrol('d')
+    with tracer.span("wait_for_prompt"):
+        handler_data["exit_status"] = SHELL_SENTINEL.wait(session).exit_status
+    get_terminal(handler_data).record("exit_status", handler_data["exit_status"])
 
     return True
 
 
 def run_command(handler_data):
     """Run local command.
+
+    The exit status is stored in handler_data["exit_status"].
     """
     execute_command(handler_data)
 
     if handler_data["get_exit_status"]:
-        return get_last_exit_status(handler_data)
+        with get_tracer(handler_data).span("exit_status"):
+            return get_last_exit_status(handler_data)
 
     return True
 
 
 def execute_command(handler_data):
-    """Execute command."""
-    delay = 0.2
+    """Execute command, printing its output as it arrives.
+
+    Output is streamed, so only the tail of it is kept in the returned
+    CommandResult.
+    """
     command = handler_data["command"]
-    session = handler_data["local"]
-    prompt = handler_data["config"]["prompt-string"]
-
-    session.sendline(command)
-    time.sleep(delay)
-    while True:
-        session.expect_exact([prompt, '\r\n', pexpect.EOF, pexpect.TIMEOUT])
-        if session.before.rstrip():
-            print(session.before.rstrip())
-        if not session.buffer:
-            break
+    executor = get_executor(handler_data)
 
-    # return get_last_exit_status(handler_data)
+    terminal = get_terminal(handler_data)
+    with terminal.tracer.span("send"):
+        executor.send(command)
 
+    limiter = output_limiter(handler_data, terminal)
+    output_filter = OutputFilter(limiter.feed)
+    with terminal.tracer.span("wait_for_prompt"):
+        exit_status = executor.stream(output_filter.feed)
+    result = CommandResult(output_filter.close(), exit_status)
+    limiter.close()
 
-def get_last_exit_status(handler_data):
-    """This is how we get the exit status of the command."""
+    handler_data["exit_status"] = result.exit_status
+    terminal.record("exit_status", result.exit_status)
+
+    return result
 
-    delay = 0.2
-    session = handler_data["local"]
-    prompt = handler_data["config"]["prompt-string"]
-
-    session.sendline("echo $?")
-    time.sleep(delay)  # at least 0.2 seems to work, otherwise expect buffer is empty
-    retval = False
-    while True:
-        session.expect_exact(["\r\n", prompt, pexpect.EOF, pexpect.TIMEOUT])
-        if session.before.isdigit():
-            retval = not bool(int(session.before))
-        if not session.buffer:
-            break
 
-    return retval
+def get_last_exit_status(handler_data):
+    """Returns True if the last command run was successful.
+
+    The exit status arrives with the prompt sentinel, no extra round trip.
+    """
+    return handler_data.get("exit_status") == 0
 
 
 def run_ssh_command(handler_data):
-    """Run local command."""
+    """Run remote command.
+
+    The exit status is stored in handler_data["exit_status"].
+    """
 
     command = handler_data["command"]
     ssh_conn = handler_data["remote"]
 
     if ssh_conn:
-        ssh_conn.sendline(command)
-        ssh_conn.prompt()
-        print(ssh_conn.before[len(command)+2:].decode("utf-8"), end="")
+        terminal = get_terminal(handler_data)
+        with terminal.tracer.span("send"):
+            ssh_conn.sendline(command)
+
+        # remote ttys echo the command
+        limiter = output_limiter(handler_data, terminal)
+        output_filter = OutputFilter(limiter.feed, echo=command)
+        with terminal.tracer.span("wait_for_prompt"):
+            handler_data["exit_status"] = SHELL_SENTINEL.stream(ssh_conn, output_filter.feed)
+        output_filter.close()
+        limiter.close()
 
-        ssh_conn.sendline("echo $?")
-        ssh_conn.prompt()
-        retval = ssh_conn.before[-3:-2].decode("utf-8")
-        if retval == "0":
-            return True
+        terminal.record("exit_status", handler_data["exit_status"])
+
+        with terminal.tracer.span("exit_status"):
+            return get_last_exit_status(handler_data)
 
-    # 0 = success, 1 = failure in Unix, so invert result
     return False
 
 
-def simulate_typing(command, speed_min, speed_max, return_key_delay):
-    """Simulates typing to stdout."""
+def typing_schedule(command, speed_min, speed_max):
+    """Returns a random delay before each keystroke of command, as a tuple."""
+    return tuple(random.uniform(speed_min, speed_max) for _ in split_keystrokes(command))
+
 
-    for char in command:
-        print(char, end="")
-        sys.stdout.flush()
-        char_delay = random.uniform(speed_min, speed_max)
-        time.sleep(char_delay)
+def simulate_typing(command, speed_min, speed_max, return_key_delay, terminal=None,
+                    delays=None):
+    """Simulates typing to the terminal, stdout by default.
 
-    time.sleep(return_key_delay)
-    print()  # newline required after typing command
+    Escape sequences (e.g. colors) are sent with the next keystroke, so only
+    visible characters are paced. delays is a precomputed typing_schedule,
+    one is drawn from the speed range if not given.
+
+    Returns:
+    TypingStats, the requested and achieved typing time.
+    """
+    keystrokes = split_keystrokes(command)
+    if delays is None or len(delays) != len(keystrokes):
+        delays = typing_schedule(command, speed_min, speed_max)
+    return (terminal or Terminal()).type(keystrokes, delays, return_key_delay)
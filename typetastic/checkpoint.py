@@ -0,0 +1,83 @@
+"""Checkpoints of shell state, to resume a run part way through."""
+
+import collections
+import json
+import shlex
+
+from .output_stream import OutputFilter
+
+# the shell state before a step runs
+#   step: number of the step
+#   block: the block the step is in, local, ssh or python3
+#   cwd, env: the local shell's directory and its export -p
+#   remote_cwd, remote_env: the same for the ssh block's shell, None
+#       outside one, or before its login
+Checkpoint = collections.namedtuple("Checkpoint", [
+    "step", "block", "cwd", "env", "remote_cwd", "remote_env"])
+
+# prints the directory, then export lines the same shell can eval, and
+# puts back $? and $_ of the step before, for the step after
+CAPTURE_COMMAND = ('__tt_s=$? __tt_u=$_; pwd; export -p; '
+                   ': "$__tt_u"; (exit $__tt_s)')
+
+
+def capture(executor, echo=False):
+    """Returns (cwd, env) of the shell behind an executor.
+
+    Inputs:
+    executor: runs CAPTURE_COMMAND, e.g. a PtyExecutor
+    echo: the shell's tty echoes the command, as remote ttys do
+    """
+    output = []
+    output_filter = OutputFilter(output.append, echo=CAPTURE_COMMAND if echo else None)
+    executor.send(CAPTURE_COMMAND)
+    executor.stream(output_filter.feed)
+    output_filter.close()
+
+    (cwd, _, env) = "".join(output).partition("\n")
+    return (cwd or None, env)
+
+
+def restore_command(cwd, env):
+    """Returns one command line putting a shell back in a captured state.
+
+    Exported variables are replaced by those captured, if any were.
+    """
+    commands = []
+    if env:
+        commands.append("unset $(compgen -e) 2>/dev/null")
+        commands.append("eval {0} 2>/dev/null".format(shlex.quote(env)))
+    if cwd:
+        commands.append("cd -- {0}".format(shlex.quote(cwd)))
+
+    return "; ".join(commands)
+
+
+def restore(executor, cwd, env):
+    """Puts the shell behind an executor back in a captured state, in one command."""
+    command = restore_command(cwd, env)
+    if command:
+        executor.send(command)
+        executor.stream(lambda text: None)
+
+
+def write_checkpoint(stream, checkpoint):
+    """Writes a checkpoint to an open file, as one line of JSON."""
+    stream.write(json.dumps(checkpoint._asdict()) + "\n")
+
+
+def read_checkpoints(path):
+    """Returns the checkpoints in a file by step number, later lines win.
+
+    Lines that can not be read are skipped.
+    """
+    checkpoints = {}
+    with open(path) as stream:
+        for line in stream:
+            try:
+                checkpoint = Checkpoint(**json.loads(line))
+            except (ValueError, TypeError):
+                continue
+            checkpoints[checkpoint.step] = checkpoint
+
+    return checkpoints
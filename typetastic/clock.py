@@ -0,0 +1,42 @@
+"""Clocks used to pace the robot."""
+
+import time
+
+
+class SystemClock:
+    """Real time, sleeps really wait."""
+
+    @staticmethod
+    def now():
+        """Returns the current time in seconds."""
+        return time.monotonic()
+
+    @staticmethod
+    def sleep(seconds):
+        """Waits for seconds."""
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock:
+    """Real time plus skipped time, sleeps return at once.
+
+    Time still passes while commands really run, but typing delays and
+    pauses only move the clock forward. So a recording made against this
+    clock has the same timings as a real run, without waiting for them.
+    """
+
+    def __init__(self, source=time.monotonic):
+        """Starts the clock at zero, source gives the real time."""
+        self.__source = source
+        self.__start = source()
+        self.__skipped = 0.0
+
+    def now(self):
+        """Returns the current time in seconds."""
+        return self.__source() - self.__start + self.__skipped
+
+    def sleep(self, seconds):
+        """Moves the clock forward by seconds, without waiting."""
+        if seconds > 0:
+            self.__skipped += seconds
@@ -0,0 +1,205 @@
+"""Executors, the backends local commands run on."""
+
+import codecs
+import os
+import shlex
+import tempfile
+import warnings
+
+from .lazy_module import LazyModule
+from .prompt_sentinel import CHUNK_SIZE, SHELL_SENTINEL
+
+subprocess = LazyModule("subprocess")
+
+# names for the executor config
+EXECUTORS = ("pty", "subprocess", "fake")
+
+# writes a subprocess shell's directory and exported variables to a file
+STATE_FUNCTION = ("__tt_state() { pwd; for __tt_name in $(compgen -e); do "
+                  "printf '%s=%s\\0' \"$__tt_name\" \"${!__tt_name}\"; done; }")
+
+# set by each shell started, kept as they were instead of tracked
+UNTRACKED = ("SHLVL", "_")
+
+
+def executor_name(name):
+    """Returns the executor config name if it is known, else pty, with a warning."""
+    if name in EXECUTORS:
+        return name
+
+    warnings.warn("unknown executor {0}, using pty, executors are {1}".format(
+        name, ", ".join(EXECUTORS)))
+    return "pty"
+
+
+def create_executor(name, session=None):
+    """Returns a new executor by its name in EXECUTORS.
+
+    Inputs:
+    name: the executor config
+    session: the shell a pty executor runs commands in
+
+    Raises ValueError for an unknown name.
+    """
+    if name == "pty":
+        return PtyExecutor(session)
+    if name == "subprocess":
+        return SubprocessExecutor()
+    if name == "fake":
+        return FakeExecutor()
+
+    raise ValueError("unknown executor {0}, use one of {1}".format(name, ", ".join(EXECUTORS)))
+
+
+class PtyExecutor:
+    """Runs commands in a shell session, on a pty, through the prompt sentinel.
+
+    Executors send a command, then stream its output to a write function
+    until it ends, which returns the exit status:
+
+        executor.send("ls")
+        exit_status = executor.stream(write)
+    """
+
+    def __init__(self, session, sentinel=SHELL_SENTINEL):
+        self.session = session
+        self.sentinel = sentinel
+
+    def send(self, command):
+        """Starts command running."""
+        self.session.sendline(command)
+
+    def stream(self, write):
+        """Passes output to write as it arrives, returns the exit status."""
+        return self.sentinel.stream(self.session, write)
+
+    def close(self):
+        """Nothing to close, the session belongs to its ShellPool."""
+
+
+class SubprocessExecutor:
+    """Runs each command in a new shell process, reading its output on a pipe.
+
+    No pty is used, so commands see no tty and get no input. The working
+    directory and exported variables a command leaves are tracked, and
+    the next command starts with them, as in one shell. Other shell state,
+    such as variables not exported, aliases and functions, is not kept.
+    Output ends when every process holding the pipe exits, so a command
+    should not leave background jobs running.
+    """
+
+    session = None
+
+    def __init__(self, shell="/bin/bash", cwd=None, env=None):
+        """Sets up an executor.
+
+        Inputs:
+        shell: bash, or a shell with compgen and ${!name}
+        cwd: directory the first command starts in, the current directory by default
+        env: variables the first command starts with, os.environ by default
+        """
+        self.shell = shell
+        self.cwd = cwd or os.getcwd()
+        self.env = dict(os.environ if env is None else env)
+        (handle, self.__state_path) = tempfile.mkstemp(prefix="tt-state-")
+        os.close(handle)
+        self.__process = None
+
+    def send(self, command):
+        """Starts a shell running command."""
+        on_exit = "__tt_state > {0}".format(shlex.quote(self.__state_path))
+        script = "{0}\ntrap {1} EXIT\n{2}\n".format(STATE_FUNCTION, shlex.quote(on_exit), command)
+        self.__process = subprocess.Popen(
+            [self.shell, "-c", script], cwd=self.cwd, env=self.env,
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+    def stream(self, write):
+        """Passes output to write as it arrives, returns the exit status.
+
+        A shell killed by a signal gives 128 plus the signal, as shells do.
+        """
+        process = self.__process
+        self.__process = None
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+        with process.stdout:
+            while True:
+                data = os.read(process.stdout.fileno(), CHUNK_SIZE)
+                text = decoder.decode(data, final=not data)
+                if text:
+                    write(text)
+                if not data:
+                    break
+
+        exit_status = process.wait()
+        self._load_state()
+        return 128 - exit_status if exit_status < 0 else exit_status
+
+    def _load_state(self):
+        """Takes the directory and variables the last shell left."""
+        with open(self.__state_path, "rb") as stream:
+            state = stream.read().decode("utf-8", errors="surrogateescape")
+        if not state:
+            return  # the shell was killed before its exit trap
+
+        (cwd, _, variables) = state.partition("\n")
+        env = dict(variable.split("=", 1) for variable in variables.split("\0") if "=" in variable)
+        for name in UNTRACKED:
+            env.pop(name, None)
+            if name in self.env:
+                env[name] = self.env[name]
+
+        self.cwd = cwd
+        self.env = env
+        with open(self.__state_path, "wb"):
+            pass
+
+    def close(self):
+        """Removes the state file."""
+        try:
+            os.unlink(self.__state_path)
+        except OSError:
+            pass
+
+
+class FakeExecutor:
+    """Serves scripted output in process, no command is run.
+
+    For tests and benchmarks, and for rehearsing a script's timing. Each
+    command sent is kept in commands.
+    """
+
+    session = None
+
+    def __init__(self, outputs=None, default=("", 0)):
+        """Sets up an executor.
+
+        Inputs:
+        outputs: dict of command to its output, an (output, exit status)
+            tuple, or a function of the command returning either
+        default: used for commands not in outputs, success with no output
+        """
+        self.outputs = outputs or {}
+        self.default = default
+        self.commands = []
+
+    def send(self, command):
+        """Takes command."""
+        self.commands.append(command)
+
+    def stream(self, write):
+        """Writes the scripted output of the last command, returns its exit status."""
+        command = self.commands[-1]
+        result = self.outputs.get(command, self.default)
+        if callable(result):
+            result = result(command)
+        if isinstance(result, str):
+            result = (result, 0)
+
+        (output, exit_status) = result
+        if output:
+            write(output)
+        return exit_status
+
+    def close(self):
+        """Nothing to close."""
@@ -0,0 +1,137 @@
+"""Bot handlers by command name, built once and extended by plugins."""
+
+import fnmatch
+import re
+import warnings
+
+from . import bot_handlers as bothan
+
+# packages provide handlers as entry points in this group, e.g. in setup.py
+#   entry_points={"typetastic.handlers": ["kubectl = mypackage:kubectl_handler"]}
+# the entry point name is the command name, or a pattern such as "docker-*"
+ENTRY_POINT_GROUP = "typetastic.handlers"
+
+HANDLER_PREFIX = "bot_handler_"
+PATTERN_CHARS = "*?["
+
+_DEFAULT_REGISTRY = None
+
+
+class HandlerRegistry:
+    """Maps command names, and name patterns, to bot handlers.
+
+    Built-in handlers are held by their name in bot_handlers and looked up
+    when resolved, so a patched handler is the one a plan is compiled with.
+    A name is matched before patterns, patterns in the order registered,
+    and commands matching neither get bot_handler_default.
+    """
+
+    def __init__(self, builtins=True, entry_points=True):
+        """Sets up a registry of the built-in and plugin handlers."""
+        self.__names = {}
+        self.__patterns = []  # (regex, pattern, handler)
+        self.__plugins = []  # (name, handler) registered, for signature()
+
+        if builtins:
+            for attribute in dir(bothan):
+                if attribute.startswith(HANDLER_PREFIX):
+                    self.__names[attribute[len(HANDLER_PREFIX):].lower()] = attribute
+
+        if entry_points:
+            for (name, handler) in _entry_point_handlers():
+                self.register(name, handler)
+
+    def register(self, name, handler):
+        """Registers handler for a command name, or a pattern of names.
+
+        Names are matched ignoring case, patterns use shell wildcards.
+        Registering a name again replaces its handler.
+        """
+        name = name.lower()
+        self.__plugins.append((name, handler))
+
+        if any(char in name for char in PATTERN_CHARS):
+            regex = re.compile(fnmatch.translate(name))
+            self.__patterns = [entry for entry in self.__patterns if entry[1] != name]
+            self.__patterns.append((regex, name, handler))
+        else:
+            self.__names[name] = handler
+
+    def resolve(self, command):
+        """Returns the handler for command."""
+        name = command_name(command)
+
+        handler = self.__names.get(name)
+        if handler is None:
+            for (regex, _, pattern_handler) in self.__patterns:
+                if regex.match(name):
+                    handler = pattern_handler
+                    break
+            else:
+                handler = "bot_handler_default"
+
+        if isinstance(handler, str):
+            return getattr(bothan, handler)
+        return handler
+
+    def signature(self):
+        """Returns a string naming the registered handlers, for cache keys."""
+        return ";".join("{0}={1}.{2}".format(
+            name, getattr(handler, "__module__", ""), getattr(handler, "__qualname__", handler))
+                        for (name, handler) in self.__plugins)
+
+
+def command_name(command):
+    """Returns the name of a command, without its args or path."""
+    name = command.lower()
+
+    if " " in command:  # command has args
+        (name, _) = command.split(" ", 1)
+
+    if "/" in name:  # command has path
+        (_, name) = name.rsplit("/", 1)
+
+    return name
+
+
+def default_registry():
+    """Returns the registry of built-in and installed handlers, built on first use."""
+    global _DEFAULT_REGISTRY  # pylint: disable=global-statement
+    if _DEFAULT_REGISTRY is None:
+        _DEFAULT_REGISTRY = HandlerRegistry()
+    return _DEFAULT_REGISTRY
+
+
+def register_handler(name, handler):
+    """Registers handler for a command name or pattern, for all robots."""
+    default_registry().register(name, handler)
+
+
+def _entry_point_handlers():
+    """Yields (name, handler) of each installed typetastic.handlers entry point.
+
+    A plugin that fails to load is skipped, with a warning.
+    """
+    try:
+        from importlib import metadata  # pylint: disable=import-outside-toplevel
+    except ImportError:  # python < 3.8
+        try:
+            import pkg_resources  # pylint: disable=import-outside-toplevel
+        except ImportError:
+            return
+        selected = pkg_resources.iter_entry_points(ENTRY_POINT_GROUP)
+    else:
+        entry_points = metadata.entry_points()
+        if hasattr(entry_points, "select"):
+            selected = entry_points.select(group=ENTRY_POINT_GROUP)
+        else:
+            selected = entry_points.get(ENTRY_POINT_GROUP, [])
+
+    for entry_point in selected:
+        try:
+            handler = entry_point.load()
+        except Exception as error:  # pylint: disable=broad-except
+            warnings.warn("skipping {0} handler {1}: {2}".format(
+                ENTRY_POINT_GROUP, entry_point.name, error))
+            continue
+        yield (entry_point.name, handler)
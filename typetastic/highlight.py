@@ -0,0 +1,214 @@
+"""Shell syntax highlighting of typed commands."""
+
+import functools
+import json
+import warnings
+
+from .text_colors import TextColors
+
+# kinds of token a command is split into
+#   command: the name of a command run, e.g. ls in "ls -l | wc"
+#   flag: an option, e.g. -l
+#   string: a quoted string
+#   operator: pipes, lists, redirections and subshells
+#   variable: $NAME, ${NAME} and NAME= assignments
+#   argument: any other word, and whitespace
+TOKEN_KINDS = ("command", "flag", "string", "operator", "variable", "argument")
+
+# color names per token kind, any kind not named is shown in typing-color
+THEMES = {
+    "default": {
+        "command": "bold-green",
+        "flag": "cyan",
+        "string": "yellow",
+        "operator": "purple",
+        "variable": "bright-blue"
+    },
+    "solarized": {
+        "command": "bold-blue",
+        "flag": "yellow",
+        "string": "cyan",
+        "operator": "red",
+        "variable": "purple"
+    },
+    "mono": {
+        "command": "bold-white",
+        "operator": "bright-black"
+    }
+}
+
+OPERATORS = ("&>>", "&&", "||", ";;", "|&", ">>", "&>", "<<", "<", ">", "|", ";", "&", "(", ")")
+WORD_ENDS = " \t\n|&;<>()"
+
+RESET = TextColors.get_color_code("reset")
+
+
+@functools.lru_cache(maxsize=4096)
+def tokenize(command):
+    """Returns command as a tuple of (kind, text) tokens, see TOKEN_KINDS.
+
+    The token texts join back to command exactly. Like shlex, quotes and
+    operators are understood, but nothing is expanded, and an unclosed
+    quote runs to the end.
+    """
+    tokens = []
+    position = 0
+    command_position = True  # the next word is a command name
+
+    while position < len(command):
+        char = command[position]
+
+        if char.isspace():
+            end = position
+            while end < len(command) and command[end].isspace():
+                end += 1
+            tokens.append(("argument", command[position:end]))
+            position = end
+            continue
+
+        operator = _operator_at(command, position)
+        if operator:
+            tokens.append(("operator", operator))
+            position += len(operator)
+            if operator == "$((" or operator.startswith(")"):
+                command_position = False  # arithmetic, or after a subshell
+            elif not operator.lstrip("0123456789&").startswith(("<", ">")):
+                command_position = True  # redirections leave it as it was
+            continue
+
+        (word_tokens, position) = _word(command, position)
+        if command_position and word_tokens[0][0] == "argument":
+            if _is_assignment(word_tokens[0][1]):
+                word_tokens[0] = ("variable", word_tokens[0][1])
+            else:
+                word_tokens[0] = ("command", word_tokens[0][1])
+                command_position = False
+        elif word_tokens[0][0] == "argument" and word_tokens[0][1].startswith("-"):
+            word_tokens[0] = ("flag", word_tokens[0][1])
+        else:
+            command_position = False
+        tokens.extend(word_tokens)
+
+    return tuple(_merge(tokens))
+
+
+def _operator_at(command, position):
+    """Returns the operator starting at position, or None."""
+    if command.startswith("$(", position):  # command substitution
+        return "$((" if command.startswith("$((", position) else "$("
+
+    end = position
+    while end < len(command) and command[end].isdigit():
+        end += 1
+    if end > position and not command.startswith((">", "<"), end):
+        return None  # a word starting with digits, not a descriptor as in 2>
+
+    for operator in OPERATORS:
+        if command.startswith(operator, end):
+            end += len(operator)
+            if command.startswith("&", end) and operator in (">", "<"):
+                end += 1  # as in 2>&1
+                while end < len(command) and (command[end].isdigit() or command[end] == "-"):
+                    end += 1
+            return command[position:end]
+    return None
+
+
+def _word(command, position):
+    """Returns the (kind, text) tokens of the word at position, and its end."""
+    tokens = []
+    while position < len(command) and command[position] not in WORD_ENDS:
+        char = command[position]
+        if char in "'\"":
+            end = command.find(char, position + 1)
+            while char == '"' and end > 0 and command[end - 1] == "\\":
+                end = command.find(char, end + 1)
+            end = len(command) if end == -1 else end + 1
+            tokens.append(("string", command[position:end]))
+        elif char == "$" and command.startswith("{", position + 1):
+            end = command.find("}", position)
+            end = len(command) if end == -1 else end + 1
+            tokens.append(("variable", command[position:end]))
+        elif char == "$" and position + 1 < len(command) and (
+                command[position + 1].isalnum() or command[position + 1] in "_?#@*!$-"):
+            end = position + 2
+            if command[position + 1].isalpha() or command[position + 1] == "_":
+                while end < len(command) and (command[end].isalnum() or command[end] == "_"):
+                    end += 1
+            tokens.append(("variable", command[position:end]))
+        else:
+            end = position + 1
+            if char == "\\":
+                end = min(end + 1, len(command))
+            tokens.append(("argument", command[position:end]))
+        position = end
+
+    return (_merge(tokens), position)
+
+
+def _merge(tokens):
+    """Returns tokens with neighbours of the same kind joined."""
+    merged = []
+    for (kind, text) in tokens:
+        if merged and merged[-1][0] == kind:
+            merged[-1] = (kind, merged[-1][1] + text)
+        else:
+            merged.append((kind, text))
+    return merged
+
+
+def _is_assignment(word):
+    """Returns True if word is a NAME=value assignment."""
+    (name, equals, _) = word.partition("=")
+    return bool(equals) and bool(name) and (name[0].isalpha() or name[0] == "_") and all(
+        char.isalnum() or char == "_" for char in name)
+
+
+@functools.lru_cache(maxsize=64)
+def _color_table(theme_key, base_color):
+    """Returns the escape for each token kind, theme_key from _theme_key."""
+    colors = dict(json.loads(theme_key))
+    base = TextColors.get_color_code(base_color) if base_color else ""
+    return {kind: TextColors.get_color_code(colors[kind]) if kind in colors else base
+            for kind in TOKEN_KINDS}
+
+
+def _theme_key(theme):
+    """Returns a hashable key for a theme name or mapping of kinds to colors.
+
+    An unknown theme name falls back to the default theme, with a warning.
+    """
+    if isinstance(theme, str):
+        if theme not in THEMES:
+            warnings.warn("unknown typing-theme {0}, using default, themes are {1}".format(
+                theme, ", ".join(sorted(THEMES))))
+            theme = "default"
+        theme = THEMES[theme]
+    return json.dumps(sorted(theme.items()))
+
+
+def color_table(theme, base_color=None):
+    """Returns the escape sequence for each token kind of theme.
+
+    Inputs:
+    theme: a name in THEMES, or a dict of token kind to color name
+    base_color: color name for kinds the theme does not name
+    """
+    return _color_table(_theme_key(theme), base_color)
+
+
+def highlight(command, theme, base_color=None):
+    """Returns command with each token colored by theme, ending in a reset."""
+    table = color_table(theme, base_color)
+
+    parts = []
+    current = ""
+    for (kind, text) in tokenize(command):
+        escape = table[kind]
+        if escape != current:
+            parts.append(escape or RESET)
+            current = escape
+        parts.append(text)
+    parts.append(RESET)
+
+    return "".join(parts)
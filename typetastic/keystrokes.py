@@ -0,0 +1,84 @@
+"""Split text to type into keystrokes."""
+
+import re
+import unicodedata
+
+# CSI (e.g. colors), OSC (e.g. titles) and two character escape sequences
+ESCAPE_PATTERN = re.compile(
+    r"\x1b\[[0-?]*[ -/]*[@-~]"
+    r"|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)"
+    r"|\x1b[@-Z\\-_]"
+)
+
+ZERO_WIDTH_JOINER = "\u200d"
+
+
+def split_keystrokes(text):
+    """Returns text as a list of keystrokes.
+
+    Each keystroke is one visible grapheme: a character plus any combining
+    marks, variation selectors, emoji modifiers and zero width joined
+    characters. Escape sequences are invisible, so they are sent along with
+    the next keystroke (or the last one, at the end of the text) and never
+    cost a typing delay or get split across writes.
+    """
+    keystrokes = []
+    pending = ""  # escapes waiting for the next visible keystroke
+    position = 0
+
+    while position < len(text):
+        match = ESCAPE_PATTERN.match(text, position)
+        if match:
+            pending += match.group()
+            position = match.end()
+            continue
+
+        end = _grapheme_end(text, position)
+        keystrokes.append(pending + text[position:end])
+        pending = ""
+        position = end
+
+    if pending:
+        if keystrokes:
+            keystrokes[-1] += pending
+        else:
+            keystrokes.append(pending)
+
+    return keystrokes
+
+
+def _grapheme_end(text, start):
+    """Returns the end index of the grapheme starting at start."""
+    end = start + 1
+    regional = _is_regional_indicator(text[start])
+
+    while end < len(text):
+        char = text[end]
+        if _is_extender(char):
+            end += 1
+        elif char == ZERO_WIDTH_JOINER and end + 1 < len(text):
+            end += 2
+        elif regional and _is_regional_indicator(char):
+            end += 1  # flags are pairs of regional indicators
+            regional = False
+        else:
+            break
+
+    return end
+
+
+def _is_extender(char):
+    """Returns True if char extends the previous character."""
+    code = ord(char)
+    return (
+        unicodedata.combining(char) != 0
+        or unicodedata.category(char) in ("Mn", "Me", "Mc")
+        or 0xFE00 <= code <= 0xFE0F  # variation selectors
+        or 0x1F3FB <= code <= 0x1F3FF  # emoji skin tone modifiers
+        or 0xE0020 <= code <= 0xE007F  # emoji tag sequences
+    )
+
+
+def _is_regional_indicator(char):
+    """Returns True if char is a regional indicator (flag) symbol."""
+    return 0x1F1E6 <= ord(char) <= 0x1F1FF
@@ -0,0 +1,55 @@
+"""Modules imported on first use, to keep importing typetastic quick."""
+
+import importlib
+
+
+class LazyModule:
+    """Stands in for a module until one of its attributes is used.
+
+    Submodules are imported as attributes on first use too, so
+    LazyModule("pexpect").pxssh works without importing pexpect.pxssh
+    up front. Setting attributes sets them on the module, so mock.patch
+    works through a LazyModule.
+    """
+
+    __slots__ = ("_LazyModule__name", "_LazyModule__package", "_LazyModule__module")
+
+    def __init__(self, name, package=None):
+        """Sets up a stand in for module name, relative to package if given."""
+        object.__setattr__(self, "_LazyModule__name", name)
+        object.__setattr__(self, "_LazyModule__package", package)
+        object.__setattr__(self, "_LazyModule__module", None)
+
+    def _load(self):
+        """Returns the module, importing it the first time."""
+        module = self.__module
+        if module is None:
+            module = importlib.import_module(self.__name, self.__package)
+            object.__setattr__(self, "_LazyModule__module", module)
+        return module
+
+    @property
+    def __dict__(self):
+        """The module's namespace."""
+        return self._load().__dict__
+
+    def __getattr__(self, name):
+        module = self._load()
+        try:
+            return getattr(module, name)
+        except AttributeError:
+            try:
+                return importlib.import_module("{0}.{1}".format(module.__name__, name))
+            except ImportError:
+                pass
+            raise
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __delattr__(self, name):
+        delattr(self._load(), name)
+
+    def __repr__(self):
+        state = "loaded" if self.__module is not None else "not loaded"
+        return "<LazyModule {0} ({1})>".format(self.__name, state)
@@ -0,0 +1,266 @@
+"""Command output cached on disk, for rehearsals that run nothing."""
+
+import json
+import os
+import posixpath
+import shlex
+import time
+
+from .lazy_module import LazyModule
+
+# only needed with an OutputCache, imported on first use
+hashlib = LazyModule("hashlib")
+preflight = LazyModule(".preflight", __package__)
+tempfile = LazyModule("tempfile")
+
+# bump when the key or entries change, so older entries are not used
+OUTPUT_CACHE_FORMAT = 1
+
+# most bytes of cached output kept, the least recently used go first
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# output longer than this, in characters, is run every time instead of kept
+MAX_ENTRY_CHARS = 1024 * 1024
+
+# builtins that change the shell itself, commands using them always run
+STATE_BUILTINS = ("cd", "pushd", "popd", "export", "unset", "source", ".", "alias", "unalias",
+                  "set", "shopt", "declare", "typeset", "readonly", "local", "eval", "exec",
+                  "trap", "umask", "ulimit", "hash", "enable", "builtin", "function")
+
+
+def changes_state(command):
+    """Returns True if command may change the shell running it, e.g. cd or export.
+
+    Bare assignments and function definitions count, and so does a line
+    that can not be parsed.
+    """
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    try:
+        tokens = list(lexer)
+    except ValueError:
+        return True
+
+    words = []
+    for token in tokens + [";"]:
+        if token and all(char in "();<>|&" for char in token):  # ends a simple command
+            if "(" in token and words and ")" in token:
+                return True  # name() defines a function
+            if words and all(preflight.ASSIGNMENT_PATTERN.match(word) for word in words):
+                return True
+            words = []
+            continue
+        if not words and token in STATE_BUILTINS:
+            return True
+        if token not in preflight.PREFIX_WORDS:
+            words.append(token)
+
+    return False
+
+
+class OutputCache:
+    """Outputs and exit statuses of commands, a JSON file per entry.
+
+    Entries are content addressed, by the command and what its output
+    depends on (see key()). Reading an entry marks it used, and the least
+    recently used are removed once the cache is over max_bytes.
+    Unreadable entries count as misses.
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        """Sets up a cache in directory, ~/.cache/typetastic/outputs by default."""
+        if not directory:
+            base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+            directory = os.path.join(base, "typetastic", "outputs")
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.__size = None  # bytes on disk, counted on the first put
+
+    @staticmethod
+    def key(command, context="local", cwd=None, env=None):
+        """Returns the cache key of a command.
+
+        Inputs:
+        command: the command line
+        context: the block it runs in
+        cwd: the directory it runs in
+        env: dict of the variables its output depends on
+        """
+        digest = hashlib.sha256()
+        digest.update(json.dumps([OUTPUT_CACHE_FORMAT, context, cwd, env or {}, command],
+                                 sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def get(self, key, ttl=None):
+        """Returns (output, exit status) stored at key, None if missing or older than ttl."""
+        path = self._path(key)
+        try:
+            with open(path) as stream:
+                entry = json.load(stream)
+            if ttl is not None and time.time() - entry["created"] > ttl:
+                os.unlink(path)
+                entry = None
+            else:
+                os.utime(path)  # recently used
+        except (OSError, ValueError, KeyError, TypeError):
+            entry = None
+
+        if not entry:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return (entry["output"], entry["exit_status"])
+
+    def put(self, key, output, exit_status):
+        """Stores a command's output and exit status at key, returns False if not stored."""
+        payload = json.dumps({"created": time.time(), "exit_status": exit_status,
+                              "output": output}).encode("utf-8", errors="surrogateescape")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if self.__size is None:
+                self.__size = sum(size for (_, _, size) in self._entries())
+            (handle, temp_path) = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(handle, "wb") as stream:
+                stream.write(payload)
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            return False
+
+        self.__size += len(payload)
+        if self.__size > self.max_bytes:
+            self._evict()
+        return True
+
+    def _evict(self):
+        """Removes the least recently used entries until under max_bytes."""
+        entries = sorted(self._entries())
+        self.__size = sum(size for (_, _, size) in entries)
+
+        for (_, path, size) in entries:
+            if self.__size <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            self.__size -= size
+
+    def _entries(self):
+        """Returns (last used, path, size) of each entry."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+        return entries
+
+    def _path(self, key):
+        """Returns the file for key."""
+        return os.path.join(self.directory, "{0}.json".format(key))
+
+
+class CachingExecutor:
+    """An executor keeping the output of the commands it runs in an OutputCache.
+
+    When rehearsing, commands found in the cache are not run, their output
+    is replayed instead. Commands that change the shell itself (see
+    changes_state()) always run, so later commands see the directory and
+    variables they would have. The working directory is also followed
+    from the commands' cd, without asking the shell, for the cache keys.
+    Set enabled to False for a command that must always run.
+    """
+
+    def __init__(self, executor, cache, rehearse=False, ttl=None, env_names=None,
+                 context="local", cwd=None):
+        """Sets up an executor.
+
+        Inputs:
+        executor: runs the commands not served from the cache
+        cache: the OutputCache
+        rehearse: serve cached output instead of running commands
+        ttl: seconds cached output is served for, forever if None
+        env_names: names of variables from os.environ the output depends on
+        context: the block the commands run in
+        cwd: directory the first command runs in, the current directory by default
+        """
+        self.executor = executor
+        self.cache = cache
+        self.rehearse = rehearse
+        self.ttl = ttl
+        self.env = {name: os.environ.get(name) for name in env_names or ()}
+        self.context = context
+        self.cwd = cwd or os.getcwd()
+        self.session = executor.session
+        self.enabled = True
+        self.__key = None
+        self.__served = None
+
+    def send(self, command):
+        """Starts command running, unless its output is served from the cache."""
+        self.__key = None
+        if self.enabled and not changes_state(command):
+            self.__key = self.cache.key(command, self.context, self.cwd, self.env)
+        self._follow_cd(command)
+
+        self.__served = None
+        if self.__key and self.rehearse:
+            self.__served = self.cache.get(self.__key, self.ttl)
+        if self.__served is None:
+            self.executor.send(command)
+
+    def stream(self, write):
+        """Passes output to write, returns the exit status, and caches both."""
+        if self.__served is not None:
+            (output, exit_status) = self.__served
+            if output:
+                write(output)
+            return exit_status
+
+        if not self.__key:
+            return self.executor.stream(write)
+
+        kept = []
+        kept_chars = [0]
+
+        def keep(text):
+            if kept_chars[0] <= MAX_ENTRY_CHARS:
+                kept.append(text)
+                kept_chars[0] += len(text)
+            write(text)
+
+        exit_status = self.executor.stream(keep)
+        if kept_chars[0] <= MAX_ENTRY_CHARS and exit_status is not None:
+            self.cache.put(self.__key, "".join(kept), exit_status)
+        return exit_status
+
+    def _follow_cd(self, command):
+        """Updates cwd for a cd in command.
+
+        Where the directory can not be worked out (cd -, variables), the cd
+        commands since the last known directory stand in for it.
+        """
+        try:
+            cd = preflight.scan_command(command).cd
+        except ValueError:
+            return
+        if cd is None:
+            return
+
+        if cd == "~" or cd.startswith("~/"):
+            cd = os.path.expanduser(cd)
+        known = cd != "-" and not cd.startswith("~") and "$" not in cd
+        if known and (cd.startswith("/") or not self.cwd.startswith("?")):
+            self.cwd = posixpath.normpath(posixpath.join(self.cwd, cd))
+        else:
+            self.cwd = "?{0}\n{1}".format(self.cwd.lstrip("?"), cd)
+
+    def close(self):
+        """Nothing to close, the executor belongs to its owner."""
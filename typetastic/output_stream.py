@@ -0,0 +1,246 @@
+"""Command output, forwarded as it arrives, in constant memory."""
+
+import collections
+
+# config keys that can be set per command, see OutputLimiter
+OUTPUT_OPTIONS = ("output-max-bytes", "output-max-lines", "output-rate")
+
+ELISION_MARKER = "... {0} not shown ...\n"
+
+# characters of output kept for CommandResult.output
+OUTPUT_TAIL_SIZE = 4096
+
+# trailing whitespace held back before it is written anyway
+WHITESPACE_LIMIT = 65536
+
+
+class OutputFilter:
+    """Cleans output chunk by chunk, as clean_output cleans it whole.
+
+    \\r\\n becomes \\n and trailing whitespace is dropped. For remote ttys,
+    which echo the command, a leading echo of it and the newlines after
+    it are dropped too. Only a short carry, the held back whitespace and
+    a bounded tail of the output are kept.
+    """
+
+    def __init__(self, write, echo=None):
+        """Sets up a filter writing clean text to write.
+
+        Inputs:
+        write: called with each piece of clean output
+        echo: command echoed at the start of the output, to drop
+        """
+        self.write = write
+        self.chars = 0
+
+        self.__echo = echo
+        self.__head = ""
+        self.__lstrip = echo is not None
+        self.__carry = ""
+        self.__whitespace = ""
+        self.__tail = ""
+
+    def feed(self, text):
+        """Takes the next chunk of raw output."""
+        if self.__echo is not None:
+            self.__head += text
+            if len(self.__head) < len(self.__echo) and self.__echo.startswith(self.__head):
+                return
+            if self.__head.startswith(self.__echo):
+                text = self.__head[len(self.__echo):]
+            else:
+                text = self.__head
+            (self.__echo, self.__head) = (None, "")
+
+        text = self.__carry + text
+        self.__carry = ""
+        if text.endswith("\r"):  # may be the start of \r\n
+            (text, self.__carry) = (text[:-1], "\r")
+        text = text.replace("\r\n", "\n")
+
+        if self.__lstrip:
+            text = text.lstrip("\n")
+            if not text:
+                return
+            self.__lstrip = False
+
+        stripped = text.rstrip()
+        if stripped:
+            self._emit(self.__whitespace + stripped)
+            self.__whitespace = text[len(stripped):]
+        else:
+            self.__whitespace += text
+            if len(self.__whitespace) > WHITESPACE_LIMIT:
+                (whitespace, self.__whitespace) = (self.__whitespace, "")
+                self._emit(whitespace)
+
+    def close(self):
+        """Ends the output, returns its tail.
+
+        Writes the final newline if there was any output.
+        """
+        if self.__echo is not None:  # all output was a part of the echo
+            (self.__echo, self.__head) = (None, "")
+
+        if self.chars:
+            self.write("\n")
+
+        return self.__tail
+
+    def _emit(self, text):
+        """Writes clean text, keeping the tail."""
+        self.chars += len(text)
+        self.__tail = (self.__tail + text)[-OUTPUT_TAIL_SIZE:]
+        self.write(text)
+
+
+class OutputLimiter:
+    """Shows output within a line limit and byte budget, at a pace.
+
+    The first half of the allowed lines (and bytes) is shown as it
+    arrives. The rest goes through a ring buffer holding the last half,
+    shown when the output ends, after a marker saying how much was left
+    out. So memory is bounded by the limits, not by the output.
+    """
+
+    def __init__(self, write, max_lines=None, max_bytes=None, rate=None, sleep=None):
+        """Sets up a limiter writing to write.
+
+        Inputs:
+        max_lines: most lines shown, None for no limit
+        max_bytes: most bytes (utf-8) shown, None for no limit
+        rate: lines shown per second, paced by sleep, None to not pace
+        """
+        self.write = write
+        self.rate = rate
+        self.sleep = sleep
+        (self.head_lines, self.tail_lines) = _halves(max_lines)
+        (self.head_bytes, self.tail_bytes) = _halves(max_bytes)
+        self.limited = max_lines is not None or max_bytes is not None
+
+        self.dropped_lines = 0
+        self.dropped_bytes = 0
+
+        self.__lines = 0
+        self.__bytes = 0
+        self.__in_tail = False
+        self.__tail = collections.deque()  # (line, bytes)
+        self.__tail_bytes = 0
+        self.__last = "\n"
+
+    def feed(self, text):
+        """Takes the next piece of output."""
+        if not self.limited:
+            self._show(text)
+            return
+
+        if not self.__in_tail:
+            text = self._head(text)
+            if not text:
+                return
+            self.__in_tail = True
+
+        self._push_tail(text)
+
+    def close(self):
+        """Ends the output, showing the tail and the elision marker."""
+        if self.dropped_lines or self.dropped_bytes:
+            if self.dropped_lines:
+                dropped = "{0:,} lines".format(self.dropped_lines)
+            else:
+                dropped = "{0:,} bytes".format(self.dropped_bytes)
+            prefix = "" if self.__last == "\n" else "\n"
+            self._show(prefix + ELISION_MARKER.format(dropped))
+
+        self._show("".join(line for (line, _) in self.__tail))
+        self.__tail.clear()
+
+    def _head(self, text):
+        """Shows the lines of text that fit the head, returns the rest."""
+        position = 0
+        for line in _lines(text):
+            size = len(line.encode("utf-8"))
+
+            if self.head_lines is not None and self.__lines >= self.head_lines:
+                break
+            if self.head_bytes is not None and self.__bytes + size > self.head_bytes:
+                # show the start of the line that fits
+                room = self.head_bytes - self.__bytes
+                part = line.encode("utf-8")[:room].decode("utf-8", errors="ignore")
+                self.__bytes += len(part.encode("utf-8"))
+                position += len(part)
+                break
+
+            self.__bytes += size
+            if line.endswith("\n"):
+                self.__lines += 1
+            position += len(line)
+
+        self._show(text[:position])
+        return text[position:]
+
+    def _push_tail(self, text):
+        """Adds text to the ring buffer of the last lines."""
+        for line in _lines(text):
+            size = len(line.encode("utf-8"))
+            if self.__tail and not self.__tail[-1][0].endswith("\n"):
+                (last, last_size) = self.__tail.pop()
+                (line, size) = (last + line, last_size + size)
+                self.__tail_bytes -= last_size
+            self.__tail.append((line, size))
+            self.__tail_bytes += size
+
+            while self.tail_lines is not None and len(self.__tail) > self.tail_lines:
+                self._drop_oldest()
+
+            while self.tail_bytes is not None and self.__tail_bytes > self.tail_bytes:
+                (oldest, oldest_size) = self.__tail[0]
+                excess = self.__tail_bytes - self.tail_bytes
+                if excess < oldest_size:  # keep the end of the line
+                    kept = oldest.encode("utf-8")[excess:].decode("utf-8", errors="ignore")
+                    kept_size = len(kept.encode("utf-8"))
+                    self.__tail[0] = (kept, kept_size)
+                    self.__tail_bytes -= oldest_size - kept_size
+                    self.dropped_bytes += oldest_size - kept_size
+                else:
+                    self._drop_oldest()
+
+    def _drop_oldest(self):
+        """Drops the oldest line of the ring buffer."""
+        (line, size) = self.__tail.popleft()
+        self.__tail_bytes -= size
+        self.dropped_bytes += size
+        if line.endswith("\n"):
+            self.dropped_lines += 1
+
+    def _show(self, text):
+        """Writes text, a line at a time if there is a rate to pace it to."""
+        if not text:
+            return
+
+        self.__last = text[-1]
+        if not self.rate:
+            self.write(text)
+            return
+
+        for line in _lines(text):
+            self.write(line)
+            if line.endswith("\n"):
+                self.sleep(1.0 / self.rate)
+
+
+def _lines(text):
+    """Yields the lines of text, each with its \\n, the last may have none."""
+    position = 0
+    while position < len(text):
+        end = text.find("\n", position)
+        end = len(text) if end == -1 else end + 1
+        yield text[position:end]
+        position = end
+
+
+def _halves(limit):
+    """Returns a limit split into head and tail halves, (None, None) for no limit."""
+    if limit is None:
+        return (None, None)
+    return ((limit + 1) // 2, limit // 2)
@@ -0,0 +1,140 @@
+"""Compiled plans of commands, cached on disk by script content and config."""
+
+import collections
+import json
+import os
+
+from .lazy_module import LazyModule
+from . import handler_registry
+from .output_stream import OUTPUT_OPTIONS
+
+# only needed with a PlanCache, imported on first use
+hashlib = LazyModule("hashlib")
+pickle = LazyModule("pickle")
+tempfile = LazyModule("tempfile")
+
+# bump when Step changes, so older cache files are not used
+PLAN_FORMAT = 4
+
+# config keys that change what a plan holds
+PLAN_CONFIG_KEYS = ("typing-color", "typing-speed", "typing-theme")
+
+# options a command can set for itself, see split_command
+COMMAND_OPTIONS = OUTPUT_OPTIONS + ("cache",)
+
+# one command, ready to run
+#   number: position in the script, from 1
+#   block: local, ssh or python3, with block_start/block_end marking its edges
+#   handler: the bot handler to call
+#   typed: the colored string to type
+#   delays: seconds before each keystroke of typed
+#   target: SSHTarget of the ssh block, None for other blocks
+#   options: (key, value) pairs of COMMAND_OPTIONS set for this command
+Step = collections.namedtuple("Step", [
+    "number", "block", "block_start", "block_end", "command",
+    "handler", "typed", "delays", "target", "options"])
+
+# steps, and the config snapshot they were compiled with
+Plan = collections.namedtuple("Plan", ["steps", "config"])
+
+# a script file's parsed data and its compiled plan
+CachedPlan = collections.namedtuple("CachedPlan", ["data", "plan"])
+
+
+def split_command(item):
+    """Returns (command, options) of a script command.
+
+    A command is a string, or a dict with the string under "command" and
+    options (see COMMAND_OPTIONS) for it alone, e.g.
+    {"command": "journalctl", "output-max-lines": 20}, or
+    {"command": "date", "cache": False} to always run it.
+    """
+    if isinstance(item, dict) and "command" in item:
+        options = tuple(sorted((key, value) for (key, value) in item.items()
+                               if key in COMMAND_OPTIONS))
+        return (item["command"], options)
+
+    return (item, ())
+
+
+def config_snapshot(config):
+    """Returns the values of the plan config keys, as a tuple."""
+    return tuple(config.get(key) for key in PLAN_CONFIG_KEYS)
+
+
+class PlanCache:
+    """Compiled plans on disk, a pickle file per script and config.
+
+    Reading a cached plan skips parsing YAML and compiling, so loading
+    large scripts is quick. Unreadable entries count as misses.
+    """
+
+    def __init__(self, directory=None):
+        """Sets up a cache in directory, ~/.cache/typetastic/plans by default."""
+        if not directory:
+            base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+            directory = os.path.join(base, "typetastic", "plans")
+
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, path, config):
+        """Returns (key, CachedPlan) for a script file, CachedPlan is None on a miss."""
+        with open(path, "rb") as stream:
+            source = stream.read()
+
+        key = self.key(source, config)
+        cached = self.get(key)
+        if cached:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        return (key, cached)
+
+    @staticmethod
+    def key(source, config):
+        """Returns the cache key of script source bytes under config and handlers."""
+        digest = hashlib.sha256()
+        digest.update(str(PLAN_FORMAT).encode())
+        digest.update(json.dumps(config_snapshot(config), sort_keys=True).encode())
+        digest.update(handler_registry.default_registry().signature().encode())
+        digest.update(source)
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Returns the CachedPlan stored at key, or None."""
+        try:
+            with open(self._path(key), "rb") as stream:
+                cached = pickle.load(stream)
+        except Exception:  # pylint: disable=broad-except
+            return None
+
+        return cached if isinstance(cached, CachedPlan) else None
+
+    def put(self, key, cached):
+        """Stores a CachedPlan at key, returns False if it could not be stored.
+
+        Plans holding handlers that can not be pickled (e.g. mocks) are not
+        stored.
+        """
+        try:
+            payload = pickle.dumps(cached, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            return False
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            (handle, temp_path) = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(handle, "wb") as stream:
+                stream.write(payload)
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            return False
+
+        return True
+
+    def _path(self, key):
+        """Returns the file for key."""
+        return os.path.join(self.directory, "{0}.pickle".format(key))
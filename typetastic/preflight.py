@@ -0,0 +1,320 @@
+"""Check a script before a recording: commands, ssh targets and files."""
+
+import collections
+import concurrent.futures
+import os
+import posixpath
+import re
+import shlex
+
+from . import bot_handlers as bothan
+from .lazy_module import LazyModule
+from .prompt_sentinel import SHELL_SENTINEL
+
+pexpect = LazyModule("pexpect")
+pxssh = LazyModule("pexpect.pxssh")
+
+# one thing that would go wrong in the run
+#   step: number of the first step it affects
+#   command: that step's command
+#   host: the ssh host it was checked on, None for the local shell
+#   message: what is wrong
+Problem = collections.namedtuple("Problem", ["step", "command", "host", "message"])
+
+# what a command line needs and does, as far as can be told without running it
+#   names: commands it runs, looked up with command -v
+#   reads: files it reads, which must exist
+#   writes: files it creates, for later commands to read
+#   cd: directory it changes to, None if it does not
+CommandScan = collections.namedtuple("CommandScan", ["names", "reads", "writes", "cd"])
+
+# commands whose arguments are files to read, with their options taking a value
+FILE_COMMANDS = {
+    "cat": "", "less": "", "more": "", "wc": "", "diff": "",
+    "head": "nc", "tail": "nc", "source": "", ".": ""
+}
+
+# words before the command of a simple command
+PREFIX_WORDS = ("!", "{", "if", "elif", "then", "else", "while", "until", "do",
+                "time", "exec", "nohup")
+
+# words starting something other than a simple command
+SKIP_WORDS = ("for", "case", "select", "function", "in", "}", "fi", "done", "esac",
+              "[[", "((")
+
+REDIRECT_WRITES = (">", ">>", ">|", "&>", "&>>")
+REDIRECT_SKIPS = ("<<", "<<-", "<<<", ">&", "<&")
+
+ASSIGNMENT_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*=")
+DYNAMIC_CHARS = "$`*?["
+MISSING_PATTERN = re.compile(r"tt-missing-(command|file):([0-9]+)")
+
+
+def scan_command(command):
+    """Returns the CommandScan of a shell command line.
+
+    Pipelines, lists and redirections are followed, variables, globs and
+    command substitutions are not. Raises ValueError if the line can not
+    be parsed, e.g. an unclosed quote, which would leave the shell waiting.
+    """
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    tokens = list(lexer)
+
+    scan = CommandScan([], [], [], None)
+    words = []
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        target = tokens[index + 1] if index + 1 < len(tokens) else None
+
+        if token in REDIRECT_WRITES + ("<",) + REDIRECT_SKIPS:
+            if words and words[-1].isdigit():  # a file descriptor, as in 2>
+                words.pop()
+            if target is not None and not _is_dynamic(target):
+                if token in REDIRECT_WRITES:
+                    scan.writes.append(target)
+                elif token == "<":
+                    scan.reads.append(target)
+            index += 2
+            continue
+
+        if token and all(char in "();<>|&" for char in token):  # ends a simple command
+            scan = _scan_words(words, scan)
+            words = []
+        else:
+            words.append(token)
+        index += 1
+
+    return _scan_words(words, scan)
+
+
+def _scan_words(words, scan):
+    """Adds the words of one simple command to scan, returns it."""
+    while words and (words[0] in PREFIX_WORDS or ASSIGNMENT_PATTERN.match(words[0])):
+        words = words[1:]
+    if not words or words[0] in SKIP_WORDS or _is_dynamic(words[0]):
+        return scan
+
+    name = words[0]
+    if name == "cd":
+        return scan._replace(cd=words[1] if len(words) > 1 else "~")
+
+    if "/" in name:
+        scan.reads.append(name)
+    else:
+        scan.names.append(name)
+
+    options = FILE_COMMANDS.get(name)
+    if options is not None:
+        arguments = iter(words[1:])
+        for argument in arguments:
+            if argument.startswith("-") and len(argument) > 1:
+                if len(argument) == 2 and argument[1] in options:  # value follows, as in -n 5
+                    next(arguments, None)
+            elif not _is_dynamic(argument):
+                scan.reads.append(argument)
+
+    return scan
+
+
+def _is_dynamic(word):
+    """Returns True if the shell would expand word into something else."""
+    return any(char in word for char in DYNAMIC_CHARS)
+
+
+class Shell:
+    """What a preflight needs to check in one shell, local or remote.
+
+    Paths are resolved against the shell's working directory as the
+    commands change it, and files written by earlier commands are taken to
+    exist. Once the directory can not be known (cd -), relative paths are
+    no longer checked.
+    """
+
+    def __init__(self, cwd):
+        self.cwd = cwd
+        self.names = collections.OrderedDict()  # name -> step
+        self.files = collections.OrderedDict()  # path -> step
+        self.written = set()
+
+    def add(self, step, scan):
+        """Adds the needs of a step's CommandScan."""
+        cwd = self.cwd
+        if scan.cd is not None:  # relative paths may come before or after it
+            self.cwd = None
+
+        for name in scan.names:
+            self.names.setdefault(name, step)
+        for path in scan.reads:
+            path = self.resolve(path)
+            if path and path not in self.written:
+                self.files.setdefault(path, step)
+        for path in scan.writes:
+            path = self.resolve(path)
+            if path:
+                self.written.add(path)
+
+        if scan.cd is not None and scan.cd != "-":
+            self.cwd = cwd
+            self.cwd = self.resolve(scan.cd)
+
+    def resolve(self, path):
+        """Returns path against the working directory, None if unknown."""
+        if path.startswith("~") and path != "~" and not path.startswith("~/"):
+            return None  # another user's home
+        if path.startswith(("/", "~")):
+            return posixpath.normpath(path)
+        if self.cwd is None:
+            return None
+        return posixpath.normpath(posixpath.join(self.cwd, path))
+
+    def check_line(self):
+        """Returns one command line checking every name and file, None if none.
+
+        Missing ones are printed as tt-missing-KIND:INDEX, built by printf
+        so a terminal echo of the line never matches.
+        """
+        checks = []
+        for (index, name) in enumerate(self.names):
+            checks.append("command -v {0} >/dev/null 2>&1 || printf 'tt-missing-%s:%d\\n' "
+                          "command {1}".format(shlex.quote(name), index))
+        for (index, path) in enumerate(self.files):
+            checks.append("[ -e {0} ] || printf 'tt-missing-%s:%d\\n' file {1}".format(
+                _shell_path(path), index))
+
+        return "; ".join(checks) if checks else None
+
+    def problems(self, output, steps, host=None):
+        """Returns the Problems in the output of check_line()."""
+        names = list(self.names.items())
+        files = list(self.files.items())
+
+        found = []
+        for match in MISSING_PATTERN.finditer(output):
+            index = int(match.group(2))
+            if match.group(1) == "command":
+                (name, step) = names[index]
+                message = "command not found: {0}".format(name)
+            else:
+                (name, step) = files[index]
+                message = "no such file: {0}".format(name)
+            found.append(Problem(step, steps[step], host, message))
+
+        return found
+
+
+def _shell_path(path):
+    """Returns path quoted for the shell, with ~ expanded to $HOME."""
+    if path == "~":
+        return '"$HOME"'
+    if path.startswith("~/"):
+        return '"$HOME"/' + shlex.quote(path[2:])
+    return shlex.quote(path)
+
+
+def check_steps(steps, pool, ssh_pool, timeout=30):
+    """Checks plan steps, returns a list of Problems, ordered by step.
+
+    Commands run by the bot are looked up with command -v, and files they
+    read are checked to exist, in one batched command line per shell. The
+    local shell and each ssh target, logged in to check reachability and
+    authentication, are checked in parallel, so the check takes about one
+    round trip per host. Connections go back to the pools, ready for the
+    run.
+    """
+    commands = {}
+    local = Shell(os.getcwd())
+    remotes = collections.OrderedDict()  # SSHTarget -> (Shell, first step)
+    problems = []
+
+    shell = local
+    for step in steps:
+        commands[step.number] = step.command
+
+        if step.block == "ssh" and step.block_start:
+            local.add(step.number, CommandScan(["ssh"], [], [], None))
+            if step.target and step.target.identity:
+                local.add(step.number, CommandScan([], [step.target.identity], [], None))
+            if step.target not in remotes:
+                remotes[step.target] = (Shell("~"), step.number)
+            shell = remotes[step.target][0]
+            shell.cwd = "~"  # connections are reset to home when checked out
+            continue
+
+        if step.block == "python3":
+            if not step.block_start:
+                continue  # python code, not a shell command
+        elif step.handler is not bothan.bot_handler_default:
+            continue
+
+        try:
+            scan = scan_command(step.command)
+        except ValueError as error:
+            problems.append(Problem(step.number, step.command, None,
+                                    "can not parse: {0}".format(error)))
+            continue
+
+        (local if step.block != "ssh" else shell).add(step.number, scan)
+
+    connections = {target: ssh_pool.checkout(target) for target in remotes if target.host}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1 + len(remotes)) as executor:
+        jobs = [executor.submit(_check_local, local, commands, pool, timeout)]
+        for (target, (remote, first_step)) in remotes.items():
+            jobs.append(executor.submit(_check_remote, target, remote, first_step, commands,
+                                        ssh_pool, connections.get(target), timeout))
+
+        for job in jobs:
+            problems.extend(job.result())
+
+    problems.sort(key=lambda problem: problem.step)
+    return problems
+
+
+def _check_local(shell, commands, pool, timeout):
+    """Returns the Problems of the local shell."""
+    line = shell.check_line()
+    if not line:
+        return []
+
+    session = pool.acquire()
+    try:
+        session.sendline(line)
+        output = SHELL_SENTINEL.wait(session, timeout=timeout).output
+    finally:
+        pool.release(session)
+
+    return shell.problems(output, commands)
+
+
+def _check_remote(target, shell, first_step, commands, ssh_pool, ssh_conn, timeout):
+    """Returns the Problems of one ssh target, logging in to it."""
+    def problem(message):
+        return [Problem(first_step, commands[first_step], target.host, message)]
+
+    if not target.host:
+        return problem("no ssh host")
+
+    try:
+        if not ssh_pool.login(ssh_conn, target):
+            return problem("ssh login failed: connection closed")
+
+        line = shell.check_line()
+        output = ""
+        if line:
+            ssh_conn.sendline(line)
+            result = SHELL_SENTINEL.wait(ssh_conn, timeout=timeout)
+            if result.exit_status is None:
+                ssh_pool.release(ssh_conn)
+                return problem("ssh connection lost")
+            output = result.output
+        ssh_pool.release(ssh_conn)
+
+    except pxssh.ExceptionPxssh as error:
+        return problem("ssh login failed: {0}".format(error))
+    except (pexpect.EOF, pexpect.TIMEOUT):
+        return problem("ssh connection lost")
+    except pexpect.ExceptionPexpect as error:
+        return problem("ssh failed: {0}".format(error))
+
+    return shell.problems(output, commands, host=target.host)
@@ -0,0 +1,133 @@
+"""Prompt sentinel, marks the point a shell is ready for the next command."""
+
+import codecs
+import collections
+import re
+import uuid
+
+from .lazy_module import LazyModule
+
+pexpect = LazyModule("pexpect")
+
+# most characters read from a session at once, see PromptSentinel.stream
+CHUNK_SIZE = 65536
+
+# longest exit status, in digits
+STATUS_DIGITS = 3
+
+# the result of one command, read back from a single prompt sentinel,
+# exit_status is None if the session ended or timed out before it
+CommandResult = collections.namedtuple("CommandResult", ["output", "exit_status"])
+
+
+class PromptSentinel:
+    """A unique marker the shell prints in place of a prompt.
+
+    The marker is wrapped in ASCII record separators, which terminals do not
+    render, and carries the exit status of the last command. So one prompt
+    read gives both the command output and its exit status.
+
+    The separators are produced by printf when PS1 is set, and $? is only
+    expanded when the prompt is printed, so the PS1 string itself
+    (e.g. `echo $PS1`) never matches.
+    """
+
+    def __init__(self, token=None):
+        """Creates a sentinel, with a random token if none is given."""
+        self.token = token or uuid.uuid4().hex[:12]
+        self.prefix = "\x1ett-{0}:".format(self.token)
+        # kept as a str, pexpect compiles it for str and bytes sessions
+        self.pattern = re.escape(self.prefix) + "([0-9]+)\x1e"
+        self.regex = re.compile(self.pattern)
+        # the most of a sentinel that can end a chunk, with the next chunk to come
+        self.carry = len(self.prefix) + STATUS_DIGITS
+
+    def shell_setup(self):
+        """Returns the command line that installs the sentinel prompt.
+
+        Kept to POSIX sh syntax, so it works for remote shells too.
+        """
+        return ("unset PROMPT_COMMAND; PS2=''; "
+                "bind 'set enable-bracketed-paste off' 2>/dev/null; "
+                "PS1=\"$(printf '\\036')tt-{0}:\"'$?'\"$(printf '\\036')\""
+                ).format(self.token)
+
+    def install(self, session):
+        """Installs the sentinel prompt, discarding any startup output."""
+        session.sendline(self.shell_setup())
+        self.wait(session)
+
+    def wait(self, session, timeout=-1):
+        """Waits for the sentinel, returns a CommandResult.
+
+        No fixed delay is used, the session timeout decides how long a
+        command may run (None waits forever), unless a timeout is given.
+        Works for str and bytes sessions, output is always returned as str.
+        If the session ends, or the timeout passes, first the exit status
+        is None.
+        """
+        try:
+            session.expect(self.pattern, timeout=timeout)
+            exit_status = int(session.match.group(1))
+        except (pexpect.EOF, pexpect.TIMEOUT):
+            exit_status = None
+
+        output = session.before
+        if isinstance(output, bytes):
+            output = output.decode("utf-8", errors="replace")
+
+        return CommandResult(output, exit_status)
+
+    def stream(self, session, write, timeout=-1):
+        """Passes output to write as it arrives, until the sentinel.
+
+        Output is read in chunks of up to CHUNK_SIZE, and only each new
+        chunk and a carry shorter than the sentinel are searched, so the
+        time and memory used do not grow with the output. Works for str and
+        bytes sessions, write is always given str.
+
+        Returns:
+        The exit status, None if the session ended, or the timeout passed,
+        before the sentinel.
+        """
+        decoder = None
+        if isinstance(session.buffer, bytes):
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+        def decode(data):
+            return decoder.decode(data) if decoder else data
+
+        # left over from an earlier expect
+        text = decode(session.buffer)
+        session.buffer = session.buffer[:0]
+
+        while True:
+            if "\x1e" in text:
+                match = self.regex.search(text)
+                if match:
+                    if match.start():
+                        write(text[:match.start()])
+                    rest = text[match.end():]
+                    session.buffer = rest.encode("utf-8") if decoder else rest
+                    return int(match.group(1))
+
+            cut = len(text) - self.carry
+            if cut > 0:
+                write(text[:cut])
+                text = text[cut:]
+
+            try:
+                text += decode(session.read_nonblocking(CHUNK_SIZE, timeout))
+            except (pexpect.EOF, pexpect.TIMEOUT):
+                if text:
+                    write(text)
+                return None
+
+
+def clean_output(output):
+    """Returns command output ready for printing."""
+    return output.replace("\r\n", "\n").rstrip()
+
+
+# shared by every shell the robot sets up, local and remote
+SHELL_SENTINEL = PromptSentinel()
@@ -0,0 +1,152 @@
+"""The python3 interactive interpreter, driven through sentinel prompts."""
+
+import atexit
+import os
+import tempfile
+
+from .prompt_sentinel import SHELL_SENTINEL
+
+# prompts shown for the interpreter, which really prints the sentinel
+PS1 = ">>> "
+PS2 = "... "
+
+# statuses the interpreter prompts carry, out of range of shell exit statuses
+READY = 500  # ps1, the statement ran
+FAILED = 501  # ps1, the statement raised an exception
+CONTINUATION = 502  # ps2, the statement is not complete yet
+
+# run by the interpreter at startup, see startup_file()
+STARTUP_SOURCE = '''\
+"""Prompts for typetastic, ps1 carries whether the last statement raised."""
+
+
+def _tt_install(prefix):
+    import os
+    import sys
+
+    class Prompt:
+        failed = False
+
+        def __str__(self):
+            status = {failed} if self.failed else {ready}
+            self.failed = False
+            return "%s%d\\x1e" % (prefix, status)
+
+    prompt = Prompt()
+    excepthook = sys.excepthook
+
+    def hook(*exc_info):
+        prompt.failed = True
+        excepthook(*exc_info)
+
+    sys.excepthook = hook
+    sys.ps1 = prompt
+    sys.ps2 = "%s%d\\x1e" % (prefix, {continuation})
+
+    user_startup = os.environ.pop("TT_PYTHONSTARTUP", "")
+    if user_startup:
+        os.environ["PYTHONSTARTUP"] = user_startup
+    else:
+        os.environ.pop("PYTHONSTARTUP", None)
+    return user_startup
+
+
+_tt_user_startup = _tt_install({prefix!r})
+if _tt_user_startup:
+    with open(_tt_user_startup) as _tt_stream:
+        exec(compile(_tt_stream.read(), _tt_user_startup, "exec"))
+    del _tt_stream
+del _tt_install, _tt_user_startup
+'''
+
+_STARTUP_FILES = {}
+
+
+def startup_file(sentinel=SHELL_SENTINEL):
+    """Returns the PYTHONSTARTUP file installing the sentinel prompts.
+
+    Written once per sentinel, and removed when the process exits.
+    """
+    if sentinel.token not in _STARTUP_FILES:
+        (handle, path) = tempfile.mkstemp(prefix="tt-python-", suffix=".py")
+        with os.fdopen(handle, "w") as stream:
+            stream.write(STARTUP_SOURCE.format(
+                prefix=sentinel.prefix, ready=READY, failed=FAILED, continuation=CONTINUATION))
+        atexit.register(_remove, path)
+        _STARTUP_FILES[sentinel.token] = path
+
+    return _STARTUP_FILES[sentinel.token]
+
+
+def _remove(path):
+    """Removes a file, if it is still there."""
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+class PythonREPL:
+    """A python3 interpreter started from a shell session.
+
+    The interpreter's prompts print the shell's prompt sentinel, with a
+    status no shell exit status can have, so one streamed read gives a
+    statement's output and whether it completed, raised an exception, or
+    needs more lines. When the interpreter exits, the shell's own sentinel
+    follows, with its exit status. Once the session ends, or a read times
+    out, the interpreter is lost, and nothing more is sent.
+    """
+
+    def __init__(self, session, sentinel=SHELL_SENTINEL):
+        self.session = session
+        self.sentinel = sentinel
+        self.running = False
+        self.continuation = False
+        self.lost = False
+
+    def start(self, command, write):
+        """Runs the shell command starting the interpreter.
+
+        Returns:
+        READY if the interpreter started, else the command's exit status,
+        None if the session was lost.
+        """
+        if self.lost:
+            return None
+        self.session.sendline(
+            'TT_PYTHONSTARTUP="$PYTHONSTARTUP" PYTHONSTARTUP={0} PYTHON_BASIC_REPL=1 {1}'.format(
+                startup_file(self.sentinel), command))
+        return self._read(write)
+
+    def send(self, line, write):
+        """Sends one line of a statement, returns its status.
+
+        Returns:
+        READY, FAILED or CONTINUATION, or the shell exit status if the
+        interpreter exited, None if the session was lost.
+        """
+        if self.lost:
+            return None
+        self.session.sendline(line)
+        return self._read(write)
+
+    def send_eof(self, write):
+        """Sends end of input, which exits the interpreter at its prompt."""
+        if self.lost:
+            return None
+        self.session.sendcontrol("d")
+        return self._read(write)
+
+    def prompt(self):
+        """Returns the prompt to show next, None once the interpreter exited."""
+        if not self.running:
+            return None
+        return PS2 if self.continuation else PS1
+
+    def _read(self, write):
+        """Streams output until a prompt, and tracks the interpreter's state."""
+        status = self.sentinel.stream(self.session, write)
+        self.lost = status is None
+        self.running = status in (READY, FAILED, CONTINUATION)
+        self.continuation = status == CONTINUATION
+        return status
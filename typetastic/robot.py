@@ -1,14 +1,39 @@
 """TypeTastic"""
 
+import collections
+import shutil
 import time
-import yaml
-import pexpect
-from pexpect import pxssh
-
 
+from . import executors
+from . import plan
+from . import python_repl
 from . import text_colors
 from . import bot_handlers as bothan
+from . import checkpoint
+from . import handler_registry
+from . import highlight
 from . import session_config
+from . import shell_pool
+from . import timeline
+from .clock import SystemClock, VirtualClock
+from .lazy_module import LazyModule
+from .script_stream import ScriptStream
+from .ssh_pool import SSHPool, parse_ssh_target
+from .terminal import Terminal
+from .timeline import Timeline
+from .tracing import Tracer
+
+# only needed by some runs, imported on first use
+asciicast = LazyModule(".asciicast", __package__)
+output_cache = LazyModule(".output_cache", __package__)
+pexpect = LazyModule("pexpect")
+preflight = LazyModule(".preflight", __package__)
+segments = LazyModule(".segments", __package__)
+svg_render = LazyModule(".svg_render", __package__)
+yaml = LazyModule("yaml")
+
+# most failed results a streamed run keeps, the latest
+STREAMED_FAILURES_KEPT = 1000
 
 
 class Robot:
@@ -23,12 +48,40 @@ class Robot:
 
     Editors = ["vi", "vim", "emacs"]
 
-    def __init__(self):
+    def __init__(self, clock=None, pool=None, ssh_pool=None, plan_cache=None, tracer=None,
+                 executor=None, output_cache=None):
+        """Sets up a robot.
+
+        Inputs:
+        clock: overrides the clock picked for each run
+        pool: ShellPool to take shells from, kept across runs until close(),
+            a new one each run is closed when the run ends
+        ssh_pool: SSHPool to take ssh connections from, kept across runs
+            until close(), a new one each run is closed when the run ends
+        plan_cache: PlanCache of compiled script files
+        tracer: Tracer to record spans of each run on
+        executor: overrides the executor config, e.g. a FakeExecutor, shared across runs
+        output_cache: OutputCache of local command output, used by every run if given
+        """
 
         self.__data = {}
         self.__config = session_config.SessionConfig()
+        self.__clock = clock
+        self.__pool = pool or shell_pool.ShellPool()
+        self.__ssh_pool = ssh_pool or SSHPool()
+        self.__shared_pools = (pool is not None, ssh_pool is not None)
+        self.__executor = executor
+        self.__output_cache = output_cache
+        self.__checkpoints = {}
+        self.__timeline = None
+        self.__plan = None
+        self.__plan_cache = plan_cache
+        self.__tracer = tracer
+        self.__run_tracer = None
 
         self.__successful_commands = 0
+        self.__commands_run = 0
+        self.__results = []
 
     def load(self, data_source):
         """Loads data either from file, dict or an array.
@@ -39,9 +92,12 @@ class Robot:
         dict of commands: {"commands": ['ls', 'uptime']}
         dict of config: {"config": {'typing-color': 'red'} }
         str of file path: "myfiledata.yaml"
+        ScriptStream: ScriptStream("myfiledata.yaml"), commands are parsed as they run
         """
 
         result = None
+        cache_key = None
+        cached = None
 
         if isinstance(data_source, dict):
             if "commands" in data_source or "config" in data_source:
@@ -51,184 +107,622 @@ class Robot:
             result = {"commands": data_source}
 
         if isinstance(data_source, str):
-            result = self._load_file(data_source)
+            if self.__plan_cache:
+                (cache_key, cached) = self.__plan_cache.lookup(data_source, self.__config.get())
+            result = cached.data if cached else self._load_file(data_source)
+
+        if isinstance(data_source, ScriptStream):
+            result = {"config": data_source.config}
+            self.__data["commands"] = data_source
+            self.__plan = None
 
         if result:
             if "commands" in result and isinstance(result["commands"], list):
                 self.__data["commands"] = result["commands"]
+                self.__plan = None
             if "config" in result:
                 # we .update() to merge into existing config defaults
                 for key in result["config"]:
                     self.__config.set(key, result["config"][key])
 
+        if cached:
+            self.__plan = cached.plan
+        elif cache_key and result and "commands" in self.__data:
+            self._get_plan()
+            self.__plan_cache.put(cache_key, plan.CachedPlan(result, self.__plan))
+
     @staticmethod
     def setup_shell(prompt, shell="/bin/bash"):
+        # pylint: disable=unused-argument
         """Returns a pexpect spawn object.
 
-        TODO: unit test
+        The shell prompt is replaced by the prompt sentinel, so commands are
+        complete as soon as the sentinel is read back. The visible prompt is
+        emitted by the robot itself.
         """
+        return shell_pool.spawn_shell(shell)
 
-        session = pexpect.spawn(shell, timeout=None, encoding='utf-8', echo=False)
-        while True:
-            session.expect_exact(['# ', '$ ', '\r\n', pexpect.EOF, pexpect.TIMEOUT])
-            if not session.buffer:
-                break
-
-        session.sendline("export PS1='{0}'".format(prompt))
-        time.sleep(0.2)
-        while True:
-            session.expect_exact([prompt, '\r\n', pexpect.EOF, pexpect.TIMEOUT])
-            if not session.buffer:
-                break
-
-        return session
-
-    def run(self):
+    def run(self, start_at=1, fast_forward=False, stop_at=None):
         """Run the currently loaded commands.
 
+        Inputs:
+        start_at: number of the step to start at, from 1, e.g. the one that
+            failed in the last take
+        fast_forward: run the steps before start_at unseen, instead of
+            restoring the shell state from the checkpoint of start_at
+        stop_at: number of the last step to run, the last in the script if None
+
         Returns:
         The number of commands with a success exit code.
         """
-        typing_speed = self.__config.get("typing-speed")
-
         self.__successful_commands = 0  # reset this
+        self.__commands_run = 0
+        self.__results = []
+        if self._is_streamed():
+            self.__results = collections.deque(maxlen=STREAMED_FAILURES_KEPT)
 
         if "commands" in self.__data:
 
+            terminal = self._setup_terminal()
+
             # prompt = self._get_config("prompt-string")
             prompt = self.__config.get("prompt-string")
-            bothan.emit_prompt(prompt)
+            bothan.emit_prompt(prompt, terminal)
 
-            shell = Robot.setup_shell(prompt)
+            try:
+                with terminal.tracer.span("run"):
+                    self._run_steps(terminal, start_at, fast_forward, stop_at)
+            finally:
+                self._close_own_pools()
 
-            for command in self.__data["commands"]:
+            if self.__timeline:
+                self._write_outputs(self.__timeline.events())
 
-                if isinstance(command, dict) and "ssh" in command:
-                    ssh_conn = pxssh.pxssh()  # must be shared across all commands
+            if self.__config.get("trace-file"):
+                terminal.tracer.write_chrome_trace(self.__config.get("trace-file"))
 
-                    for remote_command in command["ssh"]:
+    def render_segments(self, workers=None):
+        """Renders the loaded commands headless, cut into segments after each PAUSE or editor.
 
-                        handler_data = {
-                            "remote": ssh_conn,
-                            "local": None,
-                            "command": remote_command,
-                            "typing_speed": self._get_typing_speeds(typing_speed),
-                            "config": self.__config.get(),
-                            "get_exit_status": True
-                        }
+        The segments render at once, each in its own process and shell,
+        starting from the checkpoint of its first step, so a render takes
+        as long as its longest segment. Each segment gets its own event,
+        cast and svg files (demo.2.cast for the second of demo.cast), and
+        the configured files get the segments stitched back together.
 
-                        result = self.run_task(handler_data)
+        Without a checkpoint for the start of every segment, e.g. before
+        the first render with a checkpoint-file, the commands run once in
+        order instead, recording them, and the run is cut up after.
 
-                        if result:
-                            self.__successful_commands += 1
+        The spans each segment records are merged into one trace, where
+        the segments overlap.
 
-                elif isinstance(command, dict) and "python3" in command:
+        Returns:
+        The list of segments.Segment rendered.
+        """
+        if self._is_streamed():
+            raise ValueError("streamed commands can not be rendered in segments")
+        if "commands" not in self.__data:
+            return []
+
+        parts = segments.split(self._get_plan())
+        outcomes = None
+        if len(parts) > 1:
+            outcomes = segments.render_parallel(
+                self.__data["commands"], self.__config.get(), parts, workers)
+
+        if outcomes is None:
+            headless = self.__config.get("headless")
+            self.__config.set("headless", True)
+            try:
+                self.run()
+            finally:
+                self.__config.set("headless", headless)
+            if len(parts) > 1:
+                for (number, events) in enumerate(segments.split_events(self.__timeline.events())):
+                    self._write_outputs(events, number + 1)
+            return parts
+
+        self.__results = [result for (results, _, _) in outcomes for result in results]
+        self.__commands_run = len(self.__results)
+        self.__successful_commands = sum(1 for result in self.__results if result["success"])
+        self.__timeline = None
+        self._write_outputs(segments.stitch([events for (_, events, _) in outcomes]))
+
+        self.__run_tracer = self.__tracer
+        if not self.__run_tracer and self.__config.get("trace-file"):
+            self.__run_tracer = Tracer()
+        if self.__run_tracer and self.__run_tracer.enabled:
+            segments.merge_spans(self.__run_tracer, [spans for (_, _, spans) in outcomes])
+            if self.__config.get("trace-file"):
+                self.__run_tracer.write_chrome_trace(self.__config.get("trace-file"))
+        return parts
+
+    def _write_outputs(self, events, segment=None):
+        """Writes the event, cast and svg files configured, of a segment if numbered."""
+        def path(key):
+            if segment is None:
+                return self.__config.get(key)
+            return segments.segment_path(self.__config.get(key), segment)
+
+        if self.__config.get("event-file"):
+            timeline.write_events(events, path("event-file"))
+
+        if self.__config.get("cast-file"):
+            asciicast.write_cast(
+                events,
+                path("cast-file"),
+                pause_gap=self.__config.get("cast-pause-gap"),
+                pause_marker=self.__config.get("cast-pause-marker")
+            )
+
+        if self.__config.get("svg-file"):
+            size = tuple(shutil.get_terminal_size())
+            frame_list = svg_render.frames(
+                events,
+                size=size,
+                pause_gap=self.__config.get("cast-pause-gap")
+            )
+            svg_render.render_svg(frame_list, path("svg-file"), size=size)
+
+    def _run_steps(self, terminal, start_at=1, fast_forward=False, stop_at=None):
+        """Runs each step of the plan from start_at, on the executor.
+
+        The pty executor, and python3 blocks, run in a shell from the pool.
+        Steps before start_at are skipped, the shell put back in the state
+        of the checkpoint of start_at, or with fast_forward (or no such
+        checkpoint), they are run unseen with no typing delays. The steps
+        of start_at's python3 block, and its ssh login, are always run.
+        """
+        tracer = terminal.tracer
+        hidden = Terminal(VirtualClock(), headless=True)
+        typing_speed = self._get_typing_speeds(self.__config.get("typing-speed"))
+
+        # the shell, ssh connection and python3 interpreter in use
+        sessions = {"local": None, "ssh": None, "python3": None}
+        executor = self.__executor
+        if executor is None:
+            name = executors.executor_name(self.__config.get("executor"))
+            if name == "pty":
+                with tracer.span("shell_acquire"):
+                    sessions["local"] = self.__pool.acquire()
+            executor = executors.create_executor(name, sessions["local"])
+        local_executor = self._cache_executor(executor)
+
+        (resume, replayed) = self._resume_plan(start_at, fast_forward)
+        local_state = (None, None)
+        if resume:
+            with tracer.span("restore"):
+                checkpoint.restore(executor, resume.cwd, resume.env)
+            local_state = (resume.cwd, resume.env)
+            if local_executor is not executor:
+                local_executor.cwd = resume.cwd or local_executor.cwd
+        recorder = self._checkpoint_recorder(start_at)
+
+        for step in self._get_plan():
+            if stop_at is not None and step.number > stop_at:
+                break
+            if step.number < start_at and step.number not in replayed:
+                continue
+
+            if step.number == start_at and resume and sessions["ssh"]:
+                with tracer.span("restore"):
+                    checkpoint.restore(executors.PtyExecutor(sessions["ssh"]),
+                                       resume.remote_cwd, resume.remote_env)
+
+            if recorder:
+                with tracer.span("checkpoint"):
+                    if step.block == "local" or step.block_start:
+                        local_state = checkpoint.capture(executor)
+                    remote_state = (None, None)
+                    if step.block == "ssh" and not step.block_start and sessions["ssh"]:
+                        remote_state = checkpoint.capture(
+                            executors.PtyExecutor(sessions["ssh"]), echo=True)
+                    recorder(checkpoint.Checkpoint(
+                        step.number, step.block, *(local_state + remote_state)))
+
+            shown = step.number >= start_at
+            handler_data = {
+                "remote": None,
+                "local": sessions["local"],
+                "executor": local_executor,
+                "command": step.command,
+                "typing_speed": typing_speed if shown else self._get_typing_speeds("supersonic"),
+                "typing_delays": step.delays if shown else None,
+                "simulated_typing": step.typed,
+                "output_options": dict(step.options),
+                "config": self.__config.get(),
+                "get_exit_status": True,
+                "terminal": terminal if shown else hidden
+            }
+
+            if local_executor is not executor:
+                local_executor.enabled = dict(step.options).get("cache", True)
+
+            started = time.monotonic()
+            result = self._run_step(step, handler_data, sessions, tracer)
+            if shown:
+                self._record_result(step, handler_data, result, started)
+
+        if sessions["local"] is not None:
+            self.__pool.release(sessions["local"])
+        if executor is not self.__executor:
+            executor.close()
+        terminal.sleep(self.__config.get("pexpect-delay") * 2)  # time to freeze frame in post
+        terminal.write("\n")  # run ends, tidy up
+
+    def _run_step(self, step, handler_data, sessions, tracer):
+        """Runs one step in its block, returns its handler's result."""
+        if step.block == "ssh":
+            # must be shared across all commands of the block
+            if step.block_start:
+                with tracer.span("ssh_checkout"):
+                    sessions["ssh"] = self.__ssh_pool.checkout(step.target)
+            handler_data.update(remote=sessions["ssh"], local=None, ssh_pool=self.__ssh_pool)
+            result = self.run_task(handler_data, step.handler)
+
+            # a block left without exit keeps its connection for later
+            if step.block_end:
+                self.__ssh_pool.release(sessions["ssh"])
+                sessions["ssh"] = None
+            return result
+
+        if step.block == "python3":
+            if step.block_start:
+                if sessions["local"] is None:
+                    with tracer.span("shell_acquire"):
+                        sessions["local"] = self.__pool.acquire()
+                    handler_data["local"] = sessions["local"]
+                sessions["python3"] = python_repl.PythonREPL(sessions["local"])
+            handler_data.update(get_exit_status=False, python_repl=sessions["python3"])
+            return self.run_python_task(handler_data, step.handler)
+
+        return self.run_task(handler_data, step.handler)
+
+    def _resume_plan(self, start_at, fast_forward):
+        """Returns how to resume a run at step start_at.
 
-                    for python_command in command["python3"]:
+        Returns:
+        (checkpoint, numbers), the Checkpoint to restore, None to rebuild
+        the state by running every step before start_at, and the numbers of
+        the steps before start_at to run.
+        """
+        if start_at < 1:
+            raise ValueError("start_at is a step number, from 1")
+        if start_at == 1:
+            return (None, range(0))
+
+        resume = None if fast_forward else self._get_checkpoint(start_at)
+        if resume is None:
+            return (None, range(1, start_at))
+
+        block_start = start_at
+        for step in self._get_plan():
+            if step.block_start:
+                block_start = step.number
+            if step.number == start_at:
+                break
+        else:
+            return (None, range(0))  # past the last step, nothing to run
+
+        if step.block != resume.block:
+            return (None, range(1, start_at))  # the script has changed since
+        if step.block == "ssh":
+            return (resume, range(block_start, min(block_start + 1, start_at)))
+        if step.block == "python3":
+            return (resume, range(block_start, start_at))
+        return (resume, range(0))
+
+    def _get_checkpoint(self, number):
+        """Returns the checkpoint of step number from the last run, or the checkpoint-file."""
+        if number not in self.__checkpoints and self.__config.get("checkpoint-file"):
+            try:
+                self.__checkpoints = checkpoint.read_checkpoints(
+                    self.__config.get("checkpoint-file"))
+            except OSError:
+                pass
+
+        return self.__checkpoints.get(number)
+
+    def _checkpoint_recorder(self, start_at):
+        """Returns a function recording each Checkpoint, None without a checkpoint-file.
 
-                        self.__config.set("prompt-string", ">>> ")
+        The file is written as the run goes, so a run that stops part way
+        still leaves its checkpoints. Those before start_at are kept from
+        the run resumed.
+        """
+        path = self.__config.get("checkpoint-file")
+        kept = [self.__checkpoints[number] for number in sorted(self.__checkpoints)
+                if number < start_at]
+        self.__checkpoints = {}
+        if not path:
+            return None
+
+        streamed = self._is_streamed()
+
+        def record(point):
+            if not streamed:
+                self.__checkpoints[point.step] = point
+            with open(path, "a") as stream:
+                checkpoint.write_checkpoint(stream, point)
+
+        open(path, "w").close()
+        for point in kept:
+            record(point)
+        return record
+
+    def _cache_executor(self, executor):
+        """Returns executor wrapped in a CachingExecutor, if output is cached."""
+        cache = self.__output_cache
+        if cache is None and (self.__config.get("output-cache") or self.__config.get("rehearse")):
+            cache = self.__output_cache = output_cache.OutputCache()
+        if cache is None:
+            return executor
+
+        return output_cache.CachingExecutor(
+            executor, cache,
+            rehearse=self.__config.get("rehearse"),
+            ttl=self.__config.get("output-cache-ttl"),
+            env_names=self.__config.get("output-cache-env"))
+
+    def preflight(self, timeout=30):
+        """Checks the loaded commands can run, without running them.
+
+        Commands and the files they read are looked up in the local shell
+        and on each ssh target, logging in to each, all in parallel.
+
+        Returns:
+        A list of preflight.Problem, empty if none were found.
+        """
+        if "commands" not in self.__data:
+            return []
+
+        return preflight.check_steps(self._get_plan(), self.__pool, self.__ssh_pool,
+                                     timeout=timeout)
+
+    def close(self):
+        """Closes the shells and ssh connections kept for later runs."""
+        self.__pool.close()
+        self.__ssh_pool.close()
+
+    def _close_own_pools(self):
+        """Closes the pools not given to the robot, so no shell outlives a run."""
+        if not self.__shared_pools[0]:
+            self.__pool.close()
+        if not self.__shared_pools[1]:
+            self.__ssh_pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get_results(self):
+        """Returns a dict per command of the last run.
+
+        Keys: step (from 1), block (local, ssh or python3), command,
+        success, exit_status (None if not known) and duration in seconds.
+        A streamed run only keeps the failed commands, the latest
+        STREAMED_FAILURES_KEPT, so its memory does not grow with the
+        script, see get_summary() for the counts.
+        """
+        return list(self.__results)
+
+    def get_summary(self):
+        """Returns the counts of commands of the last run, run, successful and failed."""
+        return {
+            "commands": self.__commands_run,
+            "successful": self.__successful_commands,
+            "failed": self.__commands_run - self.__successful_commands
+        }
+
+    def _record_result(self, step, handler_data, result, started):
+        """Records the result of the command in handler_data."""
+        self.__commands_run += 1
+        if result:
+            self.__successful_commands += 1
+            if self._is_streamed():
+                return
+
+        self.__results.append({
+            "step": step.number,
+            "block": step.block,
+            "command": handler_data["command"],
+            "success": bool(result),
+            "exit_status": handler_data.get("exit_status"),
+            "duration": time.monotonic() - started
+        })
+
+    def _get_plan(self):
+        """Returns the steps of the loaded commands, compiling them if needed.
+
+        A plan is compiled again when config it depends on has changed.
+        Streamed commands are compiled as they are read, never held.
+        """
+        if self._is_streamed():
+            return self.iter_plan(self.__data["commands"], self.__config.get())
 
-                        handler_data = {
-                            "remote": None,
-                            "local": shell,
-                            "command": python_command,
-                            "typing_speed": self._get_typing_speeds(typing_speed),
-                            "config": self.__config.get(),
-                            "get_exit_status": False
-                        }
+        snapshot = plan.config_snapshot(self.__config.get())
+        if not self.__plan or self.__plan.config != snapshot:
+            steps = self.compile_plan(self.__data.get("commands", []), self.__config.get())
+            self.__plan = plan.Plan(steps, snapshot)
 
-                        result = self.run_python_task(handler_data)
+        return self.__plan.steps
 
-                        if result:
-                            self.__successful_commands += 1
+    @staticmethod
+    def compile_plan(commands, config):
+        """Returns commands as a tuple of plan Steps, ready to run."""
+        return tuple(Robot.iter_plan(commands, config))
 
+    @staticmethod
+    def iter_plan(commands, config):
+        """Yields a plan Step for each command, as commands are read."""
+        (speed_min, speed_max, _) = Robot._get_typing_speeds(config.get("typing-speed"))
+        number = 0
+
+        for command in commands:
+            target = None
+            if isinstance(command, dict) and "ssh" in command:
+                (block, block_commands) = ("ssh", command["ssh"])
+                if block_commands:
+                    target = parse_ssh_target(plan.split_command(block_commands[0])[0])
+            elif isinstance(command, dict) and "python3" in command:
+                (block, block_commands) = ("python3", command["python3"])
+            else:
+                (block, block_commands) = ("local", [command])
+
+            for (index, block_command) in enumerate(block_commands):
+                (block_command, options) = plan.split_command(block_command)
+                if block == "python3":
+                    block_command = block_command.rstrip("\n")
+                    handler = Robot._get_python_method(block_command, index == 0)
                 else:
+                    handler = Robot._get_bothan_method(block_command)
+                shown = block_command
+                if block == "python3" and block_command == "CTRL_D":
+                    shown = "^D"
+                typed = Robot._string_to_type(
+                    config, shown, shell=block != "python3" or index == 0)
+
+                number += 1
+                yield plan.Step(
+                    number=number,
+                    block=block,
+                    block_start=index == 0,
+                    block_end=index == len(block_commands) - 1,
+                    command=block_command,
+                    handler=handler,
+                    typed=typed,
+                    delays=bothan.typing_schedule(typed, speed_min, speed_max),
+                    target=target,
+                    options=options
+                )
+
+    def get_timeline(self):
+        """Returns the Timeline of the last run, None if it was not recorded."""
+        return self.__timeline
+
+    def get_output_cache(self):
+        """Returns the OutputCache used by runs, None if output is not cached."""
+        return self.__output_cache
+
+    def get_checkpoints(self):
+        """Returns the Checkpoints of the last run, by step, empty without a checkpoint-file.
+
+        A streamed run only writes its checkpoints to the checkpoint-file.
+        """
+        return self.__checkpoints
+
+    def get_tracer(self):
+        """Returns the Tracer of the last run, None if it was not traced."""
+        return self.__run_tracer
 
-                    handler_data = {
-                        "remote": None,
-                        "local": shell,
-                        "command": command,
-                        "typing_speed": self._get_typing_speeds(typing_speed),
-                        "config": self.__config.get(),
-                        "get_exit_status": True
-                    }
+    def _setup_terminal(self):
+        """Returns the Terminal for a run.
 
-                    if self.run_task(handler_data):
-                        self.__successful_commands += 1
+        Headless runs use a virtual clock, so typing and pauses take no real
+        time, and show nothing. Headless runs, and runs with an event-file,
+        cast-file or svg-file, are recorded on a timeline, but streamed runs
+        only for the files, as a timeline holds every event of the run.
+        Runs with a trace-file, or a tracer given to the robot, are traced.
+        """
+        headless = self.__config.get("headless")
+
+        clock = self.__clock
+        if not clock:
+            clock = VirtualClock() if headless else SystemClock()
+
+        self.__timeline = None
+        outputs = ["event-file", "cast-file", "svg-file"]
+        recorded = headless and not self._is_streamed()
+        if recorded or any(self.__config.get(output) for output in outputs):
+            self.__timeline = Timeline(clock)
+
+        self.__run_tracer = self.__tracer
+        if not self.__run_tracer and self.__config.get("trace-file"):
+            self.__run_tracer = Tracer()
 
-            shell.close()
-            time.sleep(self.__config.get("pexpect-delay") * 2)  # time to freeze frame in post
-            print()  # run ends, tidy up
+        return Terminal(clock, self.__timeline, headless, self.__run_tracer)
 
     @staticmethod
-    def run_python_task(handler_data):
-        """Run a task from handler data."""
+    def run_python_task(handler_data, handler=None):
+        """Run a task from handler data, with handler if already resolved."""
 
         command = handler_data["command"]
-        bothan_method = Robot._get_bothan_method(command)
+        bothan_method = handler or Robot._get_bothan_method(command)
 
         config = handler_data["config"]
-        if command == "CTRL_D":
-            handler_data["config"]["prompt-string"] = handler_data["config"]["local-prompt"]
-            handler_data["simulated_typing"] = Robot._string_to_type(config, "^D")
-
-        else:
-            handler_data["simulated_typing"] = Robot._string_to_type(config, command)
+        if "simulated_typing" not in handler_data:
+            shown = "^D" if command == "CTRL_D" else command
+            handler_data["simulated_typing"] = Robot._string_to_type(config, shown, shell=False)
 
-        task_result = bothan_method(handler_data)
+        tracer = bothan.get_tracer(handler_data)
+        with tracer.span("run_python_task", command=command):
+            with tracer.span(getattr(bothan_method, "__name__", "handler")):
+                task_result = bothan_method(handler_data)
 
-        prompt = handler_data["config"]["prompt-string"]
-        bothan.emit_prompt(prompt)
+            repl = handler_data.get("python_repl")
+            prompt = (repl and repl.prompt()) or config["prompt-string"]
+            bothan.emit_prompt(prompt, handler_data.get("terminal"))
 
         return task_result
 
     @staticmethod
-    def run_task(handler_data):
-        """Run a task from handler data."""
+    def run_task(handler_data, handler=None):
+        """Run a task from handler data, with handler if already resolved."""
 
         command = handler_data["command"]
-        bothan_method = Robot._get_bothan_method(command)
+        bothan_method = handler or Robot._get_bothan_method(command)
 
         config = handler_data["config"]
-        handler_data["simulated_typing"] = Robot._string_to_type(config, command)
+        if "simulated_typing" not in handler_data:
+            handler_data["simulated_typing"] = Robot._string_to_type(config, command)
 
-        task_result = bothan_method(handler_data)
+        tracer = bothan.get_tracer(handler_data)
+        with tracer.span("run_task", command=command):
+            with tracer.span(getattr(bothan_method, "__name__", "handler")):
+                task_result = bothan_method(handler_data)
 
-        # trailing emit prompt, to setup the next line. pause is a special case.
-        if command.startswith("PAUSE"):
-            return task_result
+            # trailing emit prompt, to setup the next line. pause is a special case.
+            if command.startswith("PAUSE"):
+                return task_result
 
-        prompt = handler_data["config"]["prompt-string"]
-        # override prompt if we are still in a remote session
-        if handler_data["remote"] and not command == "exit":
-            prompt = handler_data["config"]["remote-prompt"]
+            prompt = handler_data["config"]["prompt-string"]
+            # override prompt if we are still in a remote session
+            if handler_data["remote"] and not command == "exit":
+                prompt = handler_data["config"]["remote-prompt"]
 
-        bothan.emit_prompt(prompt)
+            bothan.emit_prompt(prompt, handler_data.get("terminal"))
 
         return task_result
 
     @staticmethod
     def _get_bothan_method(command):
         """Returns bothan method for command."""
+        return handler_registry.default_registry().resolve(command)
+
+    @staticmethod
+    def _get_python_method(command, start):
+        """Returns bothan method for a command of a python3 block.
+
+        The first command starts python3, the rest are python statements.
+        """
+        if start:
+            bothan_method = Robot._get_bothan_method(command)
+            if bothan_method is bothan.bot_handler_default:
+                return bothan.start_python_repl
+            return bothan_method
 
-        name = Robot._get_command_name(command)
-        fn_lookup = "bot_handler_{0}".format(name)
-        bothan_method = getattr(bothan, fn_lookup, bothan.bot_handler_default)
+        if command == "CTRL_D":
+            return bothan.bot_handler_CTRL_D
 
-        return bothan_method
+        return bothan.run_python_command
 
     @staticmethod
     def _get_command_name(command):
         """Returns name of the command."""
-        name = command.lower()
-
-        if " " in command:  # command has args
-            (name, _) = command.split(" ", 1)
-
-        if "/" in name:  # command has path
-            (_, name) = name.rsplit("/", 1)
-
-        return name
+        return handler_registry.command_name(command)
 
     def _get_data(self):
         """Return the data dict."""
@@ -238,6 +732,10 @@ class Robot:
         """Return the config dict."""
         return self.__config.get()
 
+    def _is_streamed(self):
+        """Returns True if the loaded commands are a ScriptStream."""
+        return isinstance(self.__data.get("commands"), ScriptStream)
+
     def _get_successful_commands(self):
         """Return the successful commands run."""
         return self.__successful_commands
@@ -251,8 +749,15 @@ class Robot:
         return Robot.TypingSpeeds[speed]
 
     @staticmethod
-    def _string_to_type(config, command):
-        """Returns the formatted string to type."""
+    def _string_to_type(config, command, shell=True):
+        """Returns the formatted string to type.
+
+        Shell commands are highlighted when a typing-theme is set, other
+        text (python3 lines) is shown in typing-color.
+        """
+
+        if shell and config.get("typing-theme"):
+            return highlight.highlight(command, config["typing-theme"], config.get("typing-color"))
 
         color_reset = text_colors.TextColors.get_color_code("reset")
         if "typing-color" in config:
@@ -260,9 +765,16 @@ class Robot:
         else:
             color = ""
 
-        command_string = "{0}{1}{2}".format(color, command, color_reset)
+        # each line colored on its own, so prompts between lines are not
+        command_string = "\n".join(
+            "{0}{1}{2}".format(color, line, color_reset) for line in command.split("\n"))
         return command_string
 
+    @staticmethod
+    def _yaml_loader():
+        """Returns the C accelerated safe YAML loader, if libyaml is there."""
+        return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
     @staticmethod
     def _load_file(inputfile):
         """Load YML file.
@@ -273,7 +785,7 @@ class Robot:
         """
         with open(inputfile, 'r') as stream:
             try:
-                data = yaml.load(stream, yaml.SafeLoader)
+                data = yaml.load(stream, Robot._yaml_loader())
                 return data
 
             except yaml.YAMLError as error:
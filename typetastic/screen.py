@@ -0,0 +1,172 @@
+"""Terminal screen state, enough of a VT100 to replay robot output."""
+
+from .keystrokes import ESCAPE_PATTERN
+
+# (foreground SGR color code or None, bold)
+DEFAULT_STYLE = (None, False)
+BLANK = (" ", DEFAULT_STYLE)
+
+
+class Screen:
+    """A grid of styled characters and a cursor.
+
+    Handles printable text, CR/LF/backspace/tab, SGR colors and bold,
+    cursor movement and erase sequences. Anything else is ignored.
+    """
+
+    def __init__(self, width=80, height=24):
+        """Sets up a blank screen."""
+        self.width = width
+        self.height = height
+        self.rows = [self._blank_row() for _ in range(height)]
+        self.row = 0
+        self.col = 0
+        self.style = DEFAULT_STYLE
+
+        # runs per row, only rows changed since the last snapshot are rebuilt
+        self.__runs = [()] * height
+        self.__dirty = set()
+
+    def feed(self, text):
+        """Applies text written to the terminal."""
+        position = 0
+        while position < len(text):
+            match = ESCAPE_PATTERN.match(text, position)
+            if match:
+                self._escape(match.group())
+                position = match.end()
+            else:
+                self._char(text[position])
+                position += 1
+
+    def snapshot(self):
+        """Returns the screen as a tuple of rows.
+
+        Each row is a tuple of (style, text) runs, so snapshots can be
+        compared, hashed and rendered.
+        """
+        for row in self.__dirty:
+            self.__runs[row] = self._runs(self.rows[row])
+        self.__dirty.clear()
+
+        return tuple(self.__runs)
+
+    def _char(self, char):
+        """Applies one character."""
+        if char == "\n":
+            self._line_feed()
+        elif char == "\r":
+            self.col = 0
+        elif char == "\b":
+            self.col = max(0, min(self.col, self.width - 1) - 1)
+        elif char == "\t":
+            self.col = min(self.width - 1, (self.col // 8 + 1) * 8)
+        elif char >= " " and char != "\x7f":
+            if self.col >= self.width:  # pending wrap
+                self.col = 0
+                self._line_feed()
+            self.rows[self.row][self.col] = (char, self.style)
+            self.__dirty.add(self.row)
+            self.col += 1
+
+    def _line_feed(self):
+        """Moves down a line, scrolling at the bottom of the screen."""
+        if self.row == self.height - 1:
+            self.rows.pop(0)
+            self.rows.append(self._blank_row())
+            self.__runs = self.__runs[1:] + [()]
+            self.__dirty = {row - 1 for row in self.__dirty if row}
+        else:
+            self.row += 1
+
+    def _escape(self, sequence):
+        """Applies a CSI escape sequence, others are ignored."""
+        if not sequence.startswith("\x1b["):
+            return
+
+        final = sequence[-1]
+        params = [int(param) if param.isdigit() else None
+                  for param in sequence[2:-1].split(";")]
+        first = params[0] or 0
+
+        if final == "m":
+            self._sgr(params)
+        elif final in ("H", "f"):
+            row = params[0] or 1
+            col = params[1] if len(params) > 1 and params[1] else 1
+            self.row = min(self.height, row) - 1
+            self.col = min(self.width, col) - 1
+        elif final == "A":
+            self.row = max(0, self.row - max(1, first))
+        elif final == "B":
+            self.row = min(self.height - 1, self.row + max(1, first))
+        elif final == "C":
+            self.col = min(self.width - 1, self.col + max(1, first))
+        elif final == "D":
+            self.col = max(0, self.col - max(1, first))
+        elif final == "K":
+            self._erase_line(first)
+        elif final == "J":
+            self._erase_screen(first)
+
+    def _sgr(self, params):
+        """Applies select graphic rendition (color and bold) params."""
+        (color, bold) = self.style
+        skip = 0
+        for (index, param) in enumerate(params):
+            if skip:
+                skip -= 1
+            elif param in (None, 0):
+                (color, bold) = DEFAULT_STYLE
+            elif param == 1:
+                bold = True
+            elif param == 22:
+                bold = False
+            elif 30 <= param <= 37 or 90 <= param <= 97:
+                color = param
+            elif param == 39:
+                color = None
+            elif param in (38, 48):  # 256 and true color are not modelled
+                skip = 2 if index + 1 < len(params) and params[index + 1] == 5 else 4
+        self.style = (color, bold)
+
+    def _erase_line(self, mode):
+        """Erases to the end (0), start (1) or all (2) of the line."""
+        row = self.rows[self.row]
+        (start, end) = {0: (self.col, self.width), 1: (0, self.col + 1)}.get(mode, (0, self.width))
+        for col in range(start, min(end, self.width)):
+            row[col] = BLANK
+        self.__dirty.add(self.row)
+
+    def _erase_screen(self, mode):
+        """Erases to the end (0), start (1) or all (2, 3) of the screen."""
+        if mode in (2, 3):
+            self.rows = [self._blank_row() for _ in range(self.height)]
+            self.__runs = [()] * self.height
+            self.__dirty.clear()
+            return
+
+        self._erase_line(mode)
+        rows = range(self.row + 1, self.height) if mode == 0 else range(0, self.row)
+        for row in rows:
+            self.rows[row] = self._blank_row()
+            self.__dirty.add(row)
+
+    def _blank_row(self):
+        """Returns a blank row."""
+        return [BLANK] * self.width
+
+    @staticmethod
+    def _runs(row):
+        """Returns a row as (style, text) runs, trailing blanks dropped."""
+        end = len(row)
+        while end and row[end - 1] == BLANK:
+            end -= 1
+
+        runs = []
+        for (char, style) in row[:end]:
+            if runs and runs[-1][0] == style:
+                runs[-1] = (style, runs[-1][1] + char)
+            else:
+                runs.append((style, char))
+        return tuple(runs)
@@ -0,0 +1,171 @@
+"""Read a script file's commands as they are parsed, not all up front."""
+
+from .lazy_module import LazyModule
+
+yaml = LazyModule("yaml")
+
+
+class ScriptError(ValueError):
+    """A script file that can not be read."""
+
+
+class ScriptStream:
+    """The commands of a script file, parsed one at a time.
+
+    The config is read when the stream is made, so it can be checked
+    before any command runs. Commands are then parsed from the file each
+    time the stream is iterated, holding one command in memory at a time.
+    Files with config after the commands are read twice.
+    """
+
+    def __init__(self, path, loader=None):
+        """Reads the config of the script file at path.
+
+        Raises ScriptError if the file is not a typetastic script.
+        """
+        self.path = path
+        self.loader = loader or getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+        self.config = {}
+
+        has_commands = False
+        with open(path, "r") as stream:
+            parser = self.loader(stream)
+            try:
+                for key in self._top_level_keys(parser):
+                    if key == "config":
+                        self.config = self._config(parser)
+                        if has_commands:
+                            break
+                    elif key == "commands":
+                        self._expect_sequence(parser)
+                        has_commands = True
+                        if self.config:
+                            break
+                        self._skip(parser)
+                    else:
+                        self._skip(parser)
+
+            except yaml.YAMLError as error:
+                raise ScriptError(error) from error
+            finally:
+                parser.dispose()
+
+        if not has_commands and not self.config:
+            raise ScriptError("{0}: no config or commands".format(path))
+
+    def __iter__(self):
+        """Yields each command in the file, as it is parsed."""
+        with open(self.path, "r") as stream:
+            parser = self.loader(stream)
+            try:
+                for key in self._top_level_keys(parser):
+                    if key != "commands":
+                        self._skip(parser)
+                        continue
+
+                    parser.get_event()  # start of the sequence
+                    while not parser.check_event(yaml.SequenceEndEvent):
+                        yield self._value(parser)
+                    return
+
+            except yaml.YAMLError as error:
+                raise ScriptError(error) from error
+            finally:
+                parser.dispose()
+
+    def _config(self, parser):
+        """Returns the config mapping, checked to be one."""
+        config = self._value(parser)
+        if config is None:
+            return {}
+        if not isinstance(config, dict):
+            raise ScriptError("{0}: config is not a mapping".format(self.path))
+        return config
+
+    def _expect_sequence(self, parser):
+        """Checks the next value is a sequence."""
+        if not parser.check_event(yaml.SequenceStartEvent):
+            raise ScriptError("{0}: commands is not a list".format(self.path))
+
+    def _top_level_keys(self, parser):
+        """Yields the keys of the top level mapping.
+
+        The caller reads or skips each key's value before the next key.
+        """
+        parser.get_event()  # stream start
+        if parser.check_event(yaml.StreamEndEvent):
+            return
+
+        parser.get_event()  # document start
+        if not parser.check_event(yaml.MappingStartEvent):
+            raise ScriptError("{0}: script is not a mapping".format(self.path))
+
+        parser.get_event()
+        while not parser.check_event(yaml.MappingEndEvent):
+            yield self._value(parser)
+
+    @staticmethod
+    def _value(parser):
+        """Returns the next value, built from its events."""
+        node = ScriptStream._compose(parser, {})
+        return parser.construct_document(node)
+
+    @staticmethod
+    def _compose(parser, anchors):
+        """Returns the node of the next value.
+
+        Works from parser events, which the C and pure python loaders
+        both provide, where composing is not exposed by the C loader.
+        """
+        event = parser.get_event()
+
+        if isinstance(event, yaml.AliasEvent):
+            if event.anchor not in anchors:
+                raise ScriptError("unknown alias {0}".format(event.anchor))
+            return anchors[event.anchor]
+
+        if isinstance(event, yaml.ScalarEvent):
+            tag = event.tag
+            if tag is None or tag == "!":
+                tag = parser.resolve(yaml.ScalarNode, event.value, event.implicit)
+            node = yaml.ScalarNode(tag, event.value, event.start_mark, event.end_mark,
+                                   style=event.style)
+
+        elif isinstance(event, yaml.SequenceStartEvent):
+            tag = event.tag
+            if tag is None or tag == "!":
+                tag = parser.resolve(yaml.SequenceNode, None, event.implicit)
+            node = yaml.SequenceNode(tag, [], event.start_mark, None,
+                                     flow_style=event.flow_style)
+            while not parser.check_event(yaml.SequenceEndEvent):
+                node.value.append(ScriptStream._compose(parser, anchors))
+            node.end_mark = parser.get_event().end_mark
+
+        else:  # mapping start
+            tag = event.tag
+            if tag is None or tag == "!":
+                tag = parser.resolve(yaml.MappingNode, None, event.implicit)
+            node = yaml.MappingNode(tag, [], event.start_mark, None,
+                                    flow_style=event.flow_style)
+            while not parser.check_event(yaml.MappingEndEvent):
+                key = ScriptStream._compose(parser, anchors)
+                node.value.append((key, ScriptStream._compose(parser, anchors)))
+            node.end_mark = parser.get_event().end_mark
+
+        if event.anchor:
+            anchors[event.anchor] = node
+
+        return node
+
+    @staticmethod
+    def _skip(parser):
+        """Skips the next value, without building it."""
+        depth = 0
+        while True:
+            event = parser.get_event()
+            if isinstance(event, (yaml.SequenceStartEvent, yaml.MappingStartEvent)):
+                depth += 1
+            elif isinstance(event, (yaml.SequenceEndEvent, yaml.MappingEndEvent)):
+                depth -= 1
+            if depth == 0:
+                return
@@ -0,0 +1,169 @@
+"""Scripts cut into segments at PAUSE and editor steps, rendered in parallel."""
+
+import collections
+import concurrent.futures
+import functools
+import os
+
+from . import checkpoint
+from .robot import Robot
+
+# steps first to last, numbered from 1
+Segment = collections.namedtuple("Segment", ["number", "start", "end"])
+
+# handlers of the steps a segment ends on, each records a pause
+CUT_HANDLERS = ("bot_handler_pause", "bot_handler_editor", "bot_handler_vi", "bot_handler_emacs")
+
+# config of the files a segment's run writes for itself
+SEGMENT_FILES = ("event-file", "cast-file", "svg-file", "trace-file", "checkpoint-file")
+
+
+def split(steps):
+    """Returns the Segments of a plan, each ending on a PAUSE or editor step."""
+    segments = []
+    start = None
+    for step in steps:
+        if start is None:
+            start = step.number
+        if getattr(step.handler, "__name__", None) in CUT_HANDLERS:
+            segments.append(Segment(len(segments) + 1, start, step.number))
+            start = None
+
+    if start is not None:
+        segments.append(Segment(len(segments) + 1, start, step.number))
+    return segments
+
+
+def segment_path(path, number):
+    """Returns the file of a segment, e.g. demo.2.cast for demo.cast."""
+    (root, extension) = os.path.splitext(path)
+    return "{0}.{1}{2}".format(root, number, extension)
+
+
+def render_segment(commands, config, segment):
+    """Runs one segment headless, in a robot of its own.
+
+    Files the config names are written for the segment alone, and its
+    checkpoint-file must hold the checkpoint of its first step.
+
+    Returns:
+    (results, timeline events, trace spans) of the segment, span times
+    from the start of its trace, no spans if it was not traced.
+    """
+    config = dict(config, headless=True)
+    for key in SEGMENT_FILES:
+        if config.get(key):
+            config[key] = segment_path(config[key], segment.number)
+
+    robot = Robot()
+    try:
+        robot.load({"config": config, "commands": commands})
+        robot.run(start_at=segment.start, stop_at=segment.end)
+    finally:
+        robot.close()
+
+    tracer = robot.get_tracer()
+    spans = []
+    if tracer and tracer.enabled:
+        spans = [span._replace(start=span.start - tracer.origin, end=span.end - tracer.origin)
+                 for span in tracer.spans]
+    return (robot.get_results(), robot.get_timeline().events(), spans)
+
+
+def render_parallel(commands, config, segments, workers=None):
+    """Renders segments at once, each in its own process, from its checkpoint.
+
+    The checkpoints each segment records go back into the checkpoint-file.
+
+    Returns:
+    (results, timeline events, trace spans) of each segment, see
+    render_segment(), None if the checkpoint of a segment's first step
+    is missing.
+    """
+    path = config.get("checkpoint-file")
+    if not path:
+        return None
+    try:
+        known = checkpoint.read_checkpoints(path)
+    except OSError:
+        return None
+    if any(segment.start not in known for segment in segments[1:]):
+        return None
+
+    for segment in segments:
+        with open(segment_path(path, segment.number), "w") as stream:
+            if segment.start in known:
+                checkpoint.write_checkpoint(stream, known[segment.start])
+
+    render = functools.partial(render_segment, commands, config)
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(render, segments))
+    finally:
+        for segment in segments:
+            try:
+                known.update(checkpoint.read_checkpoints(segment_path(path, segment.number)))
+                os.unlink(segment_path(path, segment.number))
+            except OSError:
+                pass
+        with open(path, "w") as stream:
+            for number in sorted(known):
+                checkpoint.write_checkpoint(stream, known[number])
+
+    return outcomes
+
+
+def merge_spans(tracer, span_lists):
+    """Adds the spans of each segment to tracer, all from its origin."""
+    for spans in span_lists:
+        tracer.spans.extend(span._replace(start=span.start + tracer.origin,
+                                          end=span.end + tracer.origin)
+                            for span in spans)
+
+
+def stitch(timelines):
+    """Returns the events of segment timelines joined into one.
+
+    Each segment's run starts with the prompt the one before it ended on,
+    and ends with a newline, which are dropped where segments meet. The
+    time after that prompt, spent spawning the segment's shell and
+    restoring its checkpoint, is cut too, so typing resumes at the seam.
+    """
+    events = []
+    for (index, segment_events) in enumerate(timelines):
+        segment_events = list(segment_events)
+        if index > 0 and segment_events and segment_events[0].kind == "prompt":
+            segment_events = segment_events[1:]
+        if index < len(timelines) - 1 and segment_events and \
+                (segment_events[-1].kind, segment_events[-1].data) == ("output", "\n"):
+            segment_events = segment_events[:-1]
+
+        offset = events[-1].time if events else 0.0
+        if index > 0 and segment_events:
+            offset -= segment_events[0].time
+        events.extend(event._replace(time=event.time + offset) for event in segment_events)
+
+    return events
+
+
+def split_events(events):
+    """Returns the events of a whole run cut into segments.
+
+    Cuts follow the prompt after each pause, and each segment after the
+    first starts with that prompt, at time 0, as a run of it alone would.
+    """
+    pieces = [[]]
+    cut = False
+    for event in events:
+        pieces[-1].append(event)
+        if event.kind == "pause":
+            cut = True
+        elif cut and event.kind == "prompt":
+            pieces.append([event])
+            cut = False
+
+    if len(pieces) > 1 and not any(event.kind == "type" for event in pieces[-1]):
+        pieces[-2].extend(pieces.pop()[1:])  # nothing typed after the last pause
+
+    return [[event._replace(time=event.time - piece[0].time) for event in piece]
+            for piece in pieces if piece]
@@ -13,12 +13,29 @@ class SessionConfig:
     def __init__(self):
         """Sets up a default config object."""
         self.__config = {
+            "cast-file": None,  # write an asciinema v2 cast here
+            "cast-pause-gap": 2.0,  # seconds shown at each PAUSE in the cast
+            "cast-pause-marker": False,  # mark each PAUSE as a cast chapter
+            "checkpoint-file": None,  # record the shell state before each step here
+            "event-file": None,  # write a timestamped event stream here
+            "executor": "pty",  # run local commands on: pty, subprocess or fake
+            "headless": False,  # virtual clock, record only, no screen output
             "local-prompt": "$ ",
+            "output-max-bytes": None,  # most bytes of a command's output shown
+            "output-max-lines": None,  # most lines shown, the first and last halves
+            "output-cache": False,  # keep local command output for rehearsals
+            "output-cache-env": None,  # names of variables cached output depends on
+            "output-cache-ttl": None,  # seconds cached output is served for
+            "output-rate": None,  # lines of output shown per second
             "pexpect-delay": 0.2,  # delay required for response to be read
             "prompt-string": "$ ",
+            "rehearse": False,  # replay cached output, run only commands not cached
             "remote-prompt": "[ssh] $ ",
+            "svg-file": None,  # render an animated svg here
+            "trace-file": None,  # write a Chrome trace of the run here
             "typing-color": "cyan",
-            "typing-speed": "moderate"
+            "typing-speed": "moderate",
+            "typing-theme": None  # highlight commands, a highlight.THEMES name or dict
         }
 
     def get(self, key=None):
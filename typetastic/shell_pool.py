@@ -0,0 +1,111 @@
+"""Pool of prepared shells, kept warm between runs."""
+
+import os
+import shlex
+
+from .lazy_module import LazyModule
+from .prompt_sentinel import CHUNK_SIZE, SHELL_SENTINEL
+
+pexpect = LazyModule("pexpect")
+
+# shell variable holding the exported environment the shell started with
+ENV_VARIABLE = "__tt_clean_env"
+
+
+def spawn_shell(shell="/bin/bash"):
+    """Returns a pexpect spawn object for a new shell, at the sentinel prompt.
+
+    Reads are sized for streaming output (see PromptSentinel.stream), and
+    lines are sent without pexpect's delay, as the shell never turns echo
+    off to read a password.
+    """
+    session = pexpect.spawn(shell, timeout=None, encoding='utf-8', echo=False,
+                            maxread=CHUNK_SIZE, searchwindowsize=CHUNK_SIZE)
+    session.delaybeforesend = None
+    SHELL_SENTINEL.install(session)
+
+    session.sendline('{0}=$(export -p)'.format(ENV_VARIABLE))
+    SHELL_SENTINEL.wait(session)
+
+    return session
+
+
+class ShellPool:
+    """Shells ready to run commands, so runs skip shell startup.
+
+    Shells are reset when handed out: back to the working directory the
+    run starts in, and back to the exported environment the shell started
+    with. Shells that do not come back to the prompt (e.g. left inside
+    python3) are closed and replaced.
+
+    The reset is partial: shell variables that are not exported,
+    functions, aliases, traps and set -o options carry over to the next
+    run given the same shell. Only share a pool between runs that expect
+    that.
+    """
+
+    def __init__(self, shell="/bin/bash", reset_timeout=2):
+        """Sets up an empty pool."""
+        self.shell = shell
+        self.reset_timeout = reset_timeout
+        self.__idle = []
+        self.spawned = 0
+
+    def prewarm(self, count=1):
+        """Starts shells until count are idle."""
+        while len(self.__idle) < count:
+            self.__idle.append(self._spawn())
+
+    def acquire(self, cwd=None, env=None):
+        """Returns a clean shell.
+
+        Inputs:
+        cwd: directory to start in, the current directory by default
+        env: dict of variables to export on top of the clean environment
+        """
+        reset = self._reset_command(cwd or os.getcwd(), env or {})
+
+        while self.__idle:
+            session = self.__idle.pop()
+            session.sendline(reset)
+            if SHELL_SENTINEL.wait(session, timeout=self.reset_timeout).exit_status is not None:
+                return session
+            session.close(force=True)
+
+        session = self._spawn()
+        session.sendline(reset)
+        SHELL_SENTINEL.wait(session)
+        return session
+
+    def release(self, session):
+        """Returns a shell to the pool, it is reset when next acquired.
+
+        A shell that has ended, e.g. after exec or exit, is closed instead.
+        """
+        if session.isalive() and not session.eof():
+            self.__idle.append(session)
+        else:
+            session.close(force=True)
+
+    def close(self):
+        """Closes all idle shells."""
+        while self.__idle:
+            self.__idle.pop().close(force=True)
+
+    def _spawn(self):
+        """Returns a new shell."""
+        self.spawned += 1
+        return spawn_shell(self.shell)
+
+    @staticmethod
+    def _reset_command(cwd, env):
+        """Returns the one line that resets a shell."""
+        commands = [
+            "unset $(compgen -e) 2>/dev/null",
+            'eval "${0}" 2>/dev/null'.format(ENV_VARIABLE),
+            "cd -- {0}".format(shlex.quote(cwd))
+        ]
+        for (name, value) in sorted(env.items()):
+            commands.append("export {0}={1}".format(name, shlex.quote(str(value))))
+
+        return "; ".join(commands)
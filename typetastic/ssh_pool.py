@@ -0,0 +1,216 @@
+"""Pool of ssh connections, shared by the ssh: blocks of a script."""
+
+import collections
+import re
+import shlex
+import shutil
+import tempfile
+
+from .lazy_module import LazyModule
+from .prompt_sentinel import CHUNK_SIZE, SHELL_SENTINEL
+
+pexpect = LazyModule("pexpect")
+pxssh = LazyModule("pexpect.pxssh")
+subprocess = LazyModule("subprocess")
+
+# where an ssh command connects to, the pool key
+SSHTarget = collections.namedtuple("SSHTarget", ["user", "host", "port", "identity"])
+
+# ssh options that take an argument, from ssh(1)
+OPTIONS_WITH_ARGUMENT = "BbcDEeFIiJLlmOoPpQRSWw"
+
+SSH_URI_PATTERN = re.compile(r"^ssh://(?:([^@/]+)@)?([^:/]+)(?::([0-9]+))?/?$")
+
+
+def parse_ssh_target(command):
+    """Returns the SSHTarget of an ssh command line.
+
+    Understands user@host, ssh://user@host:port, -l user, -p port,
+    -i identity and -o Port=/User=/IdentityFile= options. A line shlex
+    can not split, e.g. with an unclosed quote, is split on whitespace.
+    """
+    options = {}
+    destination = None
+
+    try:
+        tokens = shlex.split(command)
+    except ValueError:
+        tokens = command.split()
+    tokens = tokens[1:]  # skip ssh itself
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token.startswith("-") and len(token) > 1:
+            flag = token[1]
+            if flag in OPTIONS_WITH_ARGUMENT:
+                value = token[2:]
+                if not value and index + 1 < len(tokens):
+                    index += 1
+                    value = tokens[index]
+                _set_option(options, flag, value)
+        elif destination is None:
+            destination = token
+        else:
+            break  # the remote command
+        index += 1
+
+    user = options.get("user")
+    host = destination
+    port = options.get("port")
+
+    match = SSH_URI_PATTERN.match(destination or "")
+    if match:
+        (user, host) = (match.group(1) or user, match.group(2))
+        port = int(match.group(3)) if match.group(3) else port
+    elif destination and "@" in destination:
+        (user, host) = destination.rsplit("@", 1)
+
+    return SSHTarget(user, host, port, options.get("identity"))
+
+
+def _set_option(options, flag, value):
+    """Records the option flag=value if it is part of the target."""
+    if flag == "l":
+        options["user"] = value
+    elif flag == "p" and value.isdigit():
+        options["port"] = int(value)
+    elif flag == "i":
+        options["identity"] = value
+    elif flag == "o" and "=" in value:
+        (name, setting) = value.split("=", 1)
+        name = name.strip().lower()
+        if name in ("port", "user", "identityfile"):
+            _set_option(options, {"port": "p", "user": "l", "identityfile": "i"}[name],
+                        setting.strip())
+
+
+class SSHPool:
+    """Logged in ssh connections, keyed by SSHTarget.
+
+    Connections go back to the pool on exit instead of logging out, and
+    the next ssh to the same target reuses them, with the working
+    directory reset to home. New connections share one master connection
+    per target (ssh ControlMaster), so even they skip the handshake. The
+    masters are stopped by close().
+    """
+
+    def __init__(self, factory=None, multiplex=True, reset_timeout=5, ssh="ssh"):
+        """Sets up an empty pool.
+
+        Inputs:
+        factory: returns a new, not logged in, pxssh like connection
+        multiplex: use ControlMaster for connections made by the default factory
+        ssh: the ssh program, run to stop master connections
+        """
+        self.factory = factory or self._pxssh_factory
+        self.multiplex = multiplex
+        self.reset_timeout = reset_timeout
+        self.ssh = ssh
+        self.logins = 0
+        self.__idle = collections.defaultdict(list)
+        self.__logged_in = {}  # id(connection) -> (SSHTarget, connection)
+        self.__control_dir = None
+        self.__masters = set()  # SSHTargets logged in to with control_options()
+
+    def checkout(self, target):
+        """Returns a connection for target, logged in if one was idle."""
+        while self.__idle[target]:
+            ssh_conn = self.__idle[target].pop()
+            ssh_conn.sendline("cd")
+            if SHELL_SENTINEL.wait(ssh_conn, timeout=self.reset_timeout).exit_status is not None:
+                return ssh_conn
+            self._discard(ssh_conn)
+
+        return self.factory()
+
+    def login(self, ssh_conn, target):
+        """Logs in, unless the connection came from the pool logged in.
+
+        Returns True if the connection is ready for commands.
+        """
+        if self.is_logged_in(ssh_conn):
+            return True
+
+        self.logins += 1
+        ssh_conn.login(target.host, target.user, port=target.port, ssh_key=target.identity)
+        if ssh_conn.closed:
+            return False
+
+        # one round trip per command from here on, see run_ssh_command
+        SHELL_SENTINEL.install(ssh_conn)
+        ssh_conn.PROMPT = SHELL_SENTINEL.pattern
+        ssh_conn.delaybeforesend = None  # passwords are done with
+        self.__logged_in[id(ssh_conn)] = (target, ssh_conn)
+        if self.__control_dir:
+            self.__masters.add(target)
+        return True
+
+    def is_logged_in(self, ssh_conn):
+        """Returns True if the pool logged in this connection."""
+        return id(ssh_conn) in self.__logged_in
+
+    def release(self, ssh_conn):
+        """Returns a connection to the pool, in place of logging out.
+
+        A connection that has ended is closed instead.
+        """
+        (target, _) = self.__logged_in.get(id(ssh_conn), (None, None))
+        if target and ssh_conn.eof():
+            self._discard(ssh_conn)
+        elif target and ssh_conn not in self.__idle[target]:
+            self.__idle[target].append(ssh_conn)
+
+    def close(self):
+        """Logs out of all idle connections, and stops the master connections."""
+        for connections in self.__idle.values():
+            while connections:
+                self._discard(connections.pop())
+
+        while self.__masters:
+            self._exit_master(self.__masters.pop())
+
+        if self.__control_dir:
+            shutil.rmtree(self.__control_dir, ignore_errors=True)
+            self.__control_dir = None
+
+    def control_options(self):
+        """Returns the ssh -o options sharing one master connection per target.
+
+        Masters persist in the background after their last connection, so
+        targets logged in to after this are stopped by close().
+        """
+        if not self.__control_dir:
+            self.__control_dir = tempfile.mkdtemp(prefix="tt-ssh-")
+        return {
+            "ControlMaster": "auto",
+            "ControlPath": "{0}/%C".format(self.__control_dir),
+            "ControlPersist": "60"
+        }
+
+    def _exit_master(self, target):
+        """Stops the master connection of target, if it is running."""
+        command = [self.ssh, "-O", "exit",
+                   "-o", "ControlPath={0}/%C".format(self.__control_dir)]
+        if target.port:
+            command += ["-p", str(target.port)]
+        if target.user:
+            command += ["-l", target.user]
+        command.append(target.host)
+        try:
+            subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL, timeout=self.reset_timeout)
+        except (OSError, subprocess.SubprocessError):
+            pass
+
+    def _discard(self, ssh_conn):
+        """Logs out and forgets a connection."""
+        self.__logged_in.pop(id(ssh_conn), None)
+        try:
+            ssh_conn.logout()
+        except (OSError, pexpect.ExceptionPexpect):
+            ssh_conn.close(force=True)
+
+    def _pxssh_factory(self):
+        """Returns a new pxssh connection, multiplexed if enabled."""
+        options = self.control_options() if self.multiplex else {}
+        return pxssh.pxssh(options=options, maxread=CHUNK_SIZE, searchwindowsize=CHUNK_SIZE)
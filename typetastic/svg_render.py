@@ -0,0 +1,161 @@
+"""Render a robot timeline as an animated SVG, offline."""
+
+import collections
+import json
+import os
+from xml.sax.saxutils import escape
+
+from .asciicast import cast_events
+from .screen import Screen
+
+# rows is a Screen snapshot, shown from time for duration seconds
+Frame = collections.namedtuple("Frame", ["time", "duration", "rows"])
+
+COLORS = {
+    30: "#000000", 31: "#cd3131", 32: "#0dbc79", 33: "#e5e510",
+    34: "#2472c8", 35: "#bc3fbc", 36: "#11a8cd", 37: "#e5e5e5",
+    90: "#666666", 91: "#f14c4c", 92: "#23d18b", 93: "#f5f543",
+    94: "#3b8eea", 95: "#d670d6", 96: "#29b8db", 97: "#ffffff",
+}
+FOREGROUND = "#e5e5e5"
+BACKGROUND = "#1e1e1e"
+
+CHAR_WIDTH = 8.4
+LINE_HEIGHT = 17
+FONT_SIZE = 14
+PADDING = 10
+
+
+def frames(events, size=(80, 24), pause_gap=2.0, final_hold=2.0):
+    """Returns the distinct screen states of a timeline, as Frames.
+
+    Output written at the same instant makes one frame, and states equal
+    to the one before are dropped, so the number of frames follows the
+    number of changes on screen, not the length of the run.
+    """
+    screen = Screen(*size)
+    states = []
+
+    for (time, code, data) in cast_events(events, pause_gap):
+        if code != "o":
+            continue
+        screen.feed(data)
+        rows = screen.snapshot()
+        if states and states[-1][0] == time:
+            states.pop()
+        if not states or states[-1][1] != rows:
+            states.append((time, rows))
+
+    result = []
+    for (index, (time, rows)) in enumerate(states):
+        end = states[index + 1][0] if index + 1 < len(states) else time + final_hold
+        result.append(Frame(time, end - time, rows))
+
+    return result
+
+
+def render_svg(frame_list, path, size=(80, 24)):
+    """Writes frames to path as one animated SVG.
+
+    Only rows that change get a new element, each shown for as long as
+    that row stays the same, so the file grows with the changes on screen.
+    """
+    (width, height) = size
+    total = frame_list[-1].time + frame_list[-1].duration if frame_list else 0
+
+    lines = [_svg_header(width, height)]
+
+    for (row, start, end, runs) in _row_versions(frame_list, height):
+        if not runs:
+            continue
+        lines.append(
+            '<text x="{x}" y="{y}" visibility="hidden">{spans}'
+            '<set attributeName="visibility" to="visible" begin="{begin}s" '
+            'dur="{dur}s" fill="{fill}"/></text>'.format(
+                x=PADDING,
+                y=_row_y(row),
+                spans=_spans(runs),
+                begin=round(start, 3),
+                dur=max(round(end - start, 3), 0.001),
+                fill="freeze" if end >= total else "remove"
+            ))
+
+    lines.append("</svg>")
+    with open(path, "w") as stream:
+        stream.write("\n".join(lines))
+        stream.write("\n")
+
+
+def write_frames(frame_list, directory, size=(80, 24)):
+    """Writes each frame to directory as a static SVG, ready to rasterize.
+
+    frames.json lists each file with its time and duration, e.g. for
+    building a GIF from PNG conversions of the files.
+    """
+    (width, height) = size
+    index = []
+
+    for (number, frame) in enumerate(frame_list, 1):
+        name = "frame-{0:05d}.svg".format(number)
+        lines = [_svg_header(width, height)]
+        for (row, runs) in enumerate(frame.rows):
+            if runs:
+                lines.append('<text x="{0}" y="{1}">{2}</text>'.format(
+                    PADDING, _row_y(row), _spans(runs)))
+        lines.append("</svg>")
+
+        with open(os.path.join(directory, name), "w") as stream:
+            stream.write("\n".join(lines))
+            stream.write("\n")
+
+        index.append({"file": name, "time": round(frame.time, 3),
+                      "duration": round(frame.duration, 3)})
+
+    with open(os.path.join(directory, "frames.json"), "w") as stream:
+        json.dump(index, stream, indent=2)
+
+
+def _row_versions(frame_list, height):
+    """Yields (row, start, end, runs) for each version of each row."""
+    current = [None] * height
+    started = [0.0] * height
+
+    for frame in frame_list:
+        for row in range(height):
+            if frame.rows[row] != current[row]:
+                if current[row] is not None:
+                    yield (row, started[row], frame.time, current[row])
+                current[row] = frame.rows[row]
+                started[row] = frame.time
+
+    if frame_list:
+        end = frame_list[-1].time + frame_list[-1].duration
+        for row in range(height):
+            if current[row] is not None:
+                yield (row, started[row], end, current[row])
+
+
+def _svg_header(width, height):
+    """Returns the opening svg element and background."""
+    svg_width = round(width * CHAR_WIDTH + 2 * PADDING)
+    svg_height = height * LINE_HEIGHT + 2 * PADDING
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" width="{0}" height="{1}" '
+        'font-family="monospace" font-size="{2}" xml:space="preserve">\n'
+        '<rect width="100%" height="100%" fill="{3}"/>'
+    ).format(svg_width, svg_height, FONT_SIZE, BACKGROUND)
+
+
+def _spans(runs):
+    """Returns tspan elements for a row's (style, text) runs."""
+    spans = []
+    for ((color, bold), text) in runs:
+        weight = ' font-weight="bold"' if bold else ""
+        spans.append('<tspan fill="{0}"{1}>{2}</tspan>'.format(
+            COLORS.get(color, FOREGROUND), weight, escape(text)))
+    return "".join(spans)
+
+
+def _row_y(row):
+    """Returns the text baseline for a row."""
+    return PADDING + (row + 1) * LINE_HEIGHT - 4
@@ -0,0 +1,52 @@
+"""Terminal the robot writes to."""
+
+import sys
+
+from .clock import SystemClock
+from .tracing import NULL_TRACER
+from .typing_renderer import TypingRenderer, stdout_writer
+
+
+class Terminal:
+    """Screen output, pacing and recording for a run.
+
+    Everything the robot shows goes through here, timed by the clock and
+    recorded on the timeline if there is one. A headless terminal shows
+    nothing, it only records. Spans of the run go to the tracer.
+    """
+
+    def __init__(self, clock=None, timeline=None, headless=False, tracer=None):
+        """Sets up a terminal, by default a plain real time one."""
+        self.clock = clock or SystemClock()
+        self.timeline = timeline
+        self.headless = headless
+        self.tracer = tracer or NULL_TRACER
+
+    def write(self, text, kind="output"):
+        """Shows text, and records it as an event of kind."""
+        self.record(kind, text)
+        if not self.headless:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+
+    def type(self, keystrokes, delays, return_key_delay):
+        """Types keystrokes paced by the clock, returns TypingStats."""
+        show = None if self.headless else stdout_writer()
+
+        def write(keystroke):
+            self.record("type", keystroke)
+            if show:
+                show(keystroke)
+
+        renderer = TypingRenderer(clock=self.clock.now, sleep=self.clock.sleep)
+        with self.tracer.span("typing", keystrokes=len(keystrokes)):
+            return renderer.render(keystrokes, delays, return_key_delay, write=write)
+
+    def sleep(self, seconds):
+        """Waits for seconds on the clock."""
+        self.clock.sleep(seconds)
+
+    def record(self, kind, data=None):
+        """Records an event, if there is a timeline."""
+        if self.timeline:
+            self.timeline.record(kind, data)
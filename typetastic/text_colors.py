@@ -1,5 +1,7 @@
 """Simple class for text colors."""
 
+import functools
+
 
 class TextColors:
     """Simple class for text colors."""
@@ -17,8 +19,9 @@ class TextColors:
     }
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def get_color_code(color_name):
-        """Return the ANSI color code."""
+        """Return the ANSI color code, worked out once per color name."""
 
         # defaults - cyan, not bold, not bright
         color_index = 36
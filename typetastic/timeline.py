@@ -0,0 +1,59 @@
+"""Timeline of what the robot put on screen, and when."""
+
+import collections
+import json
+
+# time is in seconds from the start of the timeline
+Event = collections.namedtuple("Event", ["time", "kind", "data"])
+
+
+class Timeline:
+    """Timestamped events recorded during a run.
+
+    Event kinds:
+        type: keystrokes typed by the robot
+        output: command output
+        prompt: a prompt emitted by the robot
+        pause: a PAUSE (or editor) point
+        exit_status: exit status of the last command
+    """
+
+    def __init__(self, clock):
+        """Starts a timeline at the current time of clock."""
+        self.__clock = clock
+        self.__start = clock.now()
+        self.__events = []
+
+    def record(self, kind, data=None):
+        """Records an event at the current time."""
+        self.__events.append(Event(self.__clock.now() - self.__start, kind, data))
+
+    def events(self):
+        """Returns the list of recorded events."""
+        return self.__events
+
+    def write(self, path):
+        """Writes the events to path, one JSON object per line."""
+        write_events(self.__events, path)
+
+    @staticmethod
+    def read(path):
+        """Returns the events written to path by write()."""
+        events = []
+        with open(path, "r") as stream:
+            for line in stream:
+                record = json.loads(line)
+                events.append(Event(record["time"], record["kind"], record["data"]))
+        return events
+
+
+def write_events(events, path):
+    """Writes events to path, one JSON object per line, see Timeline.read()."""
+    with open(path, "w") as stream:
+        for event in events:
+            stream.write(json.dumps({
+                "time": round(event.time, 6),
+                "kind": event.kind,
+                "data": event.data
+            }))
+            stream.write("\n")
@@ -0,0 +1,116 @@
+"""Timed spans of a run, for finding where the time goes."""
+
+import collections
+import json
+import time
+
+# one finished span, times in seconds on the tracer clock
+SpanRecord = collections.namedtuple("SpanRecord", ["name", "start", "end", "args"])
+
+
+class Span:
+    """Times the block it wraps, use as a context manager."""
+
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        self.start = self.tracer.clock()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer.spans.append(SpanRecord(self.name, self.start, self.tracer.clock(), self.args))
+        return False
+
+
+class NullSpan:
+    """A span that records nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Tracer:
+    """Records spans, exports them as Chrome trace events or a summary."""
+
+    enabled = True
+
+    def __init__(self, clock=time.perf_counter):
+        """Sets up an empty trace, timed by clock."""
+        self.clock = clock
+        self.origin = clock()
+        self.spans = []
+
+    def span(self, name, **args):
+        """Returns a Span named name, args are shown with it in the trace."""
+        return Span(self, name, args)
+
+    def chrome_trace(self):
+        """Returns the spans as a Chrome trace-event dict.
+
+        Load the JSON in chrome://tracing or https://ui.perfetto.dev.
+        """
+        events = []
+        for span in self.spans:
+            event = {
+                "name": span.name,
+                "ph": "X",
+                "ts": round((span.start - self.origin) * 1000000, 3),
+                "dur": round((span.end - span.start) * 1000000, 3),
+                "pid": 1,
+                "tid": 1
+            }
+            if span.args:
+                event["args"] = {key: str(value) for (key, value) in span.args.items()}
+            events.append(event)
+
+        events.sort(key=lambda event: (event["ts"], -event["dur"]))
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        """Writes the spans to path as Chrome trace-event JSON."""
+        with open(path, "w") as stream:
+            json.dump(self.chrome_trace(), stream)
+
+    def summary(self):
+        """Returns a table of count, total, mean and max time per span name."""
+        durations = collections.OrderedDict()
+        for span in self.spans:
+            durations.setdefault(span.name, []).append(span.end - span.start)
+
+        lines = ["{0:24} {1:>6} {2:>10} {3:>10} {4:>10}".format(
+            "span", "count", "total ms", "mean ms", "max ms")]
+        for (name, times) in sorted(durations.items(), key=lambda item: -sum(item[1])):
+            lines.append("{0:24} {1:>6} {2:>10.2f} {3:>10.2f} {4:>10.2f}".format(
+                name, len(times), sum(times) * 1000, sum(times) / len(times) * 1000,
+                max(times) * 1000))
+
+        return "\n".join(lines)
+
+
+class NullTracer:
+    """A tracer that records nothing, at next to no cost."""
+
+    enabled = False
+
+    @staticmethod
+    def span(name, **args):
+        # pylint: disable=unused-argument
+        """Returns a span that records nothing."""
+        return NULL_SPAN
+
+
+NULL_TRACER = NullTracer()
@@ -0,0 +1,85 @@
+"""Deadline scheduled typing renderer."""
+
+import collections
+import io
+import os
+import sys
+import time
+
+# requested and achieved durations are in seconds
+TypingStats = collections.namedtuple("TypingStats", ["keystrokes", "requested", "achieved"])
+
+
+class TypingRenderer:
+    """Types text against absolute deadlines.
+
+    Each keystroke is due at the start time plus the sum of the delays
+    before it, so time spent writing and flushing is absorbed by the next
+    sleep rather than adding to it. Typing takes the requested time on any
+    machine, unless the terminal cannot keep up at all.
+    """
+
+    def __init__(self, clock=time.monotonic, sleep=time.sleep):
+        """Sets up a renderer, clock and sleep can be swapped for tests."""
+        self.clock = clock
+        self.sleep = sleep
+
+    def render(self, text, delays, return_key_delay=0, write=None):
+        """Types text, delays[i] is the pause after text[i].
+
+        Text is a str, or a list of keystrokes (see split_keystrokes).
+        Keystrokes go to stdout, unless another write function is given.
+
+        Returns:
+        TypingStats with the requested and achieved durations.
+        """
+        write = write or stdout_writer()
+
+        start = self.clock()
+        deadline = start
+        for (keystroke, delay) in zip(text, delays):
+            write(keystroke)
+            deadline += delay
+            self._sleep_until(deadline)
+
+        deadline += return_key_delay
+        self._sleep_until(deadline)
+        write("\n")  # newline required after typing command
+
+        requested = deadline - start
+        return TypingStats(len(text), requested, self.clock() - start)
+
+    def _sleep_until(self, deadline):
+        """Sleeps until the deadline, returns at once if it has passed."""
+        remaining = deadline - self.clock()
+        if remaining > 0:
+            self.sleep(remaining)
+
+
+def stdout_writer():
+    """Returns a function that writes unbuffered to stdout.
+
+    Writes go straight to the stdout file descriptor when there is one,
+    skipping the text layer. Otherwise (e.g. stdout is a StringIO) they go
+    through sys.stdout and are flushed.
+    """
+    stream = sys.stdout
+    try:
+        fd = stream.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        fd = None
+
+    if fd is None:
+        def write_stream(text):
+            stream.write(text)
+            stream.flush()
+        return write_stream
+
+    stream.flush()  # keep ordering with anything already printed
+
+    def write_fd(text):
+        data = text.encode("utf-8")
+        while data:
+            written = os.write(fd, data)
+            data = data[written:]
+    return write_fd